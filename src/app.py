@@ -1,3 +1,7 @@
+import time
+_script_start = time.perf_counter()
+import threading
+
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -9,15 +13,23 @@ from typing import Dict,List
 from config import (NIFTY_50_STOCKS, APP_ICON, APP_TITLE)
 
 from market_data_loader import(
-    fetch_stock_data, fetch_nifty_50_data, fetch_multiple_stocks,
-    get_stock_sector
+    fetch_stock_data, fetch_nifty_50_data, get_returns_panel
 )
 
 from garch_model import (
-    GARCHVaRModel, rolling_var_backtest, calculate_var_for_multiple_stocks
+    calculate_var_for_multiple_stocks, rolling_historical_var
 )
 
 from news_agent import get_news_agent
+from cache_warmer import get_cache_warmer
+from model_cache import get_model_cache
+from model_registry import get_model_registry
+from portfolio import portfolio_covariance, portfolio_var
+from simulation import simulate_var
+from model_zoo import DEFAULT_CANDIDATES, select_models, fit_selected_model, get_model_selection_cache
+from backtest_stats import backtest_statistics, backtest_summary, garch_breach_matrix
+from scenarios import SCENARIO_LIBRARY, run_scenarios, scenario_summary
+from result_store import FULL_HISTORY, get_result_store, iter_stored_var_backtest, model_spec
 
 st.set_page_config(page_title=APP_TITLE, page_icon=APP_ICON, layout="wide", initial_sidebar_state="expanded")
 
@@ -76,10 +88,12 @@ def display_var_card(title: str, var_value: float, confidence: str, color: str =
     </div>
     """, unsafe_allow_html=True)
 
-def plot_true_vs_predicted_var(backtest_results: pd.DataFrame):
+def plot_true_vs_predicted_var(backtest_results: pd.DataFrame, historical_var: pd.Series = None):
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=backtest_results['date'], y=backtest_results['actual_return'], mode='lines+markers', name='Actual Return',line=dict(color='blue', width=2),marker=dict(size=6)))
     fig.add_trace(go.Scatter(x=backtest_results['date'], y=backtest_results['predicted_var'], mode='lines+markers', name='Predicted VaR',line=dict(color='red', width=2),marker=dict(size=6)))
+    if historical_var is not None:
+        fig.add_trace(go.Scatter(x=backtest_results['date'], y=historical_var.reindex(backtest_results['date']).to_numpy(), mode='lines', name='Historical Simulation VaR',line=dict(color='green', width=2, dash='dash')))
     fig.add_hline(y=0, line_dash='dash',line_color='gray',opacity=0.5)
     fig.update_layout(title=f"Actual Returns vs Predicted VaR", xaxis_title="Date", yaxis_title="Returns (%)",hovermode='x unified',template='plotly_white',height=400)
     return fig
@@ -101,11 +115,60 @@ def plot_individual_stock_var(stock_var_df: pd.DataFrame, topn: int = 15):
 
     return fig
 
+def display_cache_warmer_status(warmer):
+    if warmer is None:
+        return
+    status = warmer.status()
+    if status['phase'] in ('prices', 'models'):
+        label = "Prefetching prices" if status['phase'] == 'prices' else "Fitting GARCH models"
+        st.sidebar.progress(status['done'] / max(status['total'], 1), text=f"{label} ({status['done']}/{status['total']})")
+    if status['age'] is None:
+        st.sidebar.caption("Cache warming up - first analyses may take longer.")
+    elif status['stale']:
+        st.sidebar.warning(f"Cached data is stale (last refresh {status['age'] / 60:.0f} min ago).")
+    else:
+        st.sidebar.caption(f"Cache refreshed {status['age'] / 60:.0f} min ago.")
+    if status['errors']:
+        st.sidebar.caption(f"Cache warmer errors: {', '.join(status['errors'].keys())}")
+
+def load_price_data(ticker: str, warmer=None):
+    """
+    Price history for a ticker from the warmer's snapshot, so a request never triggers a download.
+
+    Without a warmer (CACHE_WARMER_ENABLED=0) the data is fetched directly. Returns None, after
+    telling the user why, while the warmer has no snapshot or the ticker is not in it.
+    """
+    if warmer is None:
+        return fetch_nifty_50_data() if ticker == '^NSEI' else fetch_stock_data(ticker)
+    data = warmer.get_data(ticker)
+    if data is None:
+        if warmer.is_warm():
+            st.warning(f"No cached prices for {ticker.replace('.NS', '')}; it will be retried on the next cache refresh.")
+        else:
+            st.info("Prices are still being prefetched in the background; run the analysis again in a moment.")
+    return data
+
+def load_returns_panel(tickers: tuple, warmer=None):
+    """
+    Returns panel for the tickers from the warmer's snapshot, or fetched directly without a warmer.
+    """
+    if warmer is None:
+        return get_returns_panel(tickers)
+    panel = warmer.get_panel(tickers)
+    if panel is None:
+        st.info("Prices are still being prefetched in the background; run the analysis again in a moment.")
+    elif len(panel.tickers) < len(tickers):
+        missing = [ticker.replace('.NS', '') for ticker in tickers if ticker not in panel.ticker_index]
+        st.warning(f"No cached prices yet for {', '.join(missing)}; they are left out of this analysis.")
+    return panel
+
 def main():
     st.title(f"{APP_ICON} {APP_TITLE}")
     st.markdown("Welcome to the VaR Prediction Workstation! This application allows you to analyze and predict the Value at Risk (VaR) for Nifty 50 stocks using GARCH models. Explore the historical data, backtest the model's performance, and visualize the results with interactive charts.")
 
     st.sidebar.header("Configuration")
+    warmer = get_cache_warmer()
+    display_cache_warmer_status(warmer)
 
     analysis_type = st.sidebar.radio("Select Analysis Type", ["Nifty 50 Index","Single Stock Analysis", "Multiple Stocks Analysis"])
 
@@ -131,27 +194,27 @@ def main():
         if run_analysis:
             with st.spinner("Running analysis..."):
                 if analysis_type == "Nifty 50 Index":
-                    nifty_data = fetch_nifty_50_data()
-                    if not nifty_data.empty:
+                    nifty_data = load_price_data('^NSEI', warmer)
+                    if nifty_data is not None and not nifty_data.empty:
                         st.session_state['single_data'] = nifty_data
                         st.session_state['ticker'] = '^NSEI'
                         st.session_state['analysis_type'] = 'single'
                 elif analysis_type == "Single Stock Analysis" and selected_stocks:
-                    stock_data = fetch_stock_data(selected_stocks[0])
-                    if not stock_data.empty:
+                    stock_data = load_price_data(selected_stocks[0], warmer)
+                    if stock_data is not None and not stock_data.empty:
                         st.session_state['single_data'] = stock_data
                         st.session_state['ticker'] = selected_stocks[0]
                         st.session_state['analysis_type'] = 'single'
                 elif analysis_type == "Multiple Stocks Analysis" and selected_stocks:
-                    stock_data_dict = fetch_multiple_stocks(selected_stocks)
-                    if stock_data_dict:
-                        st.session_state['multi_data'] = stock_data_dict
+                    panel = load_returns_panel(tuple(selected_stocks), warmer)
+                    if panel is not None and panel.tickers:
+                        st.session_state['multi_tickers'] = tuple(selected_stocks)
                         st.session_state['analysis_type'] = 'multiple'
 
-        if st.session_state['analysis_type'] == 'single':
-            display_single_stock_analysis()
-        elif st.session_state['analysis_type'] == 'multiple':
-            display_multiple_stocks_analysis()
+        if st.session_state.get('analysis_type') == 'single':
+            display_single_stock_analysis(warmer)
+        elif st.session_state.get('analysis_type') == 'multiple':
+            display_multiple_stocks_analysis(warmer)
     else:
         st.info("Please select an analysis type and click 'Run Analysis' to see the results.")
 
@@ -178,22 +241,82 @@ def main():
             - Explain model outputs
             - Risk insights and recommendations
             """)
+    # The dashboard is on screen at this point; the assistant below never blocks it.
+    render_seconds = time.perf_counter() - _script_start
+    if 'time_to_first_render' not in st.session_state:
+        st.session_state['time_to_first_render'] = render_seconds
+    st.sidebar.caption(f"Rendered in {render_seconds:.2f}s (first render {st.session_state['time_to_first_render']:.2f}s).")
     st.markdown("---")
     st.header("AI Assistant")
     display_chat_interface()
-def display_single_stock_analysis():
+def display_model_selection(ticker: str, returns: pd.Series, var_result_95: Dict, var_result_99: Dict):
+    criterion_labels = {"BIC": 'bic', "AIC": 'aic', "Holdout VaR loss": 'backtest'}
+    criterion = st.selectbox("Selection criterion", list(criterion_labels.keys()), key='model_selection_criterion')
+    if not st.checkbox(f"Compare {len(DEFAULT_CANDIDATES)} volatility models for {ticker.replace('.NS', '')}", key='model_selection_enabled'):
+        return
+
+    with st.spinner("Fitting candidate models..."):
+        selection = select_models({ticker: returns}, criterion=criterion_labels[criterion], cache=get_model_selection_cache())[ticker]
+        selected_model = fit_selected_model(ticker, returns, selection, get_model_cache())
+    if selected_model is None:
+        st.warning("None of the candidate models could be fitted.")
+        return
+
+    scores = pd.DataFrame(selection['scores']).sort_values(selection['criterion'])
+    st.dataframe(scores, use_container_width=True, hide_index=True)
+    term_structure = selected_model.calculate_var_term_structure([0.95, 0.99])
+    col1, col2 = st.columns(2)
+    with col1:
+        display_var_card(f"7 day VaR - {selection['selected']}", term_structure['var'][0, -1], "95% Confidence", color="#3498db",
+                         delta=term_structure['var'][0, -1] - var_result_95['var_percentage'])
+    with col2:
+        display_var_card(f"7 day VaR - {selection['selected']}", term_structure['var'][1, -1], "99% Confidence", color="#e74c3c",
+                         delta=term_structure['var'][1, -1] - var_result_99['var_percentage'])
+
+def display_forecast_history(result_store, ticker: str, model):
+    source = st.radio("Forecasts", ["Backtest (252-day window)", "Live"], horizontal=True, key='forecast_history_source')
+    col1, col2 = st.columns(2)
+    with col1:
+        horizon = st.selectbox("Horizon (days)", [7, 1], key='forecast_history_horizon')
+    with col2:
+        confidence = st.selectbox("Confidence", [0.95, 0.99], format_func=lambda level: f"{level:.0%}", key='forecast_history_confidence')
+    window = 252 if source.startswith("Backtest") else FULL_HISTORY
+    history = result_store.load(ticker, model_spec(model), window, horizon, confidence)
+    realized = history.dropna(subset=['actual_return'])
+    pending = len(history) - len(realized)
+    if realized.empty:
+        st.info(f"No realized forecasts stored yet{f' ({pending} pending)' if pending else ''}.")
+        return
+    realized = realized.assign(var_breach=realized['var_breach'].astype(bool))
+    st.plotly_chart(plot_true_vs_predicted_var(realized), use_container_width=True, key='forecast_history_chart')
+    st.caption(f"{len(realized)} realized forecasts from {realized['as_of'].min():%Y-%m-%d} to {realized['as_of'].max():%Y-%m-%d}, "
+               f"breach rate {realized['var_breach'].mean() * 100:.2f}%{f'; {pending} still pending' if pending else ''}.")
+
+def display_single_stock_analysis(warmer=None):
     data = st.session_state['single_data']
     ticker = st.session_state['ticker']
 
     st.subheader(f"VaR analysis for {ticker.replace('.NS', '')}")
     st.dataframe(data.tail(10))
     st.markdown("---")
-    returns = data['returns'].dropna()
-    model = GARCHVaRModel(returns)
-    if model.fit():
-        var_result_95 = model.calculate_var(0.95)
-        var_result_99 = model.calculate_var(0.99)
-        
+    returns = data.set_index('Date')['returns'].dropna()
+    model = warmer.get_model(ticker, returns) if warmer else None
+    if model is None:
+        model = get_model_registry().load_or_fit(ticker, returns)
+    if model is not None:
+        term_structure = model.calculate_var_term_structure([0.95, 0.99])
+        var_result_95 = model.var_result(term_structure, 0.95)
+        var_result_99 = model.var_result(term_structure, 0.99)
+        # Record each (ticker, last date) forecast once per session, not on every widget rerun.
+        recorded = st.session_state.setdefault('recorded_forecasts', set())
+        if (ticker, returns.index[-1]) not in recorded:
+            result_store = get_result_store()
+            result_store.update_outcomes(ticker, returns)
+            for var_result in (var_result_95, var_result_99):
+                for horizon in (1, term_structure['horizon']):
+                    result_store.record_forecast(ticker, model_spec(model), returns, horizon, var_result['confidence_level'], var_result['daily_vars'][horizon - 1])
+            recorded.add((ticker, returns.index[-1]))
+
         st.subheader("VaR Predictions")
         col1, col2 = st.columns(2)
 
@@ -211,6 +334,27 @@ def display_single_stock_analysis():
         with col4:
             display_var_card(f"7 day VaR - {ticker}", var_result_99['var_percentage'], "99% Confidence", color="#e74c3c")
         st.markdown("---")
+        st.subheader("Simulated VaR and Expected Shortfall")
+        simulation_method = st.radio("Simulation method", ["Filtered historical simulation", "Monte Carlo"], horizontal=True, key='simulation_method')
+        simulation = simulate_var({ticker: model}, method='fhs' if simulation_method == "Filtered historical simulation" else 'monte_carlo',
+                                  confidence_levels=[0.95, 0.99])
+        simulated_var, simulated_es = simulation['var'][0], simulation['es'][0]
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            display_var_card("7 day simulated VaR", simulated_var[0, -1], "95% Confidence", color="#3498db")
+        with col2:
+            display_var_card("7 day simulated VaR", simulated_var[1, -1], "99% Confidence", color="#e74c3c")
+        with col3:
+            display_var_card("7 day Expected Shortfall", simulated_es[0, -1], "95% Confidence", color="#8e44ad")
+        with col4:
+            display_var_card("7 day Expected Shortfall", simulated_es[1, -1], "99% Confidence", color="#c0392b")
+        st.caption(f"{simulation['n_paths']:,} simulated paths.")
+
+        st.markdown("---")
+        with st.expander("Volatility Model Selection"):
+            display_model_selection(ticker, returns, var_result_95, var_result_99)
+
+        st.markdown("---")
         st.subheader("VaR Progression Over 7 Days")
 
         daily_var_df = pd.DataFrame({
@@ -224,18 +368,34 @@ def display_single_stock_analysis():
             (x=daily_var_df['Day'], y=daily_var_df['VaR at 95%'], mode='lines+markers', name='VaR at 95%',line=dict(color='blue', width=2),marker=dict(size=6)))
         fig_daily.add_trace(go.Scatter
             (x=daily_var_df['Day'], y=daily_var_df['VaR at 99%'], mode='lines+markers', name='VaR at 99%',line=dict(color='red', width=2),marker=dict(size=6)))
+        fig_daily.add_trace(go.Scatter
+            (x=daily_var_df['Day'], y=simulated_var[0], mode='lines', name='Simulated VaR at 95%',line=dict(color='blue', width=2, dash='dash')))
+        fig_daily.add_trace(go.Scatter
+            (x=daily_var_df['Day'], y=simulated_var[1], mode='lines', name='Simulated VaR at 99%',line=dict(color='red', width=2, dash='dash')))
         fig_daily.update_layout(xaxis_title="Day", yaxis_title="VaR (%)", title=f"VaR Progression for {ticker.replace('.NS', '')}", template='plotly_white', height=400)
         
         st.plotly_chart(fig_daily, use_container_width=True)
         st.markdown("---")
         st.subheader("True vs Predicted VaR Backtest")
-        with st.spinner("Running backtest..."):
-            backtest_95 = rolling_var_backtest(returns, confidence_level=0.95)
-
-            if not backtest_95.empty:
-                fig_backtest = plot_true_vs_predicted_var(backtest_95)
-                st.plotly_chart(fig_backtest, use_container_width=True) 
-
+        backtest_step = st.select_slider("Backtest step (days)", options=[1, 2, 5, 7], value=7)
+        if len(returns) < 252 + 7:
+            st.warning("Not enough data for backtesting. Increase the window size or reduce the horizon.")
+        else:
+            historical = rolling_historical_var(returns, confidence_levels=[0.95])
+            historical_var_95 = pd.Series(historical['var'][:, 0, 0], index=historical['dates'])
+            chart_placeholder = st.empty()
+            backtest_progress = st.progress(0.0, text="Running backtest...")
+            chunks = []
+            for chunk, fraction_done in iter_stored_var_backtest(result_store, ticker, returns, confidence_level=0.95, step=backtest_step):
+                if chunk.empty:
+                    continue
+                chunks.append(chunk)
+                backtest_95 = pd.concat(chunks).sort_values('date').reset_index(drop=True)
+                chart_placeholder.plotly_chart(plot_true_vs_predicted_var(backtest_95, historical_var_95), use_container_width=True, key=f"backtest_{len(chunks)}")
+                backtest_progress.progress(fraction_done, text=f"Running backtest... {fraction_done:.0%}")
+            backtest_progress.empty()
+
+            if chunks:
                 breach_rate_95 = backtest_95['var_breach'].sum() / len(backtest_95) * 100
                 col1, col2, col3 = st.columns(3)
                 with col1:
@@ -244,6 +404,18 @@ def display_single_stock_analysis():
                     st.metric("VaR Breaches", backtest_95['var_breach'].sum())
                 with col3:
                     st.metric("Breach Rate", f"{breach_rate_95:.2f}%")
+                coverage = backtest_summary([ticker], [0.95], backtest_statistics(backtest_95['var_breach'].to_numpy()[:, None, None], [0.95])).iloc[0]
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Kupiec POF p-value", f"{coverage['kupiec_pvalue']:.3f}")
+                with col2:
+                    st.metric("Christoffersen CC p-value", f"{coverage['conditional_coverage_pvalue']:.3f}")
+                with col3:
+                    st.metric("Traffic light", coverage['zone'].capitalize())
+                historical_breaches = backtest_95['actual_return'].to_numpy() < historical_var_95.reindex(backtest_95['date']).to_numpy()
+                st.caption(f"Historical simulation baseline breach rate on the same dates: {historical_breaches.mean() * 100:.2f}%")
+        with st.expander("Forecast History"):
+            display_forecast_history(result_store, ticker, model)
         st.session_state['var_context'] = f"""
         Current VaR Analysis for {ticker}:
         - Next-day VaR (95%): {var_result_95['daily_vars'][0]}
@@ -251,10 +423,10 @@ def display_single_stock_analysis():
         - 7-Day VaR (95%): {var_result_95['var_percentage']}
         - 7-Day VaR (99%): {var_result_99['var_percentage']}
         - Volatility : {var_result_95['cumulative_volatility']}
+        - Simulated 7-Day VaR / Expected Shortfall (99%, {simulation_method}): {simulated_var[1, -1]} / {simulated_es[1, -1]}
         """
 def plot_sector_var_breakdown(var_results: pd.DataFrame, confidence_level: str = '95.00%'):
-    filtered_results = var_results[var_results['confidence_level'] == confidence_level].copy()
-    filtered_results['sector'] = filtered_results['ticker'].apply(get_stock_sector)
+    filtered_results = var_results[var_results['confidence_level'] == confidence_level]
 
     sector_var = filtered_results.groupby('sector')['var_percentage'].agg(['mean', 'count']).reset_index()
     sector_var.columns = ['sector', 'average_var', 'stock_count']
@@ -270,10 +442,157 @@ def plot_sector_var_breakdown(var_results: pd.DataFrame, confidence_level: str =
     fig.update_layout(title=f"Average VaR by Sector at {confidence_level}", xaxis_title="Average VaR (%)", yaxis_title="Sector", template='plotly_white', height=500)
     return fig
 
-def display_multiple_stocks_analysis():
-    stock_dict = st.session_state['multi_data']
+def plot_component_var(breakdown: pd.DataFrame, label_column: str, title: str):
+    breakdown = breakdown.sort_values('component_var', ascending=False)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=breakdown['component_var'], y=breakdown[label_column], orientation='h', marker_color='indianred',
+                         customdata=breakdown[['contribution']] * 100,
+                         hovertemplate='<b>%{y}</b><br>Component VaR: %{x:.3f}%<br>Share of portfolio VaR: %{customdata[0]:.1f}%<extra></extra>'))
+    fig.update_layout(title=title, xaxis_title="Component VaR (%)", yaxis_title="", template='plotly_white', height=max(300, 22 * len(breakdown)))
+    return fig
+
+def display_portfolio_var(panel, get_fitted_model):
+    st.subheader("Portfolio VaR")
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        method = st.radio("Covariance model", ["EWMA", "DCC-GARCH"], horizontal=True, key='portfolio_covariance')
+        weight_mode = st.radio("Weights", ["Equal", "Custom"], horizontal=True, key='portfolio_weight_mode')
+    weights = np.ones(len(panel.tickers))
+    if weight_mode == "Custom":
+        with col2:
+            edited = st.data_editor(pd.DataFrame({'ticker': panel.tickers, 'weight': weights}), disabled=['ticker'], hide_index=True, key='portfolio_weights')
+        weights = edited['weight'].clip(lower=0).to_numpy(dtype=np.float64)
+    if weights.sum() <= 0:
+        st.warning("Portfolio weights must add up to more than zero.")
+        return
+
+    models = None
+    if method == "DCC-GARCH":
+        models = {ticker: get_fitted_model(ticker, panel.series(ticker)) for ticker in panel.tickers}
+        missing = [ticker for ticker, model in models.items() if model is None]
+        if missing:
+            st.warning(f"No GARCH fit for {', '.join(missing)}; DCC-GARCH needs one for every stock.")
+            return
+    covariance = portfolio_covariance(panel, method='dcc' if method == "DCC-GARCH" else 'ewma', models=models)
+    result_95 = portfolio_var(panel, covariance, weights, 0.95)
+    result_99 = portfolio_var(panel, covariance, weights, 0.99)
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        display_var_card("Portfolio next-day VaR", result_95['day1_var'], "95% Confidence", color="#3498db")
+    with col2:
+        display_var_card("Portfolio next-day VaR", result_99['day1_var'], "99% Confidence", color="#e74c3c")
+    with col3:
+        display_var_card(f"Portfolio {result_95['horizon']}-day VaR", result_95['var_percentage'], "95% Confidence", color="#3498db")
+    with col4:
+        display_var_card("Diversification benefit", result_95['var_percentage'] - result_95['undiversified_var'], "95% vs. sum of standalone VaRs", color="#27ae60")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(plot_component_var(result_95['stocks'], 'ticker', "Component VaR by Stock at 95.00%"), use_container_width=True)
+    with col2:
+        st.plotly_chart(plot_component_var(result_95['sectors'], 'sector', "Component VaR by Sector at 95.00%"), use_container_width=True)
+    with st.expander("Portfolio VaR Decomposition"):
+        st.dataframe(result_95['stocks'], use_container_width=True)
+    return result_95, result_99
+
+def display_multiple_stocks_backtest(panel, get_fitted_model):
+    st.subheader("VaR Backtest Across Stocks")
+    st.caption("Next-day VaR from each stock's current GARCH fit, checked against every day of its history.")
+    confidence_levels = [0.95, 0.99]
+    models = {ticker: get_fitted_model(ticker, panel.series(ticker)) for ticker in panel.tickers}
+    breach_matrix = garch_breach_matrix(panel, models, confidence_levels)
+    summary = backtest_summary(panel.tickers, confidence_levels, backtest_statistics(breach_matrix['breaches'], confidence_levels, breach_matrix['valid']))
+    summary = summary[summary['observations'] > 0]
+    if summary.empty:
+        return
+
+    zone_counts = summary.groupby(['zone', 'confidence_level']).size()
+    col1, col2, col3 = st.columns(3)
+    for col, zone in zip((col1, col2, col3), ('green', 'yellow', 'red')):
+        with col:
+            st.metric(f"{zone.capitalize()} zone (95% / 99%)", " / ".join(str(zone_counts.get((zone, level), 0)) for level in ('95.00%', '99.00%')))
+
+    fig = go.Figure()
+    for level, color in (('95.00%', 'indianred'), ('99.00%', 'lightsalmon')):
+        level_summary = summary[summary['confidence_level'] == level]
+        fig.add_trace(go.Bar(x=level_summary['ticker'], y=level_summary['breach_rate'] * 100, name=f"Breach rate at {level}", marker_color=color))
+        fig.add_hline(y=level_summary['expected_rate'].iloc[0] * 100, line_dash='dash', line_color=color, opacity=0.8)
+    fig.update_layout(title="Breach Rate vs Expected", xaxis_title="Stock Ticker", yaxis_title="Breach rate (%)", barmode='group', template='plotly_white', height=400, xaxis_tickangle=-45)
+    st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("Coverage Test Details"):
+        display_df = summary[['ticker', 'confidence_level', 'observations', 'breaches', 'breach_rate', 'kupiec_pvalue', 'independence_pvalue', 'conditional_coverage_pvalue', 'zone']].copy()
+        display_df['breach_rate'] = display_df['breach_rate'].apply(lambda x: f"{x*100:.2f}%")
+        st.dataframe(display_df, use_container_width=True)
+
+def display_stress_tests(panel, get_fitted_model):
+    st.subheader("Stress Tests")
+    selected = st.multiselect("Scenarios", list(SCENARIO_LIBRARY.keys()), default=list(SCENARIO_LIBRARY.keys()), key='stress_scenarios')
+    scenarios = {name: SCENARIO_LIBRARY[name] for name in selected}
+    with st.expander("Custom scenario"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            sector = st.selectbox("Sector", ["All sectors"] + sorted(set(panel.sectors)), key='stress_sector')
+        with col2:
+            multiplier = st.slider("Volatility multiplier", 0.5, 4.0, 1.0, 0.1, key='stress_multiplier')
+        with col3:
+            shock = st.number_input("Return shock (%)", -50.0, 50.0, 0.0, 1.0, key='stress_shock')
+        replay = st.checkbox("Replay a historical window", key='stress_replay')
+        window = st.date_input("Replay window", value=(datetime(2020, 2, 20), datetime(2020, 3, 23)), key='stress_window') if replay else None
+        target = '*' if sector == "All sectors" else sector
+        custom = {}
+        if multiplier != 1.0:
+            custom['volatility'] = {target: multiplier}
+        if shock != 0.0:
+            custom['returns'] = {target: shock}
+        if window and len(window) == 2:
+            custom['replay'] = {'start': str(window[0]), 'end': str(window[1])}
+        if custom:
+            scenarios["Custom"] = custom
+    if not scenarios:
+        return None
+
+    models = {ticker: get_fitted_model(ticker, panel.series(ticker)) for ticker in panel.tickers}
+    try:
+        result = run_scenarios(panel, models, scenarios)
+    except ValueError as e:
+        st.warning(str(e))
+        return None
+    summary = scenario_summary(result, 0.95)
+
+    by_scenario = summary.groupby('scenario', sort=False)[['scenario_return', 'stressed_var', 'total_loss']].mean().reset_index()
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=by_scenario['scenario'], y=by_scenario['scenario_return'], name='Scenario return', marker_color='indianred'))
+    fig.add_trace(go.Bar(x=by_scenario['scenario'], y=by_scenario['stressed_var'], name=f"Stressed {result['horizon']}-day VaR at 95%", marker_color='lightsalmon'))
+    fig.add_hline(y=float(np.mean(result['base_var'][0])), line_dash='dash', line_color='gray', opacity=0.8)
+    fig.update_layout(title="Average Stressed Loss by Scenario (dashed: current VaR)", xaxis_title="Scenario", yaxis_title="Return (%)", barmode='relative', template='plotly_white', height=400)
+    st.plotly_chart(fig, use_container_width=True)
+
+    heatmap = summary.pivot(index='scenario', columns='ticker', values='total_loss').reindex(result['scenarios'])
+    fig = go.Figure(go.Heatmap(z=heatmap.to_numpy(), x=[ticker.replace('.NS', '') for ticker in heatmap.columns], y=heatmap.index,
+                               colorscale='Reds_r', colorbar=dict(title='Loss (%)'),
+                               hovertemplate='<b>%{x}</b> under %{y}<br>Scenario return + stressed VaR: %{z:.2f}%<extra></extra>'))
+    fig.update_layout(title="Scenario Return + Stressed VaR at 95% by Stock", template='plotly_white', height=max(300, 40 * len(heatmap)), xaxis_tickangle=-45)
+    st.plotly_chart(fig, use_container_width=True)
+    if summary['proxied'].any():
+        st.caption("Stocks without prices in a replay window use their sector's average return for the missing days.")
+    with st.expander("Stress Test Details"):
+        st.dataframe(summary, use_container_width=True)
+    return by_scenario
+
+def display_multiple_stocks_analysis(warmer=None):
+    panel = load_returns_panel(st.session_state['multi_tickers'], warmer)
+    if panel is None:
+        return
     with st.spinner("Calculating VaR for selected stocks..."):
-        var_results = calculate_var_for_multiple_stocks(stock_dict)
+        registry = get_model_registry()
+
+        def get_fitted_model(ticker, returns):
+            model = warmer.get_model(ticker, returns) if warmer else None
+            return model if model is not None else registry.load_or_fit(ticker, returns)
+
+        var_results = calculate_var_for_multiple_stocks(panel, get_fitted_model=get_fitted_model)
         st.session_state['var_results'] = var_results.dropna()
 
     if not var_results.empty:
@@ -322,9 +641,14 @@ def display_multiple_stocks_analysis():
             fig_sector_99 = plot_sector_var_breakdown(var_results, confidence_level='99.00%')
             st.plotly_chart(fig_sector_99, use_container_width=True)
         st.markdown("---")
+        portfolio_results = display_portfolio_var(panel, get_fitted_model)
+        st.markdown("---")
+        display_multiple_stocks_backtest(panel, get_fitted_model)
+        st.markdown("---")
+        stress_results = display_stress_tests(panel, get_fitted_model)
+        st.markdown("---")
         with st.expander("Detailed VaR Results"):
             display_df = var_results.copy()
-            display_df['sector'] = display_df['ticker'].apply(get_stock_sector)
             display_df['var_percentage'] = display_df['var_percentage'].apply(lambda x: f"{abs(x):.2f}%")
             display_df['volatility'] = display_df['volatility'].apply(lambda x: f"{x:.2f}%")
             st.dataframe(display_df, use_container_width=True)
@@ -336,8 +660,61 @@ def display_multiple_stocks_analysis():
         - Average 7-Day VaR (99%): {var_99_data['var_percentage'].mean():.2f}%
         - Minimum risk stock at 95%: {var_95_data.loc[var_95_data['var_percentage'].idxmax(), 'ticker']}
         - Maximum risk stock at 95%: {var_95_data.loc[var_95_data['var_percentage'].idxmin(), 'ticker']}
+        """
+        if portfolio_results:
+            result_95, result_99 = portfolio_results
+            st.session_state['var_context'] += f"""
+        - Portfolio next-day VaR at 95% / 99%: {result_95['day1_var']:.2f}% / {result_99['day1_var']:.2f}%
+        - Portfolio 7-Day VaR at 95%: {result_95['var_percentage']:.2f}% (sum of standalone VaRs: {result_95['undiversified_var']:.2f}%)
+        - Largest VaR contributor at 95%: {result_95['stocks'].loc[result_95['stocks']['component_var'].idxmin(), 'ticker']}
+        """
+        if stress_results is not None and not stress_results.empty:
+            worst = stress_results.loc[stress_results['total_loss'].idxmin()]
+            st.session_state['var_context'] += f"""
+        - Worst stress scenario: {worst['scenario']} (average scenario return {worst['scenario_return']:.2f}%, plus stressed 7-Day VaR at 95%: {worst['total_loss']:.2f}%)
         """   
 
+@st.fragment(run_every=2)
+def display_assistant_warmup(agent):
+    if agent.is_ready:
+        st.rerun()
+    elapsed = agent.status()['elapsed'] or 0.0
+    st.info(f"The assistant is warming up (loading language models, {elapsed:.0f}s so far). VaR analysis is available in the meantime.")
+
+def _stop_generation():
+    # Runs before the rerun the click triggers, which interrupts the run that is streaming.
+    cancel = st.session_state.pop('generation_cancel', None)
+    if cancel is None:
+        return
+    cancel.set()
+    partial = st.session_state.pop('partial_response', '')
+    st.session_state['messages'].append({'role': 'assistant', 'content': f"{partial} _(stopped)_".strip()})
+
+def stream_assistant_response(agent):
+    user_input = st.session_state['messages'][-1]['content']
+    news_context = ""
+    relevant_news = agent.query_news(user_input, n_results=3)
+    if relevant_news:
+        news_context = "\n".join([f"- {article['title']} ({article['source']})" for article in relevant_news])
+    var_context = st.session_state.get('var_context', 'No VaR analysis context available.')
+
+    cancel = threading.Event()
+    st.session_state['generation_cancel'] = cancel
+    st.session_state['partial_response'] = ''
+    stats = {}
+    st.button("Stop generating", on_click=_stop_generation)
+
+    def tokens():
+        for text in agent.stream_chat_completion(user_input, var_context=var_context, news_context=news_context, cancel=cancel, stats=stats):
+            st.session_state['partial_response'] += text
+            yield text
+
+    response = st.write_stream(tokens())
+    st.session_state.pop('generation_cancel', None)
+    st.session_state.pop('partial_response', None)
+    st.session_state['messages'].append({'role': 'assistant', 'content': response, 'stats': stats})
+    st.rerun()
+
 def display_chat_interface():
     st.subheader("AI Assistant")
     
@@ -347,6 +724,15 @@ def display_chat_interface():
         st.session_state['news_loaded'] = False
     
     agent = get_news_agent()
+    if not agent.is_ready:
+        display_assistant_warmup(agent)
+        return
+    status = agent.status()
+    if status['phase'] == 'indexing':
+        st.caption("Indexing the news archive in the background; older headlines join the search as they are embedded.")
+    errors = status['errors']
+    if errors:
+        st.warning(f"Some assistant models could not be loaded ({', '.join(errors)}); answers fall back to templates. {'; '.join(errors.values())}")
 
     if not st.session_state['news_loaded']:
         with st.spinner("Loading latest news..."):
@@ -363,21 +749,18 @@ def display_chat_interface():
             st.markdown(f"<div class='chat-message user-message'>{content}</div>", unsafe_allow_html=True)
         else:
             st.markdown(f"<div class='chat-message assistant-message'>{content}</div>", unsafe_allow_html=True)
-        
-    user_input = st.text_input("Ask about VaR predictions, market insights, or risk management strategies:")
+            stats = msg.get('stats') or {}
+            if stats.get('tokens_per_second') is not None:
+                st.caption(f"First token after {stats['ttft']:.2f}s, {stats['tokens']} tokens at {stats['tokens_per_second']:.1f} tokens/s")
 
-    if user_input:
-        st.session_state['messages'].append({'role': 'user', 'content': user_input})
-        news_context = ""
-        relevant_news = agent.query_news(user_input, n_results=3)
-        if relevant_news:
-            news_context = "\n".join([f"- {article['title']} ({article['source']})" for article in relevant_news])
-        
-        var_context = st.session_state.get('var_context', 'No VaR analysis context available.')
-        response = agent.chat_completion(user_input, var_context=var_context, news_context=news_context)
+    # Questions from the input or the quick-question buttons are answered here, streamed as they are generated.
+    if st.session_state['messages'] and st.session_state['messages'][-1]['role'] == 'user':
+        stream_assistant_response(agent)
 
-        st.session_state['messages'].append({'role': 'assistant', 'content': response})
+    user_input = st.chat_input("Ask about VaR predictions, market insights, or risk management strategies:")
 
+    if user_input:
+        st.session_state['messages'].append({'role': 'user', 'content': user_input})
         st.rerun()
     if not st.session_state['messages']:
         st.markdown("Quick questions to ask the assistant:")
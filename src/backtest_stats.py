@@ -0,0 +1,128 @@
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from scipy import stats
+from scipy.special import xlogy
+from garch_model import GARCHVaRModel, garch_filter
+from returns_panel import ReturnsPanel
+
+TRAFFIC_LIGHT_ZONES = np.array(['green', 'yellow', 'red'])
+
+
+def _bernoulli_loglikelihood(hits: np.ndarray, misses: np.ndarray, rate: np.ndarray) -> np.ndarray:
+    # xlogy keeps 0 * log(0) at 0 for samples with no (or only) breaches.
+    return xlogy(hits, rate) + xlogy(misses, 1 - rate)
+
+def _safe_ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=np.float64), where=denominator > 0)
+
+def backtest_statistics(breaches: np.ndarray, confidence_levels: List[float], valid: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Coverage tests for a stack of VaR breach indicators in one vectorized pass.
+
+    Computes the Kupiec proportion-of-failures test, Christoffersen's independence and
+    conditional-coverage tests, and the Basel traffic-light zone (green while the binomial
+    probability of seeing at most that many breaches is below 95%, red from 99.99% on).
+
+    Args:
+        breaches (np.ndarray): Boolean (dates, tickers, confidence levels) breach indicators.
+        confidence_levels (List[float]): VaR confidence level of each last-axis slice, e.g. 0.95.
+        valid (Optional[np.ndarray]): Boolean mask of the same shape, or (dates, tickers), marking
+            observations that exist; defaults to all valid.
+
+    Returns:
+        Dict[str, np.ndarray]: (tickers, confidence levels) arrays 'observations', 'breaches',
+        'breach_rate', 'expected_rate', 'kupiec_lr', 'kupiec_pvalue', 'independence_lr',
+        'independence_pvalue', 'conditional_coverage_lr', 'conditional_coverage_pvalue' and 'zone'.
+    """
+    breaches = np.asarray(breaches, dtype=bool)
+    valid = np.ones_like(breaches) if valid is None else np.broadcast_to(valid if valid.ndim == 3 else valid[:, :, None], breaches.shape)
+    hits = breaches & valid
+    expected_rate = np.broadcast_to(1 - np.asarray(confidence_levels, dtype=np.float64), breaches.shape[1:])
+
+    n_obs = valid.sum(axis=0).astype(np.float64)
+    n_breaches = hits.sum(axis=0).astype(np.float64)
+    breach_rate = _safe_ratio(n_breaches, n_obs)
+
+    kupiec_lr = 2 * (_bernoulli_loglikelihood(n_breaches, n_obs - n_breaches, breach_rate)
+                     - _bernoulli_loglikelihood(n_breaches, n_obs - n_breaches, expected_rate))
+
+    # Transition counts between consecutive observations that both exist.
+    pairs = valid[1:] & valid[:-1]
+    previous, current = hits[:-1], hits[1:]
+    n01 = (pairs & ~previous & current).sum(axis=0).astype(np.float64)
+    n00 = (pairs & ~previous & ~current).sum(axis=0).astype(np.float64)
+    n11 = (pairs & previous & current).sum(axis=0).astype(np.float64)
+    n10 = (pairs & previous & ~current).sum(axis=0).astype(np.float64)
+    pi01 = _safe_ratio(n01, n00 + n01)
+    pi11 = _safe_ratio(n11, n10 + n11)
+    pi = _safe_ratio(n01 + n11, n00 + n01 + n10 + n11)
+    independence_lr = 2 * (_bernoulli_loglikelihood(n01, n00, pi01) + _bernoulli_loglikelihood(n11, n10, pi11)
+                           - _bernoulli_loglikelihood(n01 + n11, n00 + n10, pi))
+
+    kupiec_lr = np.maximum(kupiec_lr, 0.0)
+    independence_lr = np.maximum(independence_lr, 0.0)
+    conditional_coverage_lr = kupiec_lr + independence_lr
+
+    breach_probability = stats.binom.cdf(n_breaches, n_obs, expected_rate)
+    zone = TRAFFIC_LIGHT_ZONES[(breach_probability >= 0.95).astype(int) + (breach_probability >= 0.9999).astype(int)]
+
+    return {
+        'observations': n_obs.astype(int),
+        'breaches': n_breaches.astype(int),
+        'breach_rate': breach_rate,
+        'expected_rate': np.array(expected_rate),
+        'kupiec_lr': kupiec_lr,
+        'kupiec_pvalue': stats.chi2.sf(kupiec_lr, 1),
+        'independence_lr': independence_lr,
+        'independence_pvalue': stats.chi2.sf(independence_lr, 1),
+        'conditional_coverage_lr': conditional_coverage_lr,
+        'conditional_coverage_pvalue': stats.chi2.sf(conditional_coverage_lr, 2),
+        'zone': zone
+    }
+
+def backtest_summary(tickers: List[str], confidence_levels: List[float], statistics: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    One row per ticker and confidence level from a backtest_statistics result.
+    """
+    n_tickers, n_levels = len(tickers), len(confidence_levels)
+    summary = pd.DataFrame({
+        'ticker': np.repeat(tickers, n_levels),
+        'confidence_level': np.tile([f"{level*100:.2f}%" for level in confidence_levels], n_tickers)
+    })
+    for name, values in statistics.items():
+        summary[name] = np.asarray(values).reshape(-1)
+    return summary
+
+def garch_breach_matrix(panel: ReturnsPanel, models: Dict[str, GARCHVaRModel], confidence_levels: List[float]) -> Dict[str, np.ndarray]:
+    """
+    Next-day VaR breaches for every panel date using each ticker's fitted GARCH parameters.
+
+    The conditional variance path is filtered once per ticker with the latest parameters,
+    so the whole universe is rebuilt in O(dates x tickers) without refitting. Because the
+    parameters are estimated on the full sample, this is an in-sample check; the rolling
+    backtest on the single-stock page is the out-of-sample one.
+
+    Returns:
+        Dict[str, np.ndarray]: 'breaches' and 'valid' of shape (dates, tickers, confidence levels),
+        'var' with the predicted VaR in percent (NaN where invalid), and 'tickers'.
+    """
+    n_obs, n_assets = panel.shape
+    z_scores = stats.norm.ppf(1 - np.asarray(confidence_levels, dtype=np.float64))
+    volatility = np.full((n_obs, n_assets), np.nan)
+    returns = np.full((n_obs, n_assets), np.nan)
+    for idx, ticker in enumerate(panel.tickers):
+        model = models.get(ticker)
+        if model is None:
+            continue
+        params = model.get_params()
+        model_returns = model.returns.to_numpy(dtype=np.float64)
+        rows = panel.mask[:, idx]
+        volatility[rows, idx] = np.sqrt(garch_filter(model_returns, params['mu'], params['omega'], params['alpha'], params['beta']))
+        returns[rows, idx] = model_returns
+
+    var = volatility[:, :, None] * z_scores
+    valid = np.broadcast_to(np.isfinite(volatility)[:, :, None], var.shape)
+    with np.errstate(invalid='ignore'):
+        breaches = valid & (returns[:, :, None] < var)
+    return {'tickers': panel.tickers, 'breaches': breaches, 'valid': valid, 'var': var}
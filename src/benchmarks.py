@@ -0,0 +1,408 @@
+"""
+Micro-benchmarks for the VaR workstation.
+
+Run from the src directory, e.g. `python benchmarks.py garch --dist t`. Benchmarks default to
+the offline archive provider so results are reproducible without network access.
+"""
+import os
+import time
+import argparse
+
+os.environ.setdefault('MARKET_DATA_PROVIDER', 'archive')
+
+import numpy as np
+import pandas as pd
+from config import NIFTY_50_STOCKS, HISTORICAL_DATA_START_DATE, VAR_CONFIDENCE_LEVELS, VAR_PREDICTION_DAYS, FORECAST_PARITY_TOLERANCE
+from market_data_loader import sync_tickers
+from returns_panel import ReturnsPanel
+
+
+def load_panel(tickers, start_date: str = HISTORICAL_DATA_START_DATE) -> ReturnsPanel:
+    return ReturnsPanel.from_frames(sync_tickers(tickers, start_date))
+
+
+def bench_garch(args):
+    from garch_model import GARCHVaRModel, BatchGARCHModel
+
+    panel = load_panel(list(NIFTY_50_STOCKS.keys())[:args.tickers])
+    start = time.perf_counter()
+    batch = BatchGARCHModel.from_panel(panel, dist=args.dist)
+    batch.fit()
+    batch_seconds = time.perf_counter() - start
+
+    rows = []
+    start = time.perf_counter()
+    for ticker in batch.tickers:
+        model = GARCHVaRModel(panel.series(ticker), dist=args.dist)
+        model.fit()
+        batch_model = batch.get_model(ticker)
+        for confidence in VAR_CONFIDENCE_LEVELS:
+            reference = model.calculate_var(confidence)['var_percentage']
+            batched = batch_model.calculate_var(confidence)['var_percentage']
+            rows.append({'ticker': ticker, 'confidence': confidence, 'arch_var': reference, 'batch_var': batched,
+                         'rel_diff': abs(batched - reference) / abs(reference)})
+    sequential_seconds = time.perf_counter() - start
+
+    results = pd.DataFrame(rows)
+    print(f"tickers={len(batch.tickers)} dist={args.dist}")
+    print(f"sequential arch fits: {sequential_seconds:.3f}s")
+    print(f"batched NumPy fit:    {batch_seconds:.3f}s ({batch.iterations} iterations)")
+    print(f"max relative VaR difference: {results['rel_diff'].max():.2e} ({results.loc[results['rel_diff'].idxmax(), 'ticker']})")
+
+
+def bench_zoo(args):
+    from model_zoo import DEFAULT_CANDIDATES, select_models
+
+    panel = load_panel(list(NIFTY_50_STOCKS.keys())[:args.tickers])
+    returns = {ticker: panel.series(ticker) for ticker in panel.tickers}
+    start = time.perf_counter()
+    selections = select_models(returns, criterion=args.criterion, workers=args.workers)
+    seconds = time.perf_counter() - start
+
+    winners = pd.Series([selection['selected'] for selection in selections.values()]).value_counts()
+    print(f"tickers={len(returns)} candidates={len(DEFAULT_CANDIDATES)} criterion={args.criterion} workers={args.workers}")
+    print(f"model selection: {seconds:.3f}s ({seconds / max(len(returns), 1):.3f}s per ticker)")
+    print(winners.to_string())
+
+
+def bench_garchx(args):
+    from feature_store import FeatureStore
+    from garch_model import GARCHXVaRModel, garchx_rolling_backtest
+
+    returns = load_panel([args.ticker]).series(args.ticker)
+    start_date = args.start or returns.index[-args.days].strftime('%Y-%m-%d')
+    store = FeatureStore()
+    if args.csv:
+        store.import_csv(args.features, args.csv)
+    if args.features in store.names():
+        features = store.pca(args.features, args.components, fit_until=start_date)
+        source = f"feature store '{args.features}' ({len(store.load(args.features).columns)} columns -> {args.components} PCs)"
+    else:
+        # Without stored embeddings, time the estimator on random features of the same shape.
+        rng = np.random.default_rng(0)
+        features = pd.DataFrame(rng.standard_normal((len(returns), args.components)), index=returns.index)
+        source = f"{args.components} synthetic features (no '{args.features}' store found)"
+
+    start = time.perf_counter()
+    results = garchx_rolling_backtest(returns, features, start_date=start_date, refit_every=args.refit_every)
+    seconds = time.perf_counter() - start
+    print(f"ticker={args.ticker} from {start_date}: {len(results)} daily forecasts, {source}")
+    print(f"rolling GARCH-X backtest: {seconds:.3f}s ({seconds / max(len(results), 1) * 1000:.1f}ms per day)")
+    print(f"breach rate: {results['var_breach'].mean() * 100:.2f}%")
+
+
+def bench_forecast(args):
+    from garch_model import GARCHVaRModel, BatchGARCHModel, garch_variance_term_structure, forecast_parity
+
+    panel = load_panel(list(NIFTY_50_STOCKS.keys())[:args.tickers])
+    models = {ticker: GARCHVaRModel(panel.series(ticker)) for ticker in panel.tickers}
+    models = {ticker: model for ticker, model in models.items() if model.fit()}
+    parity = pd.Series({ticker: forecast_parity(model, args.horizon) for ticker, model in models.items()})
+
+    start = time.perf_counter()
+    for model in models.values():
+        model.forecast_volatility(args.horizon, use_arch=True)
+    arch_seconds = time.perf_counter() - start
+
+    batch = BatchGARCHModel.from_panel(panel)
+    batch.fit()
+    params = pd.DataFrame(batch.params).T
+    next_variance = np.array([batch.get_model(ticker).next_variance() for ticker in params.index])
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        garch_variance_term_structure(params['omega'].to_numpy(), params['alpha'].to_numpy(), params['beta'].to_numpy(), next_variance, args.horizon)
+    closed_form_seconds = (time.perf_counter() - start) / args.repeat
+
+    print(f"tickers={len(models)} horizon={args.horizon}")
+    print(f"arch forecast, one call per ticker: {arch_seconds * 1000:.2f}ms")
+    print(f"closed form, all tickers at once:   {closed_form_seconds * 1000:.4f}ms")
+    print(f"max relative variance gap vs arch:  {parity.max():.2e} ({parity.idxmax()})")
+    drifted = parity[parity > args.tolerance]
+    if not drifted.empty:
+        raise SystemExit(f"closed-form forecast drifts from arch beyond {args.tolerance:.0e}: "
+                         + ', '.join(f"{ticker}={gap:.2e}" for ticker, gap in drifted.items()))
+    print(f"parity within {args.tolerance:.0e}: ok")
+
+
+def bench_hs(args):
+    from garch_model import rolling_historical_var
+
+    panel = load_panel(list(NIFTY_50_STOCKS.keys())[:args.tickers])
+    returns = pd.DataFrame(np.where(panel.mask, panel.values, np.nan), index=pd.DatetimeIndex(panel.dates), columns=panel.tickers)
+
+    start = time.perf_counter()
+    result = rolling_historical_var(returns, args.window, args.horizon, VAR_CONFIDENCE_LEVELS)
+    sliding_seconds = time.perf_counter() - start
+
+    # Reference: re-sort every window through pandas, one quantile at a time.
+    start = time.perf_counter()
+    sums = (returns * 100).rolling(args.horizon).sum().shift(-(args.horizon - 1))
+    gap = 0.0
+    for idx, confidence in enumerate(VAR_CONFIDENCE_LEVELS):
+        reference = sums.rolling(args.window - args.horizon + 1, min_periods=1).quantile(1 - confidence).shift(args.horizon)
+        gap = max(gap, float(np.nanmax(np.abs(reference.reindex(result['dates']).to_numpy() - result['var'][:, idx, :]))))
+    pandas_seconds = time.perf_counter() - start
+
+    print(f"tickers={len(panel.tickers)} dates={len(result['dates'])} window={args.window} horizon={args.horizon}")
+    print(f"sliding tail order statistics (VaR + ES): {sliding_seconds:.2f}s")
+    print(f"pandas rolling quantile (VaR only):       {pandas_seconds:.2f}s")
+    print(f"max VaR gap vs pandas:                    {gap:.2e}")
+
+
+def _timed_subprocess(code: str) -> float:
+    # A fresh interpreter per measurement, so nothing is already imported or cached.
+    import subprocess
+    import sys
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def bench_startup(args):
+    import_app = _timed_subprocess("import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)")
+    import_agent = _timed_subprocess("import time; t = time.perf_counter(); import news_agent; print(time.perf_counter() - t)")
+    agent_ready = _timed_subprocess("import time; t = time.perf_counter(); import news_agent; "
+                                    "agent = news_agent.NewsEmbeddingAgent(); agent.wait_until_ready(); print(time.perf_counter() - t)")
+    agent_created = _timed_subprocess("import time; t = time.perf_counter(); import news_agent; "
+                                      "agent = news_agent.NewsEmbeddingAgent(); agent.start_loading(); print(time.perf_counter() - t)")
+    first_render = _timed_subprocess("import os, time; os.environ['CACHE_WARMER_ENABLED'] = '0'; "
+                                     "from streamlit.testing.v1 import AppTest; t = time.perf_counter(); "
+                                     f"AppTest.from_file({os.path.abspath('app.py')!r}, default_timeout=600).run(); print(time.perf_counter() - t)")
+    print(f"import app (everything the dashboard needs): {import_app:.2f}s")
+    print(f"first render of the dashboard (AppTest):     {first_render:.2f}s")
+    print(f"import news_agent:                           {import_agent:.2f}s")
+    print(f"agent usable by the chat panel (warming up): {agent_created:.2f}s")
+    print(f"agent models loaded (old blocking path):     {agent_ready:.2f}s")
+
+
+def bench_index(args):
+    import tempfile
+    from vector_index import VectorIndex
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.rows, args.dim)).astype(np.float32)
+    queries = vectors[rng.integers(0, args.rows, args.queries)] + 0.5 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    texts = [str(row) for row in range(args.rows)]
+
+    def encode(batch):
+        return vectors[[int(text) for text in batch]]
+
+    # Previous approach: normalise the whole matrix and fully sort the similarities per query.
+    start = time.perf_counter()
+    for query in queries:
+        similarities = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)) @ (query / np.linalg.norm(query))
+        exact = np.argsort(similarities)[::-1][:args.k]
+    sort_seconds = (time.perf_counter() - start) / args.queries
+
+    results = {}
+    for quantize in (False, True):
+        with tempfile.TemporaryDirectory() as root:
+            index = VectorIndex(root, quantize=quantize)
+            start = time.perf_counter()
+            index.add(texts, [{} for _ in texts], encode)
+            build_seconds = time.perf_counter() - start
+            index.add(texts, [{} for _ in texts], encode)
+            start = time.perf_counter()
+            hits = [[hit['row'] for hit in index.search(query, args.k)] for query in queries]
+            results[quantize] = (build_seconds, (time.perf_counter() - start) / args.queries, hits)
+
+    recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(results[False][2], results[True][2])])
+    print(f"rows={args.rows} dim={args.dim} k={args.k} queries={args.queries}")
+    print(f"normalise + full argsort per query: {sort_seconds * 1000:.2f}ms")
+    for quantize, label in ((False, 'float32'), (True, 'int8')):
+        build_seconds, search_seconds, _ = results[quantize]
+        print(f"{label:>7} index: build {build_seconds:.2f}s, query {search_seconds * 1000:.2f}ms")
+    print(f"int8 top-{args.k} recall vs float32: {recall:.3f}")
+
+
+def _news_embeddings():
+    # Embeddings of the repo's news corpus: the agent's on-disk index if it has been built, else encoded here.
+    from config import VECTOR_INDEX_DIR
+    from vector_index import VectorIndex
+    from news_agent import EMBEDDING_MODEL, load_news_corpus
+    stored = VectorIndex(os.path.join(VECTOR_INDEX_DIR, EMBEDDING_MODEL), ann=False)
+    if len(stored):
+        vectors, scales = stored._open()
+        return np.asarray(vectors, dtype=np.float32) if scales is None else np.asarray(vectors, dtype=np.float32) * scales[:, None]
+    from sentence_transformers import SentenceTransformer
+    texts = list(dict.fromkeys(f"{article.get('title', '')} - {article.get('description', '')} - {article.get('content', '')}" for article in load_news_corpus()))
+    return SentenceTransformer(EMBEDDING_MODEL).encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+def bench_ann(args):
+    import tempfile
+    from vector_index import VectorIndex
+
+    rng = np.random.default_rng(0)
+    vectors, source = None, 'synthetic'
+    if args.source == 'news':
+        try:
+            vectors, source = _news_embeddings(), 'news corpus'
+        except ImportError as e:
+            print(f"news corpus unavailable ({e}); using synthetic embeddings")
+    if vectors is None:
+        # Topic-clustered embeddings: headlines bunch around stories rather than filling the sphere evenly.
+        centers = rng.standard_normal((max(args.rows // 200, 1), args.dim)).astype(np.float32)
+        vectors = centers[rng.integers(0, len(centers), args.rows)] + args.spread * rng.standard_normal((args.rows, args.dim)).astype(np.float32)
+    order = rng.permutation(len(vectors))
+    queries, vectors = vectors[order[:args.queries]], vectors[order[args.queries:]]
+    texts = [str(row) for row in range(len(vectors))]
+
+    def encode(batch):
+        return vectors[[int(text) for text in batch]]
+
+    with tempfile.TemporaryDirectory() as root:
+        # Train on the first half, then insert the second half incrementally.
+        half = len(texts) // 2
+        index = VectorIndex(root, quantize=args.quantize, ann=True, n_lists=args.lists, ann_min_rows=half)
+        start = time.perf_counter()
+        index.add(texts[:half], [{} for _ in texts[:half]], encode)
+        train_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        index.add(texts[half:], [{} for _ in texts[half:]], encode)
+        insert_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        index = VectorIndex(root, ann=True)
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        truth = [{hit['row'] for hit in index.search(query, args.k, exact=True)} for query in queries]
+        exact_seconds = (time.perf_counter() - start) / len(queries)
+        print(f"source={source} rows={len(vectors)} dim={vectors.shape[1]} lists={index.ivf_meta['lists']} k={args.k} queries={len(queries)}")
+        print(f"train on {half} rows: {train_seconds:.2f}s, insert {len(texts) - half} rows: {insert_seconds:.2f}s, reopen: {load_seconds * 1000:.1f}ms")
+        print(f"exact: {exact_seconds * 1000:.2f}ms/query")
+        for n_probe in args.nprobe:
+            start = time.perf_counter()
+            hits = [{hit['row'] for hit in index.search(query, args.k, n_probe=n_probe)} for query in queries]
+            seconds = (time.perf_counter() - start) / len(queries)
+            recall = np.mean([len(found & expected) / len(expected) for found, expected in zip(hits, truth)])
+            print(f"n_probe={n_probe:>4}: {seconds * 1000:.2f}ms/query, recall@{args.k} {recall:.3f}")
+
+
+def bench_lexical(args):
+    from lexical_index import BM25Index, ticker_query
+    from news_agent import EMBEDDING_MODEL, load_news_corpus
+
+    texts = [f"{article.get('title', '')} - {article.get('description', '')} - {article.get('content', '')}" for article in load_news_corpus()]
+    texts = list(dict.fromkeys(texts)) * args.copies
+    queries = ['ADANIENT', 'latest Infosys news', 'RELIANCE.NS', 'why is ADANIENT VaR so high?', 'central bank interest rates', 'oil prices and energy stocks']
+
+    start = time.perf_counter()
+    index = BM25Index()
+    index.add(texts)
+    build_seconds = time.perf_counter() - start
+    print(f"documents={len(index)} build {build_seconds:.2f}s")
+    for query in queries:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            tickers = ticker_query(query)
+            hits = index.search(query, 50)
+            index.ticker_rows(tickers)
+        seconds = (time.perf_counter() - start) / args.repeat
+        print(f"{query!r:>34}: {'lexical only' if tickers else 'BM25 leg    '} {seconds * 1000:.2f}ms, {len(hits)} hits")
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        print("sentence-transformers not installed; query encoding cost not measured")
+        return
+    encoder = SentenceTransformer(EMBEDDING_MODEL)
+    encoder.encode(queries[:1])
+    start = time.perf_counter()
+    for query in queries:
+        encoder.encode([query], convert_to_numpy=True, normalize_embeddings=True)
+    print(f"query encoding skipped by the fast path: {(time.perf_counter() - start) / len(queries) * 1000:.2f}ms/query")
+
+
+def bench_stream(args):
+    from news_agent import NewsEmbeddingAgent
+
+    agent = NewsEmbeddingAgent()
+    agent.wait_until_ready()
+    if agent.llm_model is None:
+        print(f"language model unavailable ({agent.status()['errors'].get('llm')}); nothing to measure")
+        return
+    print(f"model={agent.model_name} ({agent.model_type}, {agent.device})")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        agent.chat_completion(args.prompt)
+        blocking_seconds = time.perf_counter() - start
+        stats = {}
+        for _ in agent.stream_chat_completion(args.prompt, stats=stats):
+            pass
+        print(f"blocking reply {blocking_seconds:.2f}s | streamed: first token {stats['ttft']:.2f}s, "
+              f"{stats['tokens']} tokens in {stats['seconds']:.2f}s, {stats['tokens_per_second']:.1f} tokens/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    garch = subparsers.add_parser('garch', help='Batched NumPy GARCH vs sequential arch fits')
+    garch.add_argument('--dist', choices=['normal', 't'], default='normal')
+    garch.add_argument('--tickers', type=int, default=len(NIFTY_50_STOCKS))
+    garch.set_defaults(func=bench_garch)
+
+    zoo = subparsers.add_parser('zoo', help='Model-zoo selection over the universe')
+    zoo.add_argument('--criterion', choices=['aic', 'bic', 'backtest'], default='bic')
+    zoo.add_argument('--tickers', type=int, default=len(NIFTY_50_STOCKS))
+    zoo.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    zoo.set_defaults(func=bench_zoo)
+
+    garchx = subparsers.add_parser('garchx', help='Rolling GARCH-X evaluation on stored news features')
+    garchx.add_argument('--ticker', default='RELIANCE.NS')
+    garchx.add_argument('--features', default='news_embeddings', help='Feature store entry name')
+    garchx.add_argument('--csv', help='Import this CSV (e.g. data_with_embeddings.csv) into the store first')
+    garchx.add_argument('--components', type=int, default=8)
+    garchx.add_argument('--start', help='First forecast date (default: the last --days trading days)')
+    garchx.add_argument('--days', type=int, default=252)
+    garchx.add_argument('--refit-every', type=int, default=1)
+    garchx.set_defaults(func=bench_garchx)
+
+    forecast = subparsers.add_parser('forecast', help='Closed-form GARCH(1,1) term structure vs arch forecast, with parity check')
+    forecast.add_argument('--tickers', type=int, default=len(NIFTY_50_STOCKS))
+    forecast.add_argument('--horizon', type=int, default=VAR_PREDICTION_DAYS)
+    forecast.add_argument('--repeat', type=int, default=100)
+    forecast.add_argument('--tolerance', type=float, default=FORECAST_PARITY_TOLERANCE, help='Largest relative variance gap vs arch before failing')
+    forecast.set_defaults(func=bench_forecast)
+
+    hs = subparsers.add_parser('hs', help='Rolling historical-simulation VaR vs pandas rolling quantiles')
+    hs.add_argument('--tickers', type=int, default=len(NIFTY_50_STOCKS))
+    hs.add_argument('--window', type=int, default=252)
+    hs.add_argument('--horizon', type=int, default=VAR_PREDICTION_DAYS)
+    hs.set_defaults(func=bench_hs)
+
+    startup = subparsers.add_parser('startup', help='App import and assistant model loading time, each in a fresh interpreter')
+    startup.set_defaults(func=bench_startup)
+
+    index = subparsers.add_parser('index', help='Memory-mapped news vector index on synthetic embeddings')
+    index.add_argument('--rows', type=int, default=200000)
+    index.add_argument('--dim', type=int, default=384)
+    index.add_argument('--k', type=int, default=10)
+    index.add_argument('--queries', type=int, default=50)
+    index.set_defaults(func=bench_index)
+
+    ann = subparsers.add_parser('ann', help='IVF recall vs latency against exact search, on the news corpus embeddings when available')
+    ann.add_argument('--source', choices=['news', 'synthetic'], default='news')
+    ann.add_argument('--rows', type=int, default=200000, help='Synthetic rows')
+    ann.add_argument('--dim', type=int, default=384, help='Synthetic dimension')
+    ann.add_argument('--spread', type=float, default=1.5, help='Synthetic within-topic noise')
+    ann.add_argument('--lists', type=int, default=0, help='IVF lists (0: square root of the rows)')
+    ann.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    ann.add_argument('--quantize', action='store_true')
+    ann.add_argument('--k', type=int, default=10)
+    ann.add_argument('--queries', type=int, default=100)
+    ann.set_defaults(func=bench_ann)
+
+    lexical = subparsers.add_parser('lexical', help='BM25 news index build and query latency, and the encoder time the ticker fast path saves')
+    lexical.add_argument('--copies', type=int, default=1, help='Repeat the corpus to simulate a larger archive')
+    lexical.add_argument('--repeat', type=int, default=20)
+    lexical.set_defaults(func=bench_lexical)
+
+    stream = subparsers.add_parser('stream', help='Time to first token and tokens/s of streamed chat replies vs the blocking reply')
+    stream.add_argument('--prompt', default='What is VaR and how it is calculated?')
+    stream.add_argument('--repeat', type=int, default=3)
+    stream.set_defaults(func=bench_stream)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import threading
+import time
+from typing import List, Dict, Optional
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import NIFTY_50_STOCKS, CACHE_WARM_INTERVAL, CACHE_WARMER_ENABLED
+from market_data_loader import sync_tickers
+from garch_model import GARCHVaRModel, OnlineGARCHFilter
+from model_cache import FittedModelCache
+from model_registry import ModelRegistry, get_model_registry
+from returns_panel import ReturnsPanel
+
+
+class CacheWarmer:
+    """
+    Background thread that keeps prices and fitted GARCH models for a ticker universe warm.
+
+    Each refresh brings the price store up to date and then swaps the finished results in
+    at once, so readers only ever see a complete snapshot. The first refresh loads the
+    default GARCHVaRModel per ticker through the model registry, so a restart reuses the
+    latest valid artifact instead of running the optimizer; later refreshes feed only the
+    new returns through an OnlineGARCHFilter and refit just the tickers it flags. Refreshes repeat every
+    `interval` seconds, ahead of the hourly cache expiry used by market_data_loader.
+    """
+    def __init__(self, tickers: List[str] = None, interval: int = CACHE_WARM_INTERVAL, registry: Optional[ModelRegistry] = None):
+        self.tickers = tickers or list(NIFTY_50_STOCKS.keys()) + ['^NSEI']
+        self.interval = interval
+        self.registry = registry or ModelRegistry(model_cache=FittedModelCache())
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._data = {}
+        self._panels = {}
+        self._models = {}
+        self._online = None
+        self._status = {'phase': 'idle', 'done': 0, 'total': len(self.tickers), 'last_refresh': None, 'errors': {}}
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def _set_status(self, **kwargs):
+        with self._lock:
+            self._status.update(kwargs)
+
+    def refresh(self):
+        errors = {}
+        self._set_status(phase='prices', done=0, total=len(self.tickers))
+
+        def on_ticker_done(ticker, df, error):
+            if error is not None:
+                errors[ticker] = str(error)
+            with self._lock:
+                self._status['done'] += 1
+
+        try:
+            data = {ticker: df for ticker, df in sync_tickers(self.tickers, on_ticker_done=on_ticker_done, max_age=0).items() if not df.empty}
+        except Exception as e:
+            self._set_status(phase='failed', errors={'*': str(e)})
+            return
+
+        with self._lock:
+            previous_data, previous_models, online = self._data, self._models, self._online
+        # Readers keep using the published filter until the swap below, so work on a copy.
+        if online is not None:
+            online = online.copy()
+
+        # Tickers whose stored history simply grew since the last refresh only need their
+        # new returns absorbed; everything else is (re)fitted.
+        new_returns = {}
+        for ticker, df in data.items():
+            old = previous_data.get(ticker)
+            if (online is not None and ticker in online.ticker_index and ticker in previous_models and old is not None
+                    and len(df) >= len(old) and df['Date'].iloc[len(old) - 1] == old['Date'].iloc[-1]):
+                new_returns[ticker] = df['returns'].iloc[len(old):].dropna().tolist()
+        if new_returns:
+            online.update(new_returns)
+            flagged = online.needs_refit()
+            refit = [ticker for ticker in data if ticker not in new_returns or flagged[ticker]]
+        else:
+            refit = list(data.keys())
+
+        self._set_status(phase='models', done=0, total=len(refit))
+        models = {}
+        for ticker, df in data.items():
+            returns = df.set_index('Date')['returns'].dropna()
+            if ticker in refit:
+                # Flagged tickers need new parameters; first-time tickers may reuse a registry artifact.
+                model = self.registry.refit(ticker, returns) if ticker in new_returns else self.registry.load_or_fit(ticker, returns)
+                if model is not None:
+                    models[ticker] = model
+                    if online is not None and ticker in online.ticker_index:
+                        online.reset(ticker, model.get_params(), model.next_variance())
+                else:
+                    errors[ticker] = "GARCH fit failed"
+                with self._lock:
+                    self._status['done'] += 1
+            elif new_returns[ticker]:
+                models[ticker] = GARCHVaRModel.from_params(returns, previous_models[ticker].get_params())
+            else:
+                models[ticker] = previous_models[ticker]
+
+        if online is None or any(ticker not in online.ticker_index for ticker in models):
+            online = OnlineGARCHFilter.from_models(models)
+
+        with self._lock:
+            self._data = data
+            self._panels = {}
+            self._models = models
+            self._online = online
+            self._status.update(phase='ready', last_refresh=time.time(), errors=errors)
+
+    def get_data(self, ticker: str) -> Optional[pd.DataFrame]:
+        """
+        Latest warmed price history for a ticker, or None if it has not been warmed yet.
+        """
+        with self._lock:
+            return self._data.get(ticker)
+
+    def is_warm(self) -> bool:
+        """
+        Whether a first snapshot is available; before that get_data and get_panel return None.
+        """
+        with self._lock:
+            return self._status['last_refresh'] is not None
+
+    def get_panel(self, tickers: List[str]) -> Optional[ReturnsPanel]:
+        """
+        Aligned returns panel of the warmed tickers among `tickers` from the current snapshot,
+        built once per snapshot and ticker set, or None before the first refresh.
+        """
+        key = tuple(tickers)
+        with self._lock:
+            if self._status['last_refresh'] is None:
+                return None
+            data, panel = self._data, self._panels.get(key)
+        if panel is None:
+            panel = ReturnsPanel.from_frames({ticker: data[ticker] for ticker in key if ticker in data})
+            with self._lock:
+                if self._data is data:
+                    self._panels[key] = panel
+        return panel
+
+    def get_model(self, ticker: str, returns: pd.Series) -> Optional[GARCHVaRModel]:
+        """
+        Warmed GARCH model for a ticker if it was fitted on exactly these returns.
+        """
+        with self._lock:
+            model = self._models.get(ticker)
+        if model is None or len(model.returns) != len(returns):
+            return None
+        if not np.array_equal(model.returns.to_numpy(), (returns * 100).to_numpy()):
+            return None
+        return model
+
+    def get_universe_var(self) -> pd.DataFrame:
+        """
+        Next-day and cumulative VaR for every warmed ticker straight from the online filter state.
+        """
+        with self._lock:
+            online = self._online
+        if online is None:
+            return pd.DataFrame()
+        return online.calculate_var()
+
+    def status(self) -> Dict:
+        """
+        Snapshot of the warmer's progress and staleness.
+
+        Returns:
+            Dict: 'phase', 'done', 'total', 'last_refresh', 'age' (seconds, or None), 'stale' and 'errors'.
+        """
+        with self._lock:
+            status = dict(self._status)
+        last_refresh = status['last_refresh']
+        status['age'] = time.time() - last_refresh if last_refresh else None
+        status['stale'] = status['age'] is None or status['age'] > self.interval * 1.5
+        return status
+
+
+@st.cache_resource
+def get_cache_warmer() -> Optional[CacheWarmer]:
+    if not CACHE_WARMER_ENABLED:
+        return None
+    warmer = CacheWarmer(registry=get_model_registry())
+    warmer.start()
+    return warmer
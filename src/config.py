@@ -54,14 +54,118 @@ NIFTY_50_STOCKS={
     'WIPRO.NS':'IT'
 }
 
+# Names headlines use for each constituent, matched alongside the bare symbol by the news retrieval.
+NIFTY_50_COMPANY_NAMES={
+    'ADANIENT.NS':['Adani Enterprises'],
+    'ADANIPORTS.NS':['Adani Ports'],
+    'APOLLOHOSP.NS':['Apollo Hospitals'],
+    'ASIANPAINT.NS':['Asian Paints'],
+    'AXISBANK.NS':['Axis Bank'],
+    'BAJAJ-AUTO.NS':['Bajaj Auto'],
+    'BAJFINANCE.NS':['Bajaj Finance'],
+    'BAJAJFINSV.NS':['Bajaj Finserv'],
+    'BPCL.NS':['Bharat Petroleum'],
+    'BHARTIARTL.NS':['Bharti Airtel','Airtel'],
+    'BRITANNIA.NS':['Britannia'],
+    'CIPLA.NS':['Cipla'],
+    'COALINDIA.NS':['Coal India'],
+    'DRREDDY.NS':["Dr Reddy's",'Dr Reddys'],
+    'EICHERMOT.NS':['Eicher Motors'],
+    'GRASIM.NS':['Grasim'],
+    'HCLTECH.NS':['HCL Technologies','HCL Tech'],
+    'HDFCBANK.NS':['HDFC Bank'],
+    'HDFCLIFE.NS':['HDFC Life'],
+    'HEROMOTOCO.NS':['Hero MotoCorp'],
+    'HINDALCO.NS':['Hindalco'],
+    'HINDUNILVR.NS':['Hindustan Unilever','HUL'],
+    'ICICIBANK.NS':['ICICI Bank'],
+    'ITC.NS':['ITC'],
+    'INFY.NS':['Infosys'],
+    'INDUSINDBK.NS':['IndusInd Bank'],
+    'JSWSTEEL.NS':['JSW Steel'],
+    'KOTAKBANK.NS':['Kotak Mahindra Bank','Kotak Bank'],
+    'LT.NS':['Larsen & Toubro','L&T'],
+    'M&M.NS':['Mahindra & Mahindra'],
+    'MARUTI.NS':['Maruti Suzuki','Maruti'],
+    'NESTLEIND.NS':['Nestle India'],
+    'NTPC.NS':['NTPC'],
+    'ONGC.NS':['ONGC'],
+    'POWERGRID.NS':['Power Grid'],
+    'RELIANCE.NS':['Reliance Industries','Reliance','RIL'],
+    'SBIN.NS':['State Bank of India','SBI'],
+    'SBILIFE.NS':['SBI Life'],
+    'SHRIRAMFIN.NS':['Shriram Finance'],
+    'SUNPHARMA.NS':['Sun Pharma','Sun Pharmaceutical'],
+    'TCS.NS':['Tata Consultancy Services','TCS'],
+    'TATASTEEL.NS':['Tata Steel'],
+    'TATACONSUM.NS':['Tata Consumer'],
+    'TECHM.NS':['Tech Mahindra'],
+    'TITAN.NS':['Titan'],
+    'TRENT.NS':['Trent'],
+    'ULTRACEMCO.NS':['UltraTech Cement','UltraTech'],
+    'WIPRO.NS':['Wipro']
+}
+
 VAR_CONFIDENCE_LEVELS = [0.95, 0.99]
 VAR_PREDICTION_DAYS = 7
 HISTORICAL_DATA_START_DATE = '2020-01-01'
 
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+PRICE_STORE_DIR = os.getenv('PRICE_STORE_DIR', os.path.join(DATA_DIR, 'price_store'))
+PRICE_STORE_MAX_AGE = int(os.getenv('PRICE_STORE_MAX_AGE', 3600))
+
+MARKET_DATA_PROVIDER = os.getenv('MARKET_DATA_PROVIDER', 'yfinance')
+ARCHIVE_PRICE_DIR = os.getenv('ARCHIVE_PRICE_DIR', os.path.join(DATA_DIR, 'archive (1)', 'NifSent', 'NIFTY 50'))
+ARCHIVE_CACHE_DIR = os.getenv('ARCHIVE_CACHE_DIR', os.path.join(DATA_DIR, 'archive_cache'))
+FEATURE_STORE_DIR = os.getenv('FEATURE_STORE_DIR', os.path.join(DATA_DIR, 'feature_store'))
+DOWNLOAD_BATCH_SIZE = int(os.getenv('DOWNLOAD_BATCH_SIZE', 8))
+DOWNLOAD_MAX_WORKERS = int(os.getenv('DOWNLOAD_MAX_WORKERS', 4))
+DOWNLOAD_TIMEOUT = float(os.getenv('DOWNLOAD_TIMEOUT', 20))
+DOWNLOAD_RETRIES = int(os.getenv('DOWNLOAD_RETRIES', 2))
+
+CACHE_WARMER_ENABLED = os.getenv('CACHE_WARMER_ENABLED', '1') == '1'
+CACHE_WARM_INTERVAL = int(os.getenv('CACHE_WARM_INTERVAL', 3000))
+
 GARCH_P=1
 GARCH_Q=1
 
+MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', os.path.join(DATA_DIR, 'model_cache'))
+MODEL_CACHE_SIZE = int(os.getenv('MODEL_CACHE_SIZE', 256))
+MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', os.path.join(DATA_DIR, 'model_registry'))
+MODEL_REGISTRY_MAX_STALE_DAYS = int(os.getenv('MODEL_REGISTRY_MAX_STALE_DAYS', 20))
+MODEL_REGISTRY_KEEP = int(os.getenv('MODEL_REGISTRY_KEEP', 5))
+MODEL_SELECTION_DIR = os.getenv('MODEL_SELECTION_DIR', os.path.join(MODEL_CACHE_DIR, 'selection'))
+
+GARCH_REFIT_EVERY = int(os.getenv('GARCH_REFIT_EVERY', 20))
+GARCH_DRIFT_Z = float(os.getenv('GARCH_DRIFT_Z', 3.0))
+# Closed-form and arch GARCH(1,1) variance forecasts agree to rounding (~1e-16 relative).
+FORECAST_PARITY_TOLERANCE = float(os.getenv('FORECAST_PARITY_TOLERANCE', 1e-10))
+
+EWMA_LAMBDA = float(os.getenv('EWMA_LAMBDA', 0.94))
+DCC_A = float(os.getenv('DCC_A', 0.02))
+DCC_B = float(os.getenv('DCC_B', 0.97))
+
+BACKTEST_WORKERS = int(os.getenv('BACKTEST_WORKERS', os.cpu_count() or 1))
+RESULT_STORE_PATH = os.getenv('RESULT_STORE_PATH', os.path.join(DATA_DIR, 'results.sqlite'))
+
+MODEL_ZOO_CRITERION = os.getenv('MODEL_ZOO_CRITERION', 'bic')
+MODEL_ZOO_HOLDOUT = int(os.getenv('MODEL_ZOO_HOLDOUT', 250))
+MODEL_ZOO_WORKERS = int(os.getenv('MODEL_ZOO_WORKERS', os.cpu_count() or 1))
+
+SIMULATION_PATHS = int(os.getenv('SIMULATION_PATHS', 50000))
+SIMULATION_CHUNK_SIZE = int(os.getenv('SIMULATION_CHUNK_SIZE', 10000))
+SIMULATION_SEED = int(os.getenv('SIMULATION_SEED', 42))
+SIMULATION_WORKERS = int(os.getenv('SIMULATION_WORKERS', 1))
+
 NEWS_API_KEY = os.getenv('NEWS_API_KEY','')
+NEWS_ARCHIVE_PATH = os.getenv('NEWS_ARCHIVE_PATH', os.path.join(DATA_DIR, 'archive', 'financial_news_events.json'))
+NEWS_HEADLINES_PATH = os.getenv('NEWS_HEADLINES_PATH', os.path.join(DATA_DIR, 'consolidated_nifty_news.csv'))
+VECTOR_INDEX_DIR = os.getenv('VECTOR_INDEX_DIR', os.path.join(DATA_DIR, 'vector_index'))
+VECTOR_INDEX_QUANTIZE = os.getenv('VECTOR_INDEX_QUANTIZE', '0') == '1'
+VECTOR_INDEX_ANN = os.getenv('VECTOR_INDEX_ANN', '0') == '1'
+VECTOR_INDEX_ANN_MIN_ROWS = int(os.getenv('VECTOR_INDEX_ANN_MIN_ROWS', 20000))
+VECTOR_INDEX_NLIST = int(os.getenv('VECTOR_INDEX_NLIST', 0))
+VECTOR_INDEX_NPROBE = int(os.getenv('VECTOR_INDEX_NPROBE', 16))
 
 HF_MODEL_NAME = os.getenv('HF_MODEL_NAME','google/flan-t5-base')
 
@@ -0,0 +1,189 @@
+import os
+import time
+from typing import List, Dict
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from config import (MARKET_DATA_PROVIDER, DOWNLOAD_TIMEOUT, DOWNLOAD_RETRIES,
+                    ARCHIVE_PRICE_DIR, ARCHIVE_CACHE_DIR)
+
+
+class MarketDataProvider:
+    """
+    Interface for daily OHLCV sources used by market_data_loader.
+
+    Implementations return one frame per ticker covering [start_date, end_date), indexed
+    by date or carrying a 'Date' column. Tickers the source has no data for may be omitted.
+    Sources that are already local set use_price_store to False so their data is not
+    copied into the on-disk price store.
+    """
+    name = 'base'
+    use_price_store = True
+
+    def download(self, tickers: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+        raise NotImplementedError
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Yahoo Finance provider that fetches a whole group of tickers in one request.
+    """
+    name = 'yfinance'
+
+    def __init__(self, timeout: float = DOWNLOAD_TIMEOUT):
+        self.timeout = timeout
+
+    def download(self, tickers: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+        data = yf.download(tickers, start=start_date, end=end_date, group_by='ticker', threads=False, progress=False, timeout=self.timeout)
+        if data is None or data.empty:
+            return {}
+        if not isinstance(data.columns, pd.MultiIndex):
+            return {tickers[0]: data}
+
+        frames = {}
+        available = set(data.columns.get_level_values(0))
+        for ticker in tickers:
+            if ticker in available:
+                frame = data[ticker].dropna(how='all')
+                if not frame.empty:
+                    frames[ticker] = frame
+        return frames
+
+
+ARCHIVE_DTYPE = np.dtype([
+    ('Date', 'i8'),
+    ('Open', 'f4'),
+    ('High', 'f4'),
+    ('Low', 'f4'),
+    ('Close', 'f4'),
+    ('Volume', 'i8')
+])
+
+ARCHIVE_ALIASES = {
+    '^NSEI': 'NIFTY 50'
+}
+
+
+class ArchiveProvider(MarketDataProvider):
+    """
+    Offline provider that replays the NifSent NIFTY 50 CSV archive.
+
+    'TCS.NS' is served from TCS.csv and '^NSEI' from 'NIFTY 50.csv'. Each CSV is parsed once
+    into a packed binary cache (int64 dates, float32 prices, int64 volume) that is memory-mapped
+    on later loads, so repeated reads do not re-parse the CSV.
+    """
+    name = 'archive'
+    use_price_store = False
+
+    def __init__(self, archive_dir: str = ARCHIVE_PRICE_DIR, cache_dir: str = ARCHIVE_CACHE_DIR):
+        self.archive_dir = archive_dir
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _file_stem(self, ticker: str) -> str:
+        if ticker in ARCHIVE_ALIASES:
+            return ARCHIVE_ALIASES[ticker]
+        return ticker.replace('.NS', '').replace('&', '')
+
+    def _parse_csv(self, csv_path: str) -> np.ndarray:
+        frame = pd.read_csv(csv_path, thousands=',')
+        # Some files carry yfinance's multi-row header ('Price'/'Ticker'/'Date'); the extra
+        # header rows fail date parsing below and are dropped.
+        frame = frame.rename(columns={frame.columns[0]: 'Date', 'Volumes': 'Volume'})
+        frame['Date'] = pd.to_datetime(frame['Date'], format='mixed', errors='coerce')
+        frame = frame.dropna(subset=['Date'])
+        for column in ARCHIVE_DTYPE.names[1:]:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce') if column in frame.columns else np.nan
+        frame = frame.dropna(subset=['Close']).sort_values('Date').drop_duplicates('Date', keep='last')
+
+        packed = np.empty(len(frame), dtype=ARCHIVE_DTYPE)
+        packed['Date'] = frame['Date'].to_numpy(dtype='datetime64[ns]').view('i8')
+        for column in ('Open', 'High', 'Low', 'Close'):
+            packed[column] = frame[column].to_numpy(dtype='f4')
+        packed['Volume'] = frame['Volume'].fillna(0).to_numpy(dtype='i8')
+        return packed
+
+    def load_array(self, ticker: str) -> np.ndarray:
+        """
+        Return the packed price history for a ticker as a read-only memory-mapped array.
+
+        Args:
+            ticker (str): Stock ticker symbol, e.g. 'TCS.NS' or '^NSEI'.
+
+        Returns:
+            np.ndarray: Structured array with ARCHIVE_DTYPE fields sorted by date, empty if the ticker is not archived.
+        """
+        stem = self._file_stem(ticker)
+        csv_path = os.path.join(self.archive_dir, f"{stem}.csv")
+        if not os.path.exists(csv_path):
+            return np.empty(0, dtype=ARCHIVE_DTYPE)
+
+        cache_path = os.path.join(self.cache_dir, f"{stem}.npy")
+        if not os.path.exists(cache_path) or os.path.getmtime(cache_path) < os.path.getmtime(csv_path):
+            tmp_path = cache_path + '.tmp.npy'
+            np.save(tmp_path, self._parse_csv(csv_path))
+            os.replace(tmp_path, cache_path)
+        return np.load(cache_path, mmap_mode='r')
+
+    def download(self, tickers: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+        start = np.datetime64(start_date, 'ns').view('i8')
+        end = np.datetime64(end_date, 'ns').view('i8')
+        frames = {}
+        for ticker in tickers:
+            packed = self.load_array(ticker)
+            lo, hi = np.searchsorted(packed['Date'], [start, end])
+            if hi <= lo:
+                continue
+            window = packed[lo:hi]
+            frame = pd.DataFrame({column: window[column] for column in ARCHIVE_DTYPE.names[1:]})
+            frame.insert(0, 'Date', window['Date'].view('datetime64[ns]'))
+            frames[ticker] = frame
+        return frames
+
+
+def download_with_retries(provider: MarketDataProvider, tickers: List[str], start_date: str, end_date: str, retries: int = DOWNLOAD_RETRIES) -> Dict[str, pd.DataFrame]:
+    """
+    Call a provider, retrying with exponential backoff on errors.
+
+    Args:
+        provider (MarketDataProvider): Data source to call.
+        tickers (List[str]): Tickers to fetch in a single request.
+        start_date (str): Inclusive start date in 'YYYY-MM-DD' format.
+        end_date (str): Exclusive end date in 'YYYY-MM-DD' format.
+        retries (int): Number of retries after the first attempt.
+
+    Returns:
+        Dict[str, pd.DataFrame]: Frames keyed by ticker.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return provider.download(tickers, start_date, end_date)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+    return {}
+
+
+_PROVIDERS = {
+    'yfinance': YFinanceProvider,
+    'archive': ArchiveProvider,
+}
+
+_active_provider = None
+
+def get_provider() -> MarketDataProvider:
+    """
+    Return the process-wide data provider selected by MARKET_DATA_PROVIDER.
+    """
+    global _active_provider
+    if _active_provider is None:
+        _active_provider = _PROVIDERS.get(MARKET_DATA_PROVIDER, YFinanceProvider)()
+    return _active_provider
+
+def set_provider(provider: MarketDataProvider) -> None:
+    """
+    Override the process-wide data provider, e.g. with a local stand-in for offline runs.
+    """
+    global _active_provider
+    _active_provider = provider
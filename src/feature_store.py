@@ -0,0 +1,87 @@
+import os
+import json
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from config import FEATURE_STORE_DIR
+
+
+class FeatureStore:
+    """
+    Date-indexed feature matrices stored as memory-mapped binaries.
+
+    Each named matrix lives in its own directory as features.npy (float32, dates x columns),
+    dates.npy (datetime64[ns], sorted and unique) and a meta.json listing the column names.
+    Matrices are built once from the notebooks' CSV output and then opened with mmap_mode='r',
+    so loading the 1024-dimensional news embeddings does not re-parse any CSV.
+    """
+    def __init__(self, root: str = FEATURE_STORE_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _dir(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def names(self) -> List[str]:
+        return sorted(entry for entry in os.listdir(self.root) if os.path.exists(os.path.join(self._dir(entry), 'meta.json')))
+
+    def write(self, name: str, features: pd.DataFrame) -> None:
+        """
+        Store a date-indexed feature frame, averaging rows that share a date.
+        """
+        features = features.groupby(pd.DatetimeIndex(features.index).normalize()).mean().sort_index()
+        path = self._dir(name)
+        os.makedirs(path, exist_ok=True)
+        # Write under temporary names and swap the metadata in last, so readers never see a mix.
+        np.save(os.path.join(path, 'features.tmp.npy'), features.to_numpy(dtype=np.float32))
+        np.save(os.path.join(path, 'dates.tmp.npy'), features.index.to_numpy(dtype='datetime64[ns]'))
+        os.replace(os.path.join(path, 'features.tmp.npy'), os.path.join(path, 'features.npy'))
+        os.replace(os.path.join(path, 'dates.tmp.npy'), os.path.join(path, 'dates.npy'))
+        with open(os.path.join(path, 'meta.tmp.json'), 'w') as f:
+            json.dump({'columns': [str(column) for column in features.columns], 'rows': int(len(features))}, f)
+        os.replace(os.path.join(path, 'meta.tmp.json'), os.path.join(path, 'meta.json'))
+
+    def import_csv(self, name: str, csv_path: str, date_column: str = 'Date') -> None:
+        """
+        Build a store entry from a CSV with a date column, keeping only its numeric columns
+        (e.g. the embedding columns of data_with_embeddings.csv, not the headline text).
+        """
+        frame = pd.read_csv(csv_path, parse_dates=[date_column]).set_index(date_column)
+        self.write(name, frame.select_dtypes(include=[np.number]))
+
+    def load(self, name: str) -> pd.DataFrame:
+        """
+        Open a stored matrix as a date-indexed DataFrame backed by the memory-mapped array.
+        """
+        path = self._dir(name)
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        values = np.load(os.path.join(path, 'features.npy'), mmap_mode='r')
+        dates = np.load(os.path.join(path, 'dates.npy'))
+        return pd.DataFrame(values, index=pd.DatetimeIndex(dates, name='Date'), columns=meta['columns'], copy=False)
+
+    def pca(self, name: str, n_components: int, fit_until: Optional[str] = None) -> pd.DataFrame:
+        """
+        Principal-component scores of a stored matrix, standardised to unit variance.
+
+        The components, mean and scale are estimated only on rows up to fit_until, so
+        scores for later dates carry no look-ahead. Results are cached next to the matrix.
+        """
+        path = self._dir(name)
+        suffix = pd.Timestamp(fit_until).strftime('%Y%m%d') if fit_until else 'all'
+        cache_path = os.path.join(path, f"pca_{n_components}_{suffix}.npy")
+        features = self.load(name)
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(os.path.join(path, 'features.npy')):
+            scores = np.load(cache_path)
+        else:
+            values = np.asarray(features, dtype=np.float64)
+            fit_rows = values[:features.index.searchsorted(pd.Timestamp(fit_until), side='right')] if fit_until else values
+            mean = fit_rows.mean(axis=0)
+            _, _, components = np.linalg.svd(fit_rows - mean, full_matrices=False)
+            components = components[:n_components]
+            fit_scores = (fit_rows - mean) @ components.T
+            scale = fit_scores.std(axis=0)
+            scale[scale == 0] = 1.0
+            scores = ((values - mean) @ components.T) / scale
+            np.save(cache_path, scores)
+        return pd.DataFrame(scores, index=features.index, columns=[f"pc{i + 1}" for i in range(scores.shape[1])])
@@ -1,37 +1,154 @@
+import copy
+import warnings
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np 
 import pandas as pd
 from arch import arch_model
+from arch.univariate import ConstantMean, EWMAVariance, Normal, StudentsT, SkewStudent
 from scipy import stats
-from typing import Tuple, Dict
+from scipy.signal import lfilter
+from scipy.optimize import minimize
+from scipy.special import gammaln, digamma
+from typing import Tuple, Dict, List, Callable, Optional, Iterator
 import streamlit as st
-from config import GARCH_P, GARCH_Q, VAR_CONFIDENCE_LEVELS, VAR_PREDICTION_DAYS
+from config import (GARCH_P, GARCH_Q, VAR_CONFIDENCE_LEVELS, VAR_PREDICTION_DAYS, BACKTEST_WORKERS,
+                    GARCH_REFIT_EVERY, GARCH_DRIFT_Z, EWMA_LAMBDA)
+from returns_panel import ReturnsPanel
+
+ARCH_DISTRIBUTIONS = {
+    'normal': Normal,
+    't': StudentsT,
+    'skewt': SkewStudent
+}
+
+def distribution_parameter_names(dist: str) -> List[str]:
+    """
+    Shape parameters of an innovation distribution: none for 'normal', 'nu' for 't', 'eta' and 'lambda' for 'skewt'.
+    """
+    return list(ARCH_DISTRIBUTIONS[dist]().parameter_names())
+
+def garch_backcast(resid: np.ndarray) -> float:
+    # Same exponentially weighted initial variance arch uses to start the recursion.
+    tau = min(75, len(resid))
+    weights = 0.94 ** np.arange(tau)
+    return float(np.sum(resid[:tau] ** 2 * weights / weights.sum()))
+
+def garch_filter(returns: np.ndarray, mu: float, omega: float, alpha: float, beta: float, backcast: float = None) -> np.ndarray:
+    """
+    Conditional variances of a GARCH(1,1) with constant mean for the given parameters.
+    """
+    resid = returns - mu
+    if backcast is None:
+        backcast = garch_backcast(returns - returns.mean())
+    shocks = omega + alpha * np.concatenate(([backcast], resid[:-1] ** 2))
+    sigma2, _ = lfilter([1.0], [1.0, -beta], shocks, zi=[beta * backcast])
+    return sigma2
+
+def garch_variance_term_structure(omega, alpha, beta, next_variance, horizon: int) -> np.ndarray:
+    """
+    Closed-form GARCH(1,1) variance forecasts for days 1..horizon.
+
+    sigma2_{t+h} = omega * (1 - p^(h-1)) / (1 - p) + p^(h-1) * sigma2_{t+1} with p = alpha + beta,
+    which is omega * (h - 1) + sigma2_{t+1} when p = 1. Parameters are scalars or (N,) arrays.
+
+    Returns:
+        np.ndarray: (N, horizon) variances, or (horizon,) for scalar inputs.
+    """
+    omega, alpha, beta, next_variance = (np.asarray(value, dtype=np.float64) for value in (omega, alpha, beta, next_variance))
+    persistence = (alpha + beta)[..., None]
+    steps = np.arange(horizon, dtype=np.float64)
+    decay = persistence ** steps
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accumulated = np.where(np.isclose(persistence, 1.0), steps, (1 - decay) / (1 - persistence))
+    return omega[..., None] * accumulated + decay * next_variance[..., None]
+
+def forecast_parity(model: 'GARCHVaRModel', horizon: int = VAR_PREDICTION_DAYS) -> float:
+    """
+    Largest relative gap between the closed-form and arch variance forecasts of a fitted GARCH(1,1).
+    """
+    analytic = model.forecast_volatility(horizon)['Variance'].to_numpy()
+    reference = model.forecast_volatility(horizon, use_arch=True)['Variance'].to_numpy()
+    return float(np.max(np.abs(analytic - reference) / reference))
 
 class GARCHVaRModel:
-    def __init__(self, returns: pd.Series, p: int = GARCH_P, q: int = GARCH_Q):
+    def __init__(self, returns: pd.Series, p: int = GARCH_P, q: int = GARCH_Q, dist: str = 'normal', vol: str = 'Garch', o: int = 0):
         self.returns = returns*100
         self.p = p
         self.q = q
+        self.o = o
+        self.vol = vol
+        self.dist = dist
         self.model = None
         self.fitted_model = None
         self.forecasts = None
+        self.params = None
+        self.conditional_variance = None
+
+    @classmethod
+    def from_params(cls, returns: pd.Series, params: Dict[str, float], dist: str = 'normal') -> 'GARCHVaRModel':
+        """
+        Build a forecast-ready GARCH(1,1) from known parameters without running the optimizer.
+
+        `params` holds 'mu', 'omega', 'alpha', 'beta' and the distribution's shape parameters
+        (see distribution_parameter_names) on the percentage-return scale used by fit().
+        """
+        missing = [name for name in distribution_parameter_names(dist) if name not in params]
+        if missing:
+            raise ValueError(f"Missing {dist} shape parameters: {', '.join(missing)}")
+        model = cls(returns, p=1, q=1, dist=dist)
+        model.params = dict(params)
+        model.conditional_variance = garch_filter(model.returns.to_numpy(dtype=np.float64), params['mu'], params['omega'], params['alpha'], params['beta'])
+        return model
 
-    def fit(self):
+    @property
+    def is_fitted(self) -> bool:
+        return self.fitted_model is not None or self.params is not None
+
+    @property
+    def is_garch11(self) -> bool:
+        """
+        Whether this is the plain GARCH(1,1) that get_params, from_params and the NumPy filters support.
+        """
+        return self.vol == 'Garch' and (self.p, self.o, self.q) == (1, 0, 1)
+
+    def _build_model(self):
+        if self.vol == 'EWMA':
+            # RiskMetrics: fixed-decay variance, only the mean and distribution are estimated.
+            return ConstantMean(self.returns, volatility=EWMAVariance(EWMA_LAMBDA), distribution=ARCH_DISTRIBUTIONS[self.dist]())
+        return arch_model(self.returns, vol=self.vol, p=self.p, o=self.o, q=self.q, dist=self.dist)
+
+    def fit(self, starting_values: np.ndarray = None):
         try:
-            self.model = arch_model(self.returns, vol='Garch', p=self.p, q=self.q, dist='normal')
+            self.model = self._build_model()
 
-            self.fitted_model = self.model.fit(disp='off',show_warning=False)
+            with warnings.catch_warnings():
+                # Warm-start values that violate the constraints fall back to arch's defaults.
+                warnings.simplefilter('ignore')
+                self.fitted_model = self.model.fit(disp='off',show_warning=False, starting_values=starting_values)
 
             return True
         except Exception as e:
             st.error(f"Error fitting GARCH model: {e}")
             return False
 
-    def forecast_volatility(self, horizon: int = VAR_PREDICTION_DAYS) -> pd.DataFrame:
-        if self.fitted_model is None:
-            raise ValueError("Model must be fitted before forecasting.")
-        self.forecasts = self.fitted_model.forecast(horizon=horizon, reindex=False)
+    def forecast_volatility(self, horizon: int = VAR_PREDICTION_DAYS, use_arch: bool = False) -> pd.DataFrame:
+        """
+        Variance term structure for days 1..horizon.
 
-        variance_forecast = self.forecasts.variance.values[-1, :]
+        GARCH(1,1) models use the closed form from garch_variance_term_structure; other
+        specifications, or use_arch=True on an arch-fitted model, go through arch's forecast.
+        """
+        if not self.is_fitted:
+            raise ValueError("Model must be fitted before forecasting.")
+        if self.fitted_model is not None and (use_arch or not self.is_garch11):
+            # EGARCH has no closed-form multi-step forecast; simulate it with a fixed seed.
+            simulate = self.vol == 'EGARCH' and horizon > 1
+            self.forecasts = self.fitted_model.forecast(horizon=horizon, reindex=False, method='simulation' if simulate else 'analytic',
+                                                        random_state=np.random.RandomState(0) if simulate else None)
+            variance_forecast = self.forecasts.variance.values[-1, :]
+        else:
+            variance_forecast = self.variance_term_structure(horizon)
 
         forecast_df = pd.DataFrame({
             'Day': np.arange(1, horizon + 1),
@@ -41,48 +158,735 @@ class GARCHVaRModel:
 
         return forecast_df
 
-    def calculate_var(self, confidence_level: float, horizon: int = VAR_PREDICTION_DAYS) -> Dict:
-        forecast_df = self.forecast_volatility(horizon)
+    def variance_term_structure(self, horizon: int = VAR_PREDICTION_DAYS) -> np.ndarray:
+        params = self.get_params()
+        return garch_variance_term_structure(params['omega'], params['alpha'], params['beta'], self.next_variance(), horizon)
 
-        z_score = stats.norm.ppf(1 - confidence_level)
+    def calculate_var_term_structure(self, confidence_levels: list = VAR_CONFIDENCE_LEVELS, horizon: int = VAR_PREDICTION_DAYS) -> Dict:
+        """
+        VaR for several confidence levels and every horizon 1..horizon from a single forecast.
 
-        cumulative_variance = forecast_df['Variance'].sum()
-        cumulative_volatility = np.sqrt(cumulative_variance)
+        Returns a dict with 'var' of shape (len(confidence_levels), horizon), where var[i, h-1]
+        is the cumulative h-day VaR at confidence_levels[i], 'cumulative_volatility' of shape
+        (horizon,), and the underlying 'forecast_df'.
+        """
+        forecast_df = self.forecast_volatility(horizon)
 
-        var_percentage = z_score * cumulative_volatility
+        z_scores = self.innovation_quantiles(1 - np.asarray(confidence_levels, dtype=np.float64))
+        cumulative_volatility = np.sqrt(np.cumsum(forecast_df['Variance'].to_numpy()))
 
-        daily_vars=[]
-        for day in range(1, horizon + 1):
-            daily_variance = forecast_df.loc[forecast_df['Day'] <= day, 'Variance'].sum()
-            daily_volatility = np.sqrt(daily_variance)
-            daily_var = z_score * daily_volatility
-            daily_vars.append(daily_var)
         return {
-            'confidence_level': confidence_level,
+            'confidence_levels': list(confidence_levels),
             'horizon': horizon,
-            'var_percentage': var_percentage,
+            'var': np.outer(z_scores, cumulative_volatility),
             'cumulative_volatility': cumulative_volatility,
-            'daily_vars': daily_vars,
             'forecast_df': forecast_df
         }
+
+    def innovation_quantiles(self, levels) -> np.ndarray:
+        """
+        Quantiles of the standardized innovations at `levels` under the fitted distribution,
+        including its estimated shape parameters ('nu' for 't', 'eta' and 'lambda' for 'skewt').
+        """
+        levels = np.asarray(levels, dtype=np.float64)
+        if self.dist == 'normal':
+            return stats.norm.ppf(levels)
+        if not self.is_fitted:
+            raise ValueError("Model must be fitted before computing quantiles.")
+        distribution = ARCH_DISTRIBUTIONS[self.dist]()
+        names = distribution.parameter_names()
+        if self.fitted_model is not None:
+            shape = self.fitted_model.params[names].to_numpy(dtype=np.float64)
+        else:
+            shape = np.array([self.params[name] for name in names], dtype=np.float64)
+        return np.asarray(distribution.ppf(levels, shape), dtype=np.float64)
+
+    @staticmethod
+    def var_result(term_structure: Dict, confidence_level: float) -> Dict:
+        """
+        Single-confidence view of a term structure in the calculate_var result format.
+        """
+        daily_vars = term_structure['var'][term_structure['confidence_levels'].index(confidence_level)]
+        return {
+            'confidence_level': confidence_level,
+            'horizon': term_structure['horizon'],
+            'var_percentage': daily_vars[-1],
+            'cumulative_volatility': term_structure['cumulative_volatility'][-1],
+            'daily_vars': daily_vars.tolist(),
+            'forecast_df': term_structure['forecast_df']
+        }
+
+    def calculate_var(self, confidence_level: float, horizon: int = VAR_PREDICTION_DAYS) -> Dict:
+        return self.var_result(self.calculate_var_term_structure([confidence_level], horizon), confidence_level)
     
+    def get_params(self) -> Dict[str, float]:
+        """
+        GARCH(1,1) parameters as 'mu', 'omega', 'alpha', 'beta' plus the distribution's shape parameters.
+        """
+        if not self.is_fitted:
+            raise ValueError("Model must be fitted to get parameters.")
+        if not self.is_garch11:
+            raise ValueError("Parameters are only exported for GARCH(1,1) models.")
+        if self.params is not None:
+            return dict(self.params)
+        fitted = self.fitted_model.params
+        params = {'mu': float(fitted['mu']), 'omega': float(fitted['omega']), 'alpha': float(fitted['alpha[1]']), 'beta': float(fitted['beta[1]'])}
+        for name in distribution_parameter_names(self.dist):
+            params[name] = float(fitted[name])
+        return params
+
+    def next_variance(self) -> float:
+        """
+        One-step-ahead conditional variance after the last observed return.
+        """
+        params = self.get_params()
+        if self.fitted_model is not None:
+            last_variance = float(self.fitted_model.conditional_volatility.iloc[-1]) ** 2
+        else:
+            last_variance = self.conditional_variance[-1]
+        last_resid = self.returns.iloc[-1] - params['mu']
+        return params['omega'] + params['alpha'] * last_resid ** 2 + params['beta'] * last_variance
+
     def get_model_summary(self) -> str:
-        if self.fitted_model is None:
+        if not self.is_fitted:
             raise ValueError("Model must be fitted to get summary.")
+        if self.fitted_model is None:
+            return "GARCH(1,1) parameters: " + ", ".join(f"{name}={value:.6f}" for name, value in self.params.items())
         return str(self.fitted_model.summary())
 
-def rolling_var_backtest(returns: pd.Series, window: int =252, horizon: int = VAR_PREDICTION_DAYS, confidence_level: float = 0.05) -> pd.DataFrame:
-    results=   []
+# Forecast dates whose tails are buffered before their VaR and ES are computed in one call.
+HS_CHUNK_DATES = 64
 
-    if len(returns) < window + horizon:
-        st.warning("Not enough data for backtesting. Increase the window size or reduce the horizon.")
-        return pd.DataFrame()
-    for i in range(window,len(returns) - horizon, horizon):
+def _tail_size(window: int, max_level: float) -> int:
+    # Order statistics 0..floor(level * (n - 1)) + 1 cover the interpolated quantile and its ES.
+    return min(int(np.floor(max_level * (window - 1))) + 2, window)
+
+def lower_tail_statistics(tails: np.ndarray, counts: np.ndarray, levels) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lower-tail quantiles and Expected Shortfall from the smallest order statistics of windows.
+
+    `tails` holds each window's smallest values in ascending order along the last axis and
+    `counts` the number of observations in each window. Quantiles interpolate linearly
+    between order statistics, like np.quantile and pandas' rolling quantile; ES is the mean of
+    the observations at or below the lower one.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: VaR and ES of shape (len(levels),) + counts.shape;
+        NaN where a window has no observations.
+    """
+    levels = np.asarray(levels, dtype=np.float64).reshape((-1,) + (1,) * counts.ndim)
+    last = np.maximum(counts - 1, 0)
+    positions = levels * last
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, last)
+    if upper.max(initial=0) >= tails.shape[-1]:
+        raise ValueError("Quantile level is above the tail the windows were built for.")
+    tails = tails[None]
+    low_values = np.take_along_axis(tails, lower[..., None], axis=-1)[..., 0]
+    high_values = np.take_along_axis(tails, upper[..., None], axis=-1)[..., 0]
+    cumulative = np.cumsum(tails[..., :int(lower.max(initial=0)) + 1], axis=-1)
+    shortfall = np.take_along_axis(cumulative, lower[..., None], axis=-1)[..., 0] / (lower + 1)
+    with np.errstate(invalid='ignore'):
+        var = low_values + (positions - lower) * (high_values - low_values)
+    return np.where(counts > 0, var, np.nan), np.where(counts > 0, shortfall, np.nan)
+
+class SlidingWindowQuantiles:
+    """
+    Lower-tail order statistics over the last `window` observations of several series at once.
+
+    VaR and ES only read the smallest values of a window, so each series keeps just its
+    `size` smallest in-window values as a sorted row, enough for quantile levels up to
+    `max_level`, next to a ring buffer of arrival order. A new day inserts its value with one
+    rank count and one gather for all series together when it falls below the row's largest
+    value, so the tail stays sorted without re-sorting anything. Only evicting one of the tail
+    values leaves a gap that the rest of the window must fill; those series, about
+    size / window of them per day, rebuild their row with a partial sort of their window.
+    NaN observations take a slot in the ring buffer but are not counted, so series with gaps
+    keep aligned windows.
+    """
+    def __init__(self, window: int, n_series: int = 1, max_level: float = 1.0):
+        self.window = window
+        self.n_series = n_series
+        self.size = _tail_size(window, max_level)
+        self.tail = np.full((n_series, self.size), np.inf)
+        self.counts = np.zeros(n_series, dtype=int)
+        self.ring = np.full((window, n_series), np.nan)
+        self.position = 0
+        self._columns = np.arange(self.size)
+        self._offsets = np.arange(n_series)[:, None] * self.size
+
+    def push(self, values) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 0:
+            values = np.full(self.n_series, values)
+        evicted = self.ring[self.position].copy()
+        self.ring[self.position] = values
+        self.position = (self.position + 1) % self.window
+        self.counts += values == values
+        self.counts -= evicted == evicted
+
+        # The tail is a multiset, so evicting a value equal to its largest may drop any copy:
+        # the rebuild takes the smallest values of the window, including today's.
+        refill = evicted <= self.tail[:, -1]
+        rows = np.flatnonzero(refill)
+        if rows.size:
+            windows = np.nan_to_num(self.ring[:, rows].T, nan=np.inf)
+            self.tail[rows] = np.sort(np.partition(windows, self.size - 1, axis=1)[:, :self.size], axis=1)
+        adding = (values < self.tail[:, -1]) & ~refill
+        if adding.any():
+            # Shift each row right past the new value's rank, dropping its largest; rank `size` leaves a row as is.
+            rank = np.where(adding, (self.tail < values[:, None]).sum(axis=1), self.size)
+            self.tail = np.take(self.tail, self._offsets + self._columns - (self._columns > rank[:, None]))
+            self.tail[adding, rank[adding]] = values[adding]
+
+    def quantile(self, levels) -> np.ndarray:
+        """
+        Lower-tail quantiles, shape (len(levels), n_series); NaN for empty windows.
+        """
+        return lower_tail_statistics(self.tail, self.counts, levels)[0]
+
+    def expected_shortfall(self, levels) -> np.ndarray:
+        """
+        Mean of the observations at or below each lower-tail quantile, shape (len(levels), n_series).
+        """
+        return lower_tail_statistics(self.tail, self.counts, levels)[1]
+
+
+class HistoricalVaRModel:
+    """
+    Historical-simulation VaR and Expected Shortfall from the last `window` returns.
+
+    The h-day VaR is the empirical lower-tail quantile of overlapping h-day return sums in
+    the window, in the same percent units and sign convention as GARCHVaRModel.
+    """
+    def __init__(self, returns: pd.Series, window: int = 252):
+        self.returns = returns*100
+        self.window = window
+
+    def _horizon_sums(self, horizon: int) -> np.ndarray:
+        returns = self.returns.to_numpy(dtype=np.float64)[-self.window:]
+        return np.convolve(returns, np.ones(horizon), mode='valid')
+
+    def calculate_var_term_structure(self, confidence_levels: list = VAR_CONFIDENCE_LEVELS, horizon: int = VAR_PREDICTION_DAYS) -> Dict:
+        """
+        VaR and ES of shape (len(confidence_levels), horizon) for every horizon 1..horizon.
+
+        The windows are seen once, so one partial sort per horizon gives their tails.
+        """
+        levels = 1 - np.asarray(confidence_levels, dtype=np.float64)
+        sums = np.full((horizon, self.window), np.nan)
+        for day in range(1, horizon + 1):
+            day_sums = self._horizon_sums(day)
+            sums[day - 1, :len(day_sums)] = day_sums
+        size = _tail_size(self.window, levels.max())
+        tails = np.sort(np.partition(np.nan_to_num(sums, nan=np.inf), size - 1, axis=1)[:, :size], axis=1)
+        var, es = lower_tail_statistics(tails, np.sum(~np.isnan(sums), axis=1), levels)
+        return {'confidence_levels': list(confidence_levels), 'horizon': horizon, 'var': var, 'es': es}
+
+    def calculate_var(self, confidence_level: float, horizon: int = VAR_PREDICTION_DAYS) -> Dict:
+        term_structure = self.calculate_var_term_structure([confidence_level], horizon)
+        return {
+            'confidence_level': confidence_level,
+            'horizon': horizon,
+            'var_percentage': term_structure['var'][0, -1],
+            'es_percentage': term_structure['es'][0, -1],
+            'daily_vars': term_structure['var'][0].tolist()
+        }
+
+
+def rolling_historical_var(returns: pd.DataFrame, window: int = 252, horizon: int = VAR_PREDICTION_DAYS,
+                           confidence_levels: list = VAR_CONFIDENCE_LEVELS) -> Dict:
+    """
+    Out-of-sample historical-simulation VaR and ES for every date and ticker in one pass.
+
+    The forecast for date index i covers returns i..i+horizon-1 and uses the h-day sums that
+    lie entirely in returns i-window..i-1, matching the rolling GARCH backtest. A single
+    SlidingWindowQuantiles slides over the sums, so each day costs one insert and one
+    eviction per ticker; the tails are buffered and reduced HS_CHUNK_DATES dates at a time.
+
+    Args:
+        returns (pd.DataFrame): Decimal returns (dates x tickers); a Series is treated as one column.
+
+    Returns:
+        Dict: 'dates' (forecast dates), 'tickers', 'confidence_levels', and 'var' and 'es' of
+        shape (dates, len(confidence_levels), tickers) in percent.
+    """
+    returns = returns.to_frame() if isinstance(returns, pd.Series) else returns
+    values = returns.to_numpy(dtype=np.float64) * 100
+    sums = np.full_like(values, np.nan)
+    if len(values) >= horizon:
+        # Cumulate values and gaps separately so a missing day only blanks the sums it falls in.
+        padding = np.zeros((1, values.shape[1]))
+        cumulative = np.vstack((padding, np.cumsum(np.nan_to_num(values), axis=0)))
+        gaps = np.vstack((padding, np.cumsum(np.isnan(values), axis=0)))
+        window_sums = cumulative[horizon:] - cumulative[:-horizon]
+        sums[:len(values) - horizon + 1] = np.where(gaps[horizon:] - gaps[:-horizon] > 0, np.nan, window_sums)
+
+    levels = 1 - np.asarray(confidence_levels, dtype=np.float64)
+    starts = range(window, len(values) - horizon + 1)
+    var = np.empty((len(starts), len(levels), values.shape[1]))
+    es = np.empty_like(var)
+    quantiles = SlidingWindowQuantiles(window - horizon + 1, values.shape[1], levels.max())
+    for j in range(min(window - horizon + 1, len(sums))):
+        quantiles.push(sums[j])
+    for chunk in range(0, len(starts), HS_CHUNK_DATES):
+        stop = min(chunk + HS_CHUNK_DATES, len(starts))
+        tails = np.empty((stop - chunk,) + quantiles.tail.shape)
+        counts = np.empty((stop - chunk, values.shape[1]), dtype=int)
+        for n in range(chunk, stop):
+            if n:
+                quantiles.push(sums[starts[n] - horizon])
+            tails[n - chunk], counts[n - chunk] = quantiles.tail, quantiles.counts
+        chunk_var, chunk_es = lower_tail_statistics(tails, counts, levels)
+        var[chunk:stop] = np.moveaxis(chunk_var, 0, 1)
+        es[chunk:stop] = np.moveaxis(chunk_es, 0, 1)
+    return {'dates': returns.index[list(starts)], 'tickers': list(returns.columns), 'confidence_levels': list(confidence_levels), 'var': var, 'es': es}
+
+MAX_PERSISTENCE = 1.0 - 1e-6
+
+class GARCHXVaRModel(GARCHVaRModel):
+    """
+    GARCH(1,1)-X: a GARCH(1,1) whose variance intercept moves with exogenous features.
+
+    sigma2_t = omega * exp(gamma' x_{t-1}) + alpha * eps_{t-1}^2 + beta * sigma2_{t-1}, with
+    normal innovations and a constant mean. The exponential link keeps the variance
+    positive for features of any sign, such as PCA scores of news embeddings from a
+    FeatureStore. `features` is a date-indexed frame; dates without features count as
+    zero. Because the variance is linear in its own lag, the recursion and its parameter
+    gradients run through scipy's lfilter, and fit() uses SLSQP with analytic gradients.
+    Multi-day forecasts use the last observed features for day one and zero afterwards.
+    """
+    def __init__(self, returns: pd.Series, features: pd.DataFrame, dist: str = 'normal'):
+        if dist != 'normal':
+            raise ValueError("GARCHXVaRModel supports normal innovations only.")
+        super().__init__(returns, p=1, q=1, dist=dist)
+        self.features = features.reindex(returns.index).fillna(0.0)
+        self.exog = self.features.to_numpy(dtype=np.float64)
+        self.loglikelihood = None
+
+    @classmethod
+    def from_params(cls, returns: pd.Series, params: Dict, features: pd.DataFrame, dist: str = 'normal') -> 'GARCHXVaRModel':
+        model = cls(returns, features, dist)
+        model.params = dict(params)
+        model.conditional_variance = model._variance(model._pack(params))
+        return model
+
+    @property
+    def is_garch11(self) -> bool:
+        return False
+
+    def _pack(self, params: Dict) -> np.ndarray:
+        return np.concatenate(([params['mu'], params['omega'], params['alpha'], params['beta']], params['gamma']))
+
+    def _unpack(self, theta: np.ndarray) -> Dict:
+        return {'mu': float(theta[0]), 'omega': float(theta[1]), 'alpha': float(theta[2]), 'beta': float(theta[3]),
+                'gamma': [float(value) for value in theta[4:]]}
+
+    def _variance(self, theta: np.ndarray, with_gradient: bool = False):
+        returns = self.returns.to_numpy(dtype=np.float64)
+        mu, omega, alpha, beta, gamma = theta[0], theta[1], theta[2], theta[3], theta[4:]
+        resid = returns - mu
+        backcast = garch_backcast(returns - returns.mean())
+        lagged_exog = np.vstack((np.zeros((1, self.exog.shape[1])), self.exog[:-1]))
+        intercept = omega * np.exp(lagged_exog @ gamma)
+        lagged_sq_resid = np.concatenate(([backcast], resid[:-1] ** 2))
+        sigma2, _ = lfilter([1.0], [1.0, -beta], intercept + alpha * lagged_sq_resid, zi=[beta * backcast])
+        if not with_gradient:
+            return sigma2
+
+        # d sigma2_t follows the same linear recursion, driven by the derivative of each input.
+        lagged_sigma2 = np.concatenate(([backcast], sigma2[:-1]))
+        inputs = np.column_stack((
+            np.concatenate(([0.0], -2 * alpha * resid[:-1])),
+            intercept / omega,
+            lagged_sq_resid,
+            lagged_sigma2,
+            intercept[:, None] * lagged_exog
+        ))
+        return sigma2, resid, lfilter([1.0], [1.0, -beta], inputs, axis=0)
+
+    def _negative_loglikelihood(self, theta: np.ndarray) -> Tuple[float, np.ndarray]:
+        sigma2, resid, dsigma2 = self._variance(theta, with_gradient=True)
+        if np.any(sigma2 <= 0) or not np.all(np.isfinite(sigma2)):
+            return 1e10, np.zeros_like(theta)
+        nll = 0.5 * np.sum(np.log(2 * np.pi) + np.log(sigma2) + resid ** 2 / sigma2)
+        grad = 0.5 * ((1 / sigma2 - resid ** 2 / sigma2 ** 2) @ dsigma2)
+        grad[0] -= np.sum(resid / sigma2)
+        return float(nll), grad
+
+    def fit(self, starting_values: np.ndarray = None):
+        returns = self.returns.to_numpy(dtype=np.float64)
+        if starting_values is None:
+            variance = returns.var()
+            starting_values = np.concatenate(([returns.mean(), 0.05 * variance, 0.08, 0.9], np.zeros(self.exog.shape[1])))
+        bounds = [(None, None), (1e-8, 10 * returns.var()), (0.0, 1.0), (0.0, 1.0)] + [(-5.0, 5.0)] * self.exog.shape[1]
+        constraints = [{'type': 'ineq', 'fun': lambda theta: MAX_PERSISTENCE - theta[2] - theta[3],
+                        'jac': lambda theta: np.concatenate(([0.0, 0.0, -1.0, -1.0], np.zeros(len(theta) - 4)))}]
+        try:
+            result = minimize(self._negative_loglikelihood, np.asarray(starting_values, dtype=np.float64), jac=True, method='SLSQP',
+                              bounds=bounds, constraints=constraints, options={'maxiter': 200})
+            if not np.all(np.isfinite(result.x)):
+                raise ValueError(result.message)
+        except Exception as e:
+            st.error(f"Error fitting GARCH-X model: {e}")
+            return False
+        self.params = self._unpack(result.x)
+        self.loglikelihood = -float(result.fun)
+        self.conditional_variance = self._variance(result.x)
+        return True
+
+    def get_params(self) -> Dict:
+        """
+        Parameters 'mu', 'omega', 'alpha', 'beta' and 'gamma' (one loading per feature column).
+        """
+        if not self.is_fitted:
+            raise ValueError("Model must be fitted to get parameters.")
+        return {**self.params, 'gamma': list(self.params['gamma'])}
+
+    def next_variance(self) -> float:
+        params = self.params
+        last_resid = self.returns.iloc[-1] - params['mu']
+        intercept = params['omega'] * np.exp(self.exog[-1] @ np.asarray(params['gamma']))
+        return float(intercept + params['alpha'] * last_resid ** 2 + params['beta'] * self.conditional_variance[-1])
+
+    def variance_term_structure(self, horizon: int = VAR_PREDICTION_DAYS) -> np.ndarray:
+        params = self.params
+        return garch_variance_term_structure(params['omega'], params['alpha'], params['beta'], self.next_variance(), horizon)
+
+    def get_model_summary(self) -> str:
+        if not self.is_fitted:
+            raise ValueError("Model must be fitted to get summary.")
+        params = self.params
+        return (f"GARCH(1,1)-X with {len(params['gamma'])} features: mu={params['mu']:.6f}, omega={params['omega']:.6f}, "
+                f"alpha={params['alpha']:.6f}, beta={params['beta']:.6f}, gamma=[{', '.join(f'{value:.4f}' for value in params['gamma'])}]")
+
+
+class BatchGARCHModel:
+    """
+    GARCH(1,1) with constant mean fitted to many return series at once in NumPy.
+
+    Series are left-aligned into a (T, N) matrix and the variance recursion runs over
+    time with each step vectorised across tickers, carrying forward-mode derivatives so
+    every likelihood evaluation also returns analytic per-observation scores. All parameter
+    sets are optimised together by a batched BFGS with a vectorised line search.
+    Estimates match GARCHVaRModel (arch) within optimizer tolerance, using the same
+    backcast initialisation.
+    """
+    def __init__(self, returns: Dict[str, pd.Series], dist: str = 'normal'):
+        if dist not in ('normal', 't'):
+            raise ValueError(f"Unsupported distribution: {dist}")
+        self.returns = {ticker: series.dropna() * 100 for ticker, series in returns.items() if len(series.dropna()) > 1}
+        self.tickers = list(self.returns.keys())
+        self.dist = dist
+        self.params = {}
+        self.loglikelihood = None
+        self.iterations = 0
+
+        lengths = np.array([len(series) for series in self.returns.values()], dtype=int)
+        self.lengths = lengths
+        self.y = np.zeros((lengths.max() if len(lengths) else 0, len(self.tickers)))
+        self.mask = np.zeros_like(self.y, dtype=bool)
+        for idx, series in enumerate(self.returns.values()):
+            self.y[:lengths[idx], idx] = series.to_numpy(dtype=np.float64)
+            self.mask[:lengths[idx], idx] = True
+        self.backcast = np.array([garch_backcast((series - series.mean()).to_numpy()) for series in self.returns.values()])
+
+    @classmethod
+    def from_panel(cls, panel: ReturnsPanel, dist: str = 'normal') -> 'BatchGARCHModel':
+        return cls({ticker: panel.series(ticker) for ticker in panel.tickers}, dist=dist)
+
+    @property
+    def n_params(self) -> int:
+        return 5 if self.dist == 't' else 4
+
+    def _unpack(self, theta: np.ndarray):
+        # Unconstrained parameterisation per ticker: (mu, log omega, logit persistence,
+        # logit alpha share[, log(nu - 2.05)]), so stationarity alpha + beta < 1 holds
+        # everywhere and the optimizer needs no bounds.
+        theta = theta.reshape(self.n_params, -1)
+        mu = theta[0]
+        omega = np.exp(theta[1])
+        persistence = MAX_PERSISTENCE / (1 + np.exp(-theta[2]))
+        share = 1 / (1 + np.exp(-theta[3]))
+        nu = 2.05 + np.exp(theta[4]) if self.dist == 't' else None
+        return mu, omega, persistence * share, persistence * (1 - share), nu
+
+    def _pack(self, mu, omega, persistence, share, nu=None) -> np.ndarray:
+        theta = [mu, np.log(omega), np.log(persistence / (MAX_PERSISTENCE - persistence)), np.log(share / (1 - share))]
+        if self.dist == 't':
+            theta.append(np.log(nu - 2.05))
+        return np.array(theta)
+
+    def _evaluate(self, theta: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Per-ticker log-likelihood, gradient and per-observation scores for a (k, N) parameter matrix.
+        """
+        mu, omega, alpha, beta, nu = self._unpack(theta)
+        T, N = self.y.shape
+        resid = np.where(self.mask, self.y - mu, 0.0)
+        resid2 = resid ** 2
+
+        # state rows: sigma2, d/domega, d/dalpha, d/dbeta, d/dmu; state_t = inputs_t + beta * state_{t-1}
+        inputs = np.empty((T, 5, N))
+        inputs[0, 0] = omega + alpha * self.backcast
+        inputs[1:, 0] = omega + alpha * resid2[:-1]
+        inputs[:, 1] = 1.0
+        inputs[0, 2] = self.backcast
+        inputs[1:, 2] = resid2[:-1]
+        inputs[0, 4] = 0.0
+        inputs[1:, 4] = -2.0 * alpha * resid[:-1]
+        state = np.empty((T, 5, N))
+        previous = np.zeros((5, N))
+        previous[0] = self.backcast
+        for t in range(T):
+            inputs[t, 3] = previous[0]
+            np.multiply(previous, beta, out=state[t])
+            state[t] += inputs[t]
+            previous = state[t]
+
+        sigma2 = np.where(self.mask, np.maximum(state[:, 0], 1e-12), 1.0)
+        if self.dist == 'normal':
+            loglik = -0.5 * (np.log(2 * np.pi) + np.log(sigma2) + resid2 / sigma2)
+            dl_dsigma2 = -0.5 / sigma2 + 0.5 * resid2 / sigma2 ** 2
+            dl_dmu = resid / sigma2
+        else:
+            scale = sigma2 * (nu - 2)
+            q = resid2 / scale
+            loglik = (gammaln((nu + 1) / 2) - gammaln(nu / 2) - 0.5 * np.log(np.pi * (nu - 2))
+                      - 0.5 * np.log(sigma2) - (nu + 1) / 2 * np.log1p(q))
+            dl_dsigma2 = -0.5 / sigma2 + 0.5 * (nu + 1) * resid2 / (sigma2 * (scale + resid2))
+            dl_dmu = (nu + 1) * resid / (scale + resid2)
+            dl_dnu = (0.5 * digamma((nu + 1) / 2) - 0.5 * digamma(nu / 2) - 0.5 / (nu - 2)
+                      - 0.5 * np.log1p(q) + 0.5 * (nu + 1) * q / ((1 + q) * (nu - 2)))
+
+        # Chain rule from (omega, alpha, beta, nu) to the unconstrained parameters.
+        dl_dsigma2 = dl_dsigma2 * self.mask
+        score_alpha = dl_dsigma2 * state[:, 2]
+        score_beta = dl_dsigma2 * state[:, 3]
+        persistence = alpha + beta
+        share = alpha / persistence
+        scores = [dl_dsigma2 * state[:, 4] + dl_dmu * self.mask,
+                  dl_dsigma2 * state[:, 1] * omega,
+                  (share * score_alpha + (1 - share) * score_beta) * persistence * (1 - persistence / MAX_PERSISTENCE),
+                  (score_alpha - score_beta) * persistence * share * (1 - share)]
+        if self.dist == 't':
+            scores.append(dl_dnu * self.mask * (nu - 2.05))
+        scores = np.stack(scores, axis=1)
+        return np.sum(loglik * self.mask, axis=0), scores.sum(axis=0), scores
+
+    def _optimize(self, theta: np.ndarray, maxiter: int = 200, tol: float = 1e-8) -> np.ndarray:
+        # Batched BFGS: every ticker keeps its own inverse-Hessian approximation, seeded
+        # with the inverse outer product of its scores (BHHH), and takes its own step from
+        # a vectorised backtracking line search.
+        k, N = theta.shape
+        loglik, grad, scores = self._evaluate(theta)
+        inverse_hessian = np.linalg.inv(np.einsum('tkn,tln->nkl', scores, scores) + 1e-8 * np.eye(k))
+        active = np.ones(N, dtype=bool)
+        self.iterations = 0
+        for iteration in range(maxiter):
+            direction = np.einsum('nkl,ln->kn', inverse_hessian, grad)
+            slope = np.sum(grad * direction, axis=0)
+            active &= slope > tol
+            if not active.any():
+                break
+            self.iterations = iteration + 1
+
+            step = np.ones(N)
+            pending = active.copy()
+            new_theta, new_loglik, new_grad = theta.copy(), loglik.copy(), grad.copy()
+            for _ in range(40):
+                trial = theta + step * direction
+                trial_loglik, trial_grad, _ = self._evaluate(trial)
+                accepted = pending & np.isfinite(trial_loglik) & (trial_loglik >= loglik + 1e-4 * step * slope)
+                new_theta[:, accepted] = trial[:, accepted]
+                new_loglik[accepted] = trial_loglik[accepted]
+                new_grad[:, accepted] = trial_grad[:, accepted]
+                pending &= ~accepted
+                if not pending.any():
+                    break
+                step[pending] *= 0.5
+            active &= ~pending
+
+            # BFGS update of the inverse Hessian of -loglik for tickers that moved.
+            s_k = (new_theta - theta).T
+            y_k = (grad - new_grad).T
+            curvature = np.sum(s_k * y_k, axis=1)
+            update = active & (curvature > 1e-12)
+            if update.any():
+                rho = 1.0 / curvature[update]
+                H, s_u, y_u = inverse_hessian[update], s_k[update], y_k[update]
+                left = np.eye(k) - rho[:, None, None] * s_u[:, :, None] * y_u[:, None, :]
+                inverse_hessian[update] = left @ H @ left.transpose(0, 2, 1) + rho[:, None, None] * s_u[:, :, None] * s_u[:, None, :]
+            theta, loglik, grad = new_theta, new_loglik, new_grad
+        return theta
+
+    def _starting_values(self) -> np.ndarray:
+        # arch's grid of (alpha, persistence) starting points, scored for all tickers at once.
+        variance = np.array([np.mean((series - series.mean()) ** 2) for series in self.returns.values()])
+        mean = np.array([series.mean() for series in self.returns.values()])
+        candidates = [(alpha, persistence) for alpha in (0.01, 0.05, 0.1, 0.2) for persistence in (0.5, 0.7, 0.9, 0.98) if alpha < persistence]
+        best_value = np.full(len(self.tickers), np.inf)
+        best = None
+        for alpha, persistence in candidates:
+            theta = self._pack(mean, (1 - persistence) * variance, np.full_like(mean, persistence),
+                               np.full_like(mean, alpha / persistence), np.full_like(mean, 8.0))
+            values = self._gaussian_negative_loglikelihood(theta)
+            if best is None:
+                best = theta.copy()
+            improved = values < best_value
+            best[:, improved] = theta[:, improved]
+            best_value = np.minimum(best_value, values)
+        return best
+
+    def _gaussian_negative_loglikelihood(self, theta: np.ndarray) -> np.ndarray:
+        mu, omega, alpha, beta, nu = self._unpack(theta)
+        resid = np.where(self.mask, self.y - mu, 0.0)
+        sigma2 = np.empty_like(resid)
+        for idx in range(len(self.tickers)):
+            sigma2[:, idx] = garch_filter(self.y[:, idx], mu[idx], omega[idx], alpha[idx], beta[idx], self.backcast[idx])
+        sigma2 = np.where(self.mask, np.maximum(sigma2, 1e-12), 1.0)
+        loglik = -0.5 * (np.log(sigma2) + resid ** 2 / sigma2)
+        return -np.sum(loglik * self.mask, axis=0) / self.lengths
+
+    def fit(self) -> bool:
+        if not self.tickers:
+            return False
+        try:
+            theta = self._optimize(self._starting_values())
+            self.loglikelihood = self._evaluate(theta)[0]
+            mu, omega, alpha, beta, nu = self._unpack(theta)
+            for idx, ticker in enumerate(self.tickers):
+                self.params[ticker] = {'mu': float(mu[idx]), 'omega': float(omega[idx]), 'alpha': float(alpha[idx]), 'beta': float(beta[idx])}
+                if nu is not None:
+                    self.params[ticker]['nu'] = float(nu[idx])
+            return True
+        except Exception as e:
+            st.error(f"Error fitting batched GARCH model: {e}")
+            return False
+
+    def get_model(self, ticker: str) -> GARCHVaRModel:
+        """
+        Forecast-ready GARCHVaRModel for one ticker built from the batch estimates.
+        """
+        if ticker not in self.params:
+            raise ValueError("Model must be fitted before forecasting.")
+        return GARCHVaRModel.from_params(self.returns[ticker] / 100, self.params[ticker], dist=self.dist)
+
+class OnlineGARCHFilter:
+    """
+    Fitted GARCH(1,1) state for a set of tickers that absorbs new returns without refitting.
+
+    Holds each ticker's parameters and one-step-ahead variance. update() applies the
+    variance recursion in O(1) per observation, vectorised across tickers, and tracks the
+    standardized residuals seen since the last fit. needs_refit() flags tickers that are
+    due for re-estimation on schedule or whose residuals have drifted from unit variance.
+    """
+    def __init__(self, tickers: List[str], params: Dict[str, Dict[str, float]], next_variance: Dict[str, float],
+                 refit_every: int = GARCH_REFIT_EVERY, drift_z: float = GARCH_DRIFT_Z):
+        self.tickers = list(tickers)
+        self.ticker_index = {ticker: idx for idx, ticker in enumerate(self.tickers)}
+        self.refit_every = refit_every
+        self.drift_z = drift_z
+        self.mu = np.zeros(len(self.tickers))
+        self.omega = np.zeros(len(self.tickers))
+        self.alpha = np.zeros(len(self.tickers))
+        self.beta = np.zeros(len(self.tickers))
+        self.sigma2_next = np.zeros(len(self.tickers))
+        self.observations_since_fit = np.zeros(len(self.tickers), dtype=int)
+        self.sum_z2 = np.zeros(len(self.tickers))
+        for ticker in self.tickers:
+            self.reset(ticker, params[ticker], next_variance[ticker])
+
+    @classmethod
+    def from_models(cls, models: Dict[str, GARCHVaRModel], **kwargs) -> 'OnlineGARCHFilter':
+        models = {ticker: model for ticker, model in models.items() if model.is_fitted}
+        return cls(list(models.keys()), {ticker: model.get_params() for ticker, model in models.items()},
+                   {ticker: model.next_variance() for ticker, model in models.items()}, **kwargs)
+
+    def copy(self) -> 'OnlineGARCHFilter':
+        """
+        Independent copy whose update() and reset() leave this filter untouched.
+        """
+        clone = copy.copy(self)
+        for name in ('mu', 'omega', 'alpha', 'beta', 'sigma2_next', 'observations_since_fit', 'sum_z2'):
+            setattr(clone, name, getattr(self, name).copy())
+        return clone
+
+    def reset(self, ticker: str, params: Dict[str, float], next_variance: float):
+        """
+        Install freshly estimated parameters for a ticker and clear its drift statistics.
+        """
+        idx = self.ticker_index[ticker]
+        self.mu[idx], self.omega[idx], self.alpha[idx], self.beta[idx] = params['mu'], params['omega'], params['alpha'], params['beta']
+        self.sigma2_next[idx] = next_variance
+        self.observations_since_fit[idx] = 0
+        self.sum_z2[idx] = 0.0
+
+    def update(self, new_returns: Dict[str, List[float]]):
+        """
+        Absorb new daily returns (decimal, oldest first) per ticker.
+        """
+        depth = max((len(values) for values in new_returns.values()), default=0)
+        if depth == 0:
+            return
+        # Right-align so every ticker's newest return lands on the last row; NaN pads are skipped.
+        rows = np.full((depth, len(self.tickers)), np.nan)
+        for ticker, values in new_returns.items():
+            if ticker in self.ticker_index and len(values):
+                rows[depth - len(values):, self.ticker_index[ticker]] = np.asarray(values, dtype=np.float64) * 100
+        for row in rows:
+            valid = np.isfinite(row)
+            resid = np.where(valid, row - self.mu, 0.0)
+            self.sum_z2 += np.where(valid, resid ** 2 / self.sigma2_next, 0.0)
+            self.observations_since_fit += valid
+            self.sigma2_next = np.where(valid, self.omega + self.alpha * resid ** 2 + self.beta * self.sigma2_next, self.sigma2_next)
+
+    def needs_refit(self) -> Dict[str, bool]:
+        """
+        Tickers due for re-estimation: refit_every observations absorbed, or the mean squared
+        standardized residual is more than drift_z standard errors away from 1.
+        """
+        n = np.maximum(self.observations_since_fit, 1)
+        drift = np.abs(self.sum_z2 / n - 1) > self.drift_z * np.sqrt(2.0 / n)
+        flagged = (self.observations_since_fit >= self.refit_every) | ((self.observations_since_fit >= 5) & drift)
+        return {ticker: bool(flagged[idx]) for idx, ticker in enumerate(self.tickers)}
+
+    def variance_forecast(self, horizon: int = VAR_PREDICTION_DAYS) -> np.ndarray:
+        """
+        Closed-form variance term structure, shape (tickers, horizon).
+        """
+        return garch_variance_term_structure(self.omega, self.alpha, self.beta, self.sigma2_next, horizon)
+
+    def calculate_var(self, confidence_levels: list = VAR_CONFIDENCE_LEVELS, horizon: int = VAR_PREDICTION_DAYS) -> pd.DataFrame:
+        """
+        Next-day and cumulative VaR for every ticker, in the same units as GARCHVaRModel.calculate_var.
+        """
+        cumulative_volatility = np.sqrt(np.cumsum(self.variance_forecast(horizon), axis=1))
+        results = []
+        for confidence in confidence_levels:
+            z_score = stats.norm.ppf(1 - confidence)
+            for idx, ticker in enumerate(self.tickers):
+                results.append({
+                    'ticker': ticker,
+                    'confidence_level': f"{confidence*100:.2f}%",
+                    'var_percentage': z_score * cumulative_volatility[idx, -1],
+                    'day1_var': z_score * cumulative_volatility[idx, 0],
+                    'volatility': cumulative_volatility[idx, -1]
+                })
+        return pd.DataFrame(results)
+
+def _backtest_windows(returns: pd.Series, starts: List[int], window: int, horizon: int, confidence_level: float) -> List[Dict]:
+    # Windows in a chunk are contiguous, so each fit warm-starts from the previous window's
+    # estimates, which sit close to the new optimum.
+    results = []
+    starting_values = None
+    for i in starts:
         train_returns = returns.iloc[i - window:i]
         test_returns = returns.iloc[i:i + horizon]
 
         model = GARCHVaRModel(train_returns)
-        if model.fit():
+        if model.fit(starting_values=starting_values):
+            starting_values = model.fitted_model.params.to_numpy()
 
             var_result = model.calculate_var(confidence_level, horizon)
 
@@ -94,26 +898,140 @@ def rolling_var_backtest(returns: pd.Series, window: int =252, horizon: int = VA
                 'actual_return': actual_return,
                 'var_breach': actual_return < var_result['var_percentage']
             })
-    return pd.DataFrame(results)
+    return results
+
+_process_pool = None
+
+def get_process_pool(workers: int) -> ProcessPoolExecutor:
+    # One long-lived pool shared by backtests and simulations; 'spawn' avoids forking the
+    # Streamlit server and its threads.
+    global _process_pool
+    if _process_pool is None or _process_pool._max_workers != workers:
+        _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    return _process_pool
+
+def backtest_starts(returns: pd.Series, window: int = 252, horizon: int = VAR_PREDICTION_DAYS, step: int = None) -> List[int]:
+    """
+    Positions of the first forecast day of every backtest window. New data only appends to the schedule.
+    """
+    return list(range(window, len(returns) - horizon, step or horizon))
+
+def iter_rolling_var_backtest(returns: pd.Series, window: int = 252, horizon: int = VAR_PREDICTION_DAYS, confidence_level: float = 0.05,
+                              step: int = None, workers: int = BACKTEST_WORKERS, starts: List[int] = None) -> Iterator[Tuple[pd.DataFrame, float]]:
+    """
+    Rolling-window GARCH VaR backtest that yields results as they are computed.
+
+    The window schedule (backtest_starts, unless `starts` picks specific windows) is split
+    into contiguous chunks that run on a process pool, each fitting its windows in order
+    with warm starts. Yields (chunk results, fraction done) as chunks finish, not
+    necessarily in date order.
+    """
+    starts = backtest_starts(returns, window, horizon, step) if starts is None else list(starts)
+    if not starts:
+        return
+    workers = max(1, min(workers, len(starts)))
+    if workers == 1:
+        yield pd.DataFrame(_backtest_windows(returns, starts, window, horizon, confidence_level)), 1.0
+        return
+
+    n_chunks = min(len(starts), workers * 4)
+    chunks = [list(chunk) for chunk in np.array_split(starts, n_chunks)]
+    pool = get_process_pool(workers)
+    futures = [pool.submit(_backtest_windows, returns, chunk, window, horizon, confidence_level) for chunk in chunks]
+    done = 0
+    for future in as_completed(futures):
+        done += 1
+        yield pd.DataFrame(future.result()), done / len(futures)
+
+def rolling_var_backtest(returns: pd.Series, window: int =252, horizon: int = VAR_PREDICTION_DAYS, confidence_level: float = 0.05,
+                         step: int = None, workers: int = BACKTEST_WORKERS) -> pd.DataFrame:
+    if len(returns) < window + horizon:
+        st.warning("Not enough data for backtesting. Increase the window size or reduce the horizon.")
+        return pd.DataFrame()
+    chunks = [chunk for chunk, _ in iter_rolling_var_backtest(returns, window, horizon, confidence_level, step, workers) if not chunk.empty]
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks).sort_values('date').reset_index(drop=True)
+
+def garchx_rolling_backtest(returns: pd.Series, features: pd.DataFrame, window: int = 252, horizon: int = 1, confidence_level: float = 0.95,
+                            start_date: str = None, refit_every: int = 1) -> pd.DataFrame:
+    """
+    Rolling-window GARCHXVaRModel backtest with warm-started refits.
 
-def calculate_var_for_multiple_stocks(stock_dict: Dict[str, pd.DataFrame], confidence_level: list = VAR_CONFIDENCE_LEVELS, horizon: int = VAR_PREDICTION_DAYS) -> pd.DataFrame:
+    Each window is refitted every `refit_every` days starting from the previous window's
+    estimates; in between, the last parameters are reused without optimising. Features
+    should be free of look-ahead, e.g. FeatureStore.pca(..., fit_until=start_date).
+
+    Returns:
+        pd.DataFrame: 'date', 'predicted_var', 'actual_return' and 'var_breach', as rolling_var_backtest.
+    """
+    features = features.reindex(returns.index).fillna(0.0)
+    first = window if start_date is None else max(window, int(returns.index.searchsorted(pd.Timestamp(start_date))))
     results = []
-    for ticker, df in stock_dict.items():
-        if 'returns' not in df.columns:
+    params = None
+    for n, i in enumerate(range(first, len(returns) - horizon + 1)):
+        train_returns = returns.iloc[i - window:i]
+        train_features = features.iloc[i - window:i]
+        if params is None or n % refit_every == 0:
+            model = GARCHXVaRModel(train_returns, train_features)
+            if not model.fit(starting_values=model._pack(params) if params else None):
+                continue
+            params = model.get_params()
+        else:
+            model = GARCHXVaRModel.from_params(train_returns, params, train_features)
+
+        var_result = model.calculate_var(confidence_level, horizon)
+        actual_return = (returns.iloc[i:i + horizon] * 100).sum()
+        results.append({
+            'date': returns.index[i],
+            'predicted_var': var_result['var_percentage'],
+            'actual_return': actual_return,
+            'var_breach': actual_return < var_result['var_percentage']
+        })
+    return pd.DataFrame(results)
+
+def calculate_var_for_multiple_stocks(panel: ReturnsPanel, confidence_level: list = VAR_CONFIDENCE_LEVELS, horizon: int = VAR_PREDICTION_DAYS,
+                                      get_fitted_model: Optional[Callable[[str, pd.Series], Optional['GARCHVaRModel']]] = None) -> pd.DataFrame:
+    models = {}
+    for ticker in panel.tickers:
+        returns = panel.series(ticker)
+        if returns.empty:
             st.warning(f"Returns not calculated for {ticker}. Skipping.")
             continue
-        returns = df['returns'].dropna()
 
-        model = GARCHVaRModel(returns)
-        if model.fit():
-            for confidence in confidence_level:
-                var_result = model.calculate_var(confidence, horizon)
-                results.append({
-                    'ticker': ticker,
-                    'confidence_level': f"{confidence*100:.2f}%",
-                    'var_percentage': var_result['var_percentage'],
-                    'day1_var': var_result['daily_vars'][0],
-                    'volatility': var_result['cumulative_volatility']
-                })
+        model = get_fitted_model(ticker, returns) if get_fitted_model else None
+        if model is None:
+            model = GARCHVaRModel(returns)
+            if not model.fit():
+                continue
+        models[ticker] = model
+
+    # GARCH(1,1) term structures for all tickers come from one closed-form evaluation.
+    variances = {}
+    garch11 = [ticker for ticker, model in models.items() if model.is_garch11]
+    if garch11:
+        params = [models[ticker].get_params() for ticker in garch11]
+        stacked = garch_variance_term_structure(*(np.array([param[name] for param in params]) for name in ('omega', 'alpha', 'beta')),
+                                                np.array([models[ticker].next_variance() for ticker in garch11]), horizon)
+        variances.update(zip(garch11, stacked))
+    for ticker, model in models.items():
+        if ticker not in variances:
+            variances[ticker] = model.forecast_volatility(horizon)['Variance'].to_numpy()
+
+    levels = 1 - np.asarray(confidence_level, dtype=np.float64)
+    results = []
+    for ticker, sector in zip(panel.tickers, panel.sectors):
+        if ticker not in variances:
+            continue
+        z_scores = models[ticker].innovation_quantiles(levels)
+        cumulative_volatility = np.sqrt(np.cumsum(variances[ticker]))
+        for confidence, z_score in zip(confidence_level, z_scores):
+            results.append({
+                'ticker': ticker,
+                'sector': sector,
+                'confidence_level': f"{confidence*100:.2f}%",
+                'var_percentage': z_score * cumulative_volatility[-1],
+                'day1_var': z_score * cumulative_volatility[0],
+                'volatility': cumulative_volatility[-1]
+            })
     return pd.DataFrame(results)
-        
\ No newline at end of file
@@ -0,0 +1,189 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from config import NIFTY_50_STOCKS, NIFTY_50_COMPANY_NAMES
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Reciprocal-rank fusion constant; a hit mentioning a queried ticker gains as much as a first place in one ranking.
+RRF_K = 60
+ENTITY_BOOST = 1 / (RRF_K + 1)
+
+_TOKEN = re.compile(r'[a-z0-9]+(?:&[a-z0-9]+)*')
+STOPWORDS = frozenset("""
+a an and are as at be by did do does for from has have how i in is it its me of on or so that the this to
+was what when where which who why will with ns
+""".split())
+# Words that still leave a query about the ticker alone, e.g. "latest INFY news".
+TICKER_QUERY_TERMS = frozenset('news latest recent headlines headline today update updates stock stocks share shares about'.split())
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(str(text).lower().replace("'", ''))
+
+
+def _alias_table() -> Dict[str, List[Tuple[Tuple[str, ...], str]]]:
+    # First token -> (phrase, ticker), longest phrases first so 'sbi life' wins over 'sbi'.
+    table = {}
+    for ticker in NIFTY_50_STOCKS:
+        for alias in [ticker.split('.')[0]] + NIFTY_50_COMPANY_NAMES.get(ticker, []):
+            phrase = tuple(tokenize(alias))
+            if phrase:
+                table.setdefault(phrase[0], []).append((phrase, ticker))
+    for candidates in table.values():
+        candidates.sort(key=lambda item: -len(item[0]))
+    return table
+
+ALIASES = _alias_table()
+TICKER_TERMS = {ticker: sorted({token for phrases in ALIASES.values() for phrase, match in phrases if match == ticker for token in phrase} - STOPWORDS)
+                for ticker in NIFTY_50_STOCKS}
+
+
+def ticker_spans(tokens: Sequence[str]) -> List[Tuple[int, int, str]]:
+    """
+    Non-overlapping (start, end, ticker) mentions of NIFTY_50_STOCKS symbols or company names, longest match first.
+    """
+    spans, position = [], 0
+    while position < len(tokens):
+        for phrase, ticker in ALIASES.get(tokens[position], []):
+            if tuple(tokens[position:position + len(phrase)]) == phrase:
+                spans.append((position, position + len(phrase), ticker))
+                position += len(phrase)
+                break
+        else:
+            position += 1
+    return spans
+
+def find_tickers(text: str) -> List[str]:
+    return list(dict.fromkeys(ticker for _, _, ticker in ticker_spans(tokenize(text))))
+
+def ticker_query(query: str) -> List[str]:
+    """
+    The tickers a query asks about when it names nothing else ("ADANIENT", "latest Infosys news"), else [].
+    """
+    tokens = tokenize(query)
+    spans = ticker_spans(tokens)
+    covered = {position for start, end, _ in spans for position in range(start, end)}
+    if not spans or any(token not in STOPWORDS and token not in TICKER_QUERY_TERMS
+                        for position, token in enumerate(tokens) if position not in covered):
+        return []
+    return list(dict.fromkeys(ticker for _, _, ticker in spans))
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over documents numbered 0, 1, ... in insertion order.
+
+    Rows line up with VectorIndex rows, and sync() indexes whatever the vector index has
+    stored beyond the rows seen so far, so lexical and embedding hits refer to the same
+    metadata. Each document is also tagged with the NIFTY_50_STOCKS tickers it mentions,
+    by symbol or company name, and queries naming a ticker are expanded with its name terms.
+    """
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lengths: List[int] = []
+        self._length_array = np.zeros(0)
+        self._total_length = 0
+        self.entities: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, texts: Iterable[str]) -> int:
+        """
+        Index documents as the next rows. Returns the number added.
+        """
+        with self._lock:
+            return self._add(texts)
+
+    def sync(self, metadata: List[Dict]) -> int:
+        """
+        Index the 'text' of stored vector-index rows that are not indexed yet.
+
+        The offset is read under the lock, so concurrent syncs never index a row twice.
+        """
+        with self._lock:
+            return self._add([item['text'] for item in metadata[len(self._lengths):]])
+
+    def _add(self, texts: Iterable[str]) -> int:
+        added = 0
+        for text in texts:
+            row = len(self._lengths)
+            tokens = tokenize(text)
+            for ticker in dict.fromkeys(ticker for _, _, ticker in ticker_spans(tokens)):
+                self.entities.setdefault(ticker, []).append(row)
+            terms = [token for token in tokens if token not in STOPWORDS]
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                rows, frequencies = self._postings.setdefault(term, ([], []))
+                rows.append(row)
+                frequencies.append(count)
+                self._arrays.pop(term, None)
+            self._lengths.append(len(terms))
+            self._total_length += len(terms)
+            added += 1
+        if added:
+            self._length_array = np.asarray(self._lengths, dtype=np.float64)
+        return added
+
+    def _posting(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            rows, frequencies = self._postings[term]
+            arrays = self._arrays[term] = (np.asarray(rows, dtype=np.int64), np.asarray(frequencies, dtype=np.float64))
+        return arrays
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Top-k (row, BM25 score) pairs for a query, best first; tickers it names add their name terms.
+        """
+        tokens = tokenize(query)
+        terms = [token for token in tokens if token not in STOPWORDS]
+        for ticker in dict.fromkeys(ticker for _, _, ticker in ticker_spans(tokens)):
+            terms.extend(TICKER_TERMS[ticker])
+        with self._lock:
+            n_docs = len(self._lengths)
+            terms = [term for term in dict.fromkeys(terms) if term in self._postings]
+            if not n_docs or not terms:
+                return []
+            average_length = max(self._total_length / n_docs, 1.0)
+            all_rows, all_scores = [], []
+            for term in terms:
+                rows, frequencies = self._posting(term)
+                idf = np.log1p((n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * self._length_array[rows] / average_length)
+                all_rows.append(rows)
+                all_scores.append(idf * frequencies * (self.k1 + 1) / (frequencies + norm))
+        rows, inverse = np.unique(np.concatenate(all_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[position]), float(scores[position])) for position in top]
+
+    def ticker_rows(self, tickers: Iterable[str]) -> set:
+        with self._lock:
+            return {row for ticker in tickers for row in self.entities.get(ticker, [])}
+
+
+def fuse_rankings(rankings: Sequence[Sequence[int]], boosted: Optional[set] = None, k: int = 10) -> List[Tuple[int, float]]:
+    """
+    Reciprocal-rank fusion of ranked row lists, plus ENTITY_BOOST for rows in `boosted`.
+
+    Returns:
+        List[Tuple[int, float]]: Top-k (row, fused score) pairs, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            scores[row] = scores.get(row, 0.0) + 1 / (RRF_K + rank + 1)
+    for row in scores.keys() & (boosted or set()):
+        scores[row] += ENTITY_BOOST
+    return sorted(scores.items(), key=lambda item: -item[1])[:k]
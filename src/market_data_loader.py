@@ -1,10 +1,135 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Callable, Optional, Tuple
 import streamlit as st
-from config import NIFTY_50_STOCKS, HISTORICAL_DATA_START_DATE
+from config import (NIFTY_50_STOCKS, HISTORICAL_DATA_START_DATE, PRICE_STORE_MAX_AGE,
+                    DOWNLOAD_BATCH_SIZE, DOWNLOAD_MAX_WORKERS)
+from price_store import PriceStore, normalize_ohlcv
+from returns_panel import ReturnsPanel
+from data_providers import MarketDataProvider, get_provider, download_with_retries
+
+_price_store = PriceStore()
+
+def _plan_request(ticker: str, start_date: str, end_date: str, max_age: float) -> Optional[Tuple[str, str]]:
+    """
+    Decide what a ticker needs from the provider given the store's metadata.
+
+    Returns:
+        Optional[Tuple[str, str]]: ('full' | 'tail', request start date), or None if the store is fresh.
+    """
+    meta = _price_store.metadata(ticker)
+    if meta is None or meta['start_date'] > start_date:
+        return ('full', start_date)
+    if time.time() - meta['checked_at'] < max_age:
+        return None
+    tail_start = (pd.Timestamp(meta['last_date']) + timedelta(days=1)).strftime('%Y-%m-%d')
+    if tail_start >= end_date:
+        _price_store.touch(ticker)
+        return None
+    return ('tail', tail_start)
+
+def _store_batch(provider: MarketDataProvider, mode: str, tickers: List[str], request_start: str, start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+    frames = download_with_retries(provider, tickers, request_start, end_date)
+    stored = {}
+    for ticker in tickers:
+        frame = frames.get(ticker)
+        if mode == 'full':
+            stored[ticker] = _price_store.replace(ticker, frame, start_date)
+        else:
+            stored[ticker] = _price_store.append(ticker, frame)
+    return stored
+
+def _slice_from(stock_data: pd.DataFrame, start_date: str) -> pd.DataFrame:
+    if stock_data.empty:
+        return stock_data
+    return stock_data[stock_data['Date'] >= start_date].reset_index(drop=True)
+
+def sync_tickers(tickers: List[str], start_date: str = HISTORICAL_DATA_START_DATE, provider: MarketDataProvider = None,
+                 on_ticker_done: Callable[[str, pd.DataFrame, Optional[Exception]], None] = None,
+                 max_age: float = PRICE_STORE_MAX_AGE) -> Dict[str, pd.DataFrame]:
+    """
+    Bring the on-disk price store up to date for several tickers and return their history.
+
+    Tickers whose store was checked within max_age seconds are read from disk,
+    and local providers bypass the store entirely. The rest are grouped by request start date
+    into batches of DOWNLOAD_BATCH_SIZE, and the batches are fetched concurrently on at most
+    DOWNLOAD_MAX_WORKERS threads, each with the provider's timeout and DOWNLOAD_RETRIES retries.
+    Only bars after the last stored date are requested for tickers already in the store.
+
+    Args:
+        tickers (List[str]): List of stock ticker symbols.
+        start_date (str): Start date for the returned data in 'YYYY-MM-DD' format.
+        provider (MarketDataProvider): Data source, defaults to get_provider().
+        on_ticker_done (Callable): Called on the calling thread as (ticker, data, error) once each ticker finishes.
+        max_age (float): Seconds since the last provider check for which the store is considered fresh.
+
+    Returns:
+        Dict[str, pd.DataFrame]: Historical data from start_date keyed by ticker, empty DataFrame when unavailable.
+    """
+    provider = provider or get_provider()
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    results = {}
+
+    def finish(ticker, stock_data, error=None):
+        results[ticker] = _slice_from(stock_data, start_date)
+        if on_ticker_done is not None:
+            on_ticker_done(ticker, results[ticker], error)
+
+    if not provider.use_price_store:
+        frames = download_with_retries(provider, list(dict.fromkeys(tickers)), start_date, end_date)
+        for ticker in dict.fromkeys(tickers):
+            stock_data = normalize_ohlcv(frames.get(ticker))
+            finish(ticker, stock_data.assign(returns=stock_data['Close'].astype('float64').pct_change()) if not stock_data.empty else pd.DataFrame())
+        return results
+
+    groups = {}
+    for ticker in dict.fromkeys(tickers):
+        plan = _plan_request(ticker, start_date, end_date, max_age)
+        if plan is None:
+            finish(ticker, _price_store.read(ticker))
+        else:
+            groups.setdefault(plan, []).append(ticker)
+
+    batches = [(mode, request_start, group[i:i + DOWNLOAD_BATCH_SIZE])
+               for (mode, request_start), group in groups.items()
+               for i in range(0, len(group), DOWNLOAD_BATCH_SIZE)]
+    if not batches:
+        return results
+
+    with ThreadPoolExecutor(max_workers=min(DOWNLOAD_MAX_WORKERS, len(batches))) as executor:
+        futures = {executor.submit(_store_batch, provider, mode, batch, request_start, start_date, end_date): batch
+                   for mode, request_start, batch in batches}
+        for future in as_completed(futures):
+            try:
+                stored = future.result()
+            except Exception as e:
+                for ticker in futures[future]:
+                    finish(ticker, _price_store.read(ticker), e)
+                continue
+            for ticker, stock_data in stored.items():
+                finish(ticker, stock_data)
+    return results
+
+def sync_ticker(ticker: str, start_date: str = HISTORICAL_DATA_START_DATE, provider: MarketDataProvider = None) -> pd.DataFrame:
+    """
+    Bring the on-disk price store up to date for a ticker and return its history.
+
+    Args:
+        ticker (str): Stock ticker symbol.
+        start_date (str): Start date for the returned data in 'YYYY-MM-DD' format.
+        provider (MarketDataProvider): Data source, defaults to get_provider().
+        
+    Returns:
+        pd.DataFrame: Historical stock data from start_date, empty if the provider has none.
+    """
+    errors = []
+    stock_data = sync_tickers([ticker], start_date, provider, lambda t, df, error: errors.append(error) if error else None)[ticker]
+    if errors and stock_data.empty:
+        raise errors[0]
+    return stock_data
 
 @st.cache_data(ttl=3600)
 def fetch_stock_data(ticker: str, start_date: str = HISTORICAL_DATA_START_DATE) -> pd.DataFrame:
@@ -19,14 +144,11 @@ def fetch_stock_data(ticker: str, start_date: str = HISTORICAL_DATA_START_DATE)
         pd.DataFrame: DataFrame containing historical stock data.
     """
     try:
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        stock_data = yf.download(ticker, start=start_date, end=end_date)
-        stock_data.reset_index(inplace=True)
+        stock_data = sync_ticker(ticker, start_date)
 
         if stock_data.empty:
             st.warning(f"No data found for {ticker}.")
             return pd.DataFrame()
-        stock_data['returns'] = stock_data['Close'].pct_change().dropna()
         
         return stock_data
     except Exception as e:
@@ -59,17 +181,42 @@ def fetch_multiple_stocks(tickers: List[str], start_date: str = HISTORICAL_DATA_
 
     progress_bar = st.progress(0)
     status_text = st.empty()
+    status_text.text(f"Fetching data for {len(tickers)} tickers...")
+    completed = []
 
-    for idx,ticker in enumerate(tickers):
-        status_text.text(f"Fetching data for {ticker}...")
-        df = fetch_stock_data(ticker, start_date)
-        if not df.empty:
+    def on_ticker_done(ticker, df, error):
+        completed.append(ticker)
+        if error is not None and df.empty:
+            st.warning(f"Error fetching data for {ticker}: {error}")
+        elif df.empty:
+            st.warning(f"No data found for {ticker}.")
+        else:
             stock_data_dict[ticker] = df
-        progress_bar.progress((idx + 1) / len(tickers))
+        status_text.text(f"Fetched data for {ticker} ({len(completed)}/{len(tickers)})")
+        progress_bar.progress(len(completed) / len(tickers))
+
+    sync_tickers(tickers, start_date, on_ticker_done=on_ticker_done)
     status_text.text("Data fetching complete.")
     progress_bar.empty()
     status_text.empty()
-    return stock_data_dict
+    return {ticker: stock_data_dict[ticker] for ticker in tickers if ticker in stock_data_dict}
+
+@st.cache_resource(ttl=3600)
+def get_returns_panel(tickers: Tuple[str, ...], start_date: str = HISTORICAL_DATA_START_DATE) -> ReturnsPanel:
+    """
+    Build the aligned returns panel for a set of tickers once per data refresh.
+
+    The panel is a shared resource: every session asking for the same tickers receives
+    the same read-only object instead of its own copy of the per-ticker DataFrames.
+    
+    Args:
+        tickers (Tuple[str, ...]): Stock ticker symbols.
+        start_date (str): Start date for fetching data in 'YYYY-MM-DD' format.
+        
+    Returns:
+        ReturnsPanel: Date-aligned returns with a validity mask and sector index.
+    """
+    return ReturnsPanel.from_frames(fetch_multiple_stocks(list(tickers), start_date))
 
 def get_stock_sector(ticker: str) -> str:
     """
@@ -0,0 +1,115 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import GARCH_P, GARCH_Q, MODEL_CACHE_DIR, MODEL_CACHE_SIZE
+from garch_model import GARCHVaRModel, distribution_parameter_names
+
+
+class FittedModelCache:
+    """
+    Two-tier cache of fitted GARCH parameters keyed by the data they were fitted on.
+
+    The key combines the ticker, the last observation date, a hash of the returns and the
+    model specification, so any new or revised observation misses. Hits are served from an
+    in-memory LRU first and then from one small JSON file per key on disk, and are rebuilt
+    with GARCHVaRModel.from_params without running the optimizer. Only GARCH(1,1) fits are
+    cached, since those are the only ones from_params can rebuild.
+    """
+    def __init__(self, root: str = MODEL_CACHE_DIR, max_entries: int = MODEL_CACHE_SIZE):
+        self.root = root
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key(ticker: str, returns: pd.Series, p: int = GARCH_P, q: int = GARCH_Q, dist: str = 'normal') -> str:
+        if not isinstance(returns.index, pd.DatetimeIndex):
+            raise ValueError("Returns must be indexed by date to be cached.")
+        last_date = pd.Timestamp(returns.index[-1]).strftime('%Y-%m-%d') if len(returns) else ''
+        data_hash = hashlib.sha1(np.ascontiguousarray(returns.to_numpy(dtype=np.float64)).tobytes()).hexdigest()
+        spec = f"{ticker}|{last_date}|{data_hash}|{p}|{q}|{dist}"
+        return hashlib.sha1(spec.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def _remember(self, key: str, params: Dict[str, float]) -> None:
+        with self._lock:
+            self._memory[key] = params
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _load_params(self, key: str) -> Optional[Dict[str, float]]:
+        with self._lock:
+            params = self._memory.get(key)
+            if params is not None:
+                self._memory.move_to_end(key)
+                return params
+        try:
+            with open(self._path(key)) as f:
+                params = json.load(f)['params']
+        except (OSError, ValueError, KeyError):
+            return None
+        self._remember(key, params)
+        return params
+
+    def get(self, ticker: str, returns: pd.Series, p: int = GARCH_P, q: int = GARCH_Q, dist: str = 'normal') -> Optional[GARCHVaRModel]:
+        """
+        Rebuild a cached model for exactly these returns, or None on a miss.
+        """
+        if (p, q) != (1, 1) or returns.empty:
+            return None
+        params = self._load_params(self.key(ticker, returns, p, q, dist))
+        # Entries written without the distribution's shape parameters cannot be rebuilt; refit them.
+        if params is None or any(name not in params for name in distribution_parameter_names(dist)):
+            return None
+        return GARCHVaRModel.from_params(returns, params, dist)
+
+    def put(self, ticker: str, returns: pd.Series, model: GARCHVaRModel) -> None:
+        """
+        Store the parameters of a fitted model in both tiers.
+        """
+        if not model.is_garch11 or not model.is_fitted or returns.empty:
+            return
+        key = self.key(ticker, returns, model.p, model.q, model.dist)
+        params = model.get_params()
+        self._remember(key, params)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'ticker': ticker, 'dist': model.dist, 'params': params}, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_or_fit(self, ticker: str, returns: pd.Series, p: int = GARCH_P, q: int = GARCH_Q, dist: str = 'normal') -> Optional[GARCHVaRModel]:
+        """
+        Cached model for these returns, fitting and caching a new one on a miss.
+
+        Returns:
+            Optional[GARCHVaRModel]: Forecast-ready model, or None if the fit failed.
+        """
+        model = self.get(ticker, returns, p, q, dist)
+        if model is not None:
+            return model
+        model = GARCHVaRModel(returns, p=p, q=q, dist=dist)
+        if not model.fit():
+            return None
+        self.put(ticker, returns, model)
+        return model
+
+
+@st.cache_resource
+def get_model_cache() -> FittedModelCache:
+    return FittedModelCache()
@@ -0,0 +1,201 @@
+import os
+import re
+import sys
+import json
+import time
+import pickle
+import hashlib
+import tempfile
+import argparse
+import threading
+from urllib.parse import quote, unquote
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import MODEL_REGISTRY_DIR, MODEL_REGISTRY_MAX_STALE_DAYS, MODEL_REGISTRY_KEEP
+from garch_model import GARCHVaRModel, distribution_parameter_names
+from model_cache import FittedModelCache, get_model_cache
+
+ARTIFACT_PATTERN = re.compile(r'^v(\d+)\.json$')
+
+
+def returns_hash(returns: pd.Series) -> str:
+    # Rounded so returns recomputed from the same prices hash identically.
+    return hashlib.sha1(np.round(returns.to_numpy(dtype=np.float64), 10).tobytes()).hexdigest()
+
+
+class ModelRegistry:
+    """
+    Versioned, parameter-only GARCH artifacts per ticker.
+
+    Each artifact is a small JSON file `<ticker>/v<version>.json` holding the GARCH(1,1)
+    parameters, the model spec and the training data it came from (date range, row count
+    and a hash of the returns). The latest artifact of every ticker is read into memory
+    when the registry is created, so a model for fresh data can be rebuilt with
+    GARCHVaRModel.from_params straight away. An artifact stays valid while its training
+    returns are an unrevised prefix of the current returns and at most max_stale_days newer
+    observations have arrived; otherwise the model is refitted and a new version written.
+    """
+    def __init__(self, root: str = MODEL_REGISTRY_DIR, max_stale_days: int = MODEL_REGISTRY_MAX_STALE_DAYS,
+                 keep: int = MODEL_REGISTRY_KEEP, model_cache: Optional[FittedModelCache] = None):
+        self.root = root
+        self.max_stale_days = max_stale_days
+        self.keep = keep
+        self.model_cache = model_cache
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._latest = {ticker: artifact for ticker in self.tickers() if (artifact := self._read_latest(ticker)) is not None}
+
+    def _ticker_dir(self, ticker: str) -> str:
+        return os.path.join(self.root, quote(ticker, safe='.-'))
+
+    def tickers(self) -> List[str]:
+        return sorted(unquote(entry) for entry in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, entry)))
+
+    def versions(self, ticker: str) -> List[int]:
+        path = self._ticker_dir(ticker)
+        if not os.path.isdir(path):
+            return []
+        return sorted(int(match.group(1)) for entry in os.listdir(path) if (match := ARTIFACT_PATTERN.match(entry)))
+
+    def read(self, ticker: str, version: int) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self._ticker_dir(ticker), f"v{version:04d}.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_latest(self, ticker: str) -> Optional[Dict]:
+        for version in reversed(self.versions(ticker)):
+            artifact = self.read(ticker, version)
+            if artifact is not None:
+                return artifact
+        return None
+
+    def latest(self, ticker: str) -> Optional[Dict]:
+        with self._lock:
+            return self._latest.get(ticker)
+
+    def register(self, ticker: str, returns: pd.Series, model: GARCHVaRModel, source: str = 'fit') -> Dict:
+        """
+        Write the parameters of a GARCH(1,1) fitted on `returns` as the ticker's next version.
+        """
+        if not model.is_garch11:
+            raise ValueError("Only GARCH(1,1) models can be registered.")
+        if not isinstance(returns.index, pd.DatetimeIndex):
+            raise ValueError("Returns must be indexed by date to be registered.")
+        artifact = {
+            'ticker': ticker,
+            'spec': {'vol': model.vol, 'p': model.p, 'o': model.o, 'q': model.q, 'dist': model.dist},
+            'params': model.get_params(),
+            'training': {
+                'start': pd.Timestamp(returns.index[0]).strftime('%Y-%m-%d'),
+                'end': pd.Timestamp(returns.index[-1]).strftime('%Y-%m-%d'),
+                'rows': int(len(returns)),
+                'data_hash': returns_hash(returns)
+            },
+            'source': source,
+            'created_at': time.time()
+        }
+        path = self._ticker_dir(ticker)
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            versions = self.versions(ticker)
+            artifact['version'] = (versions[-1] if versions else 0) + 1
+            fd, tmp_path = tempfile.mkstemp(dir=path, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(artifact, f)
+            os.replace(tmp_path, os.path.join(path, f"v{artifact['version']:04d}.json"))
+            for old_version in (versions + [artifact['version']])[:-self.keep]:
+                os.remove(os.path.join(path, f"v{old_version:04d}.json"))
+            self._latest[ticker] = artifact
+        return artifact
+
+    def is_valid(self, artifact: Dict, returns: pd.Series) -> bool:
+        """
+        Whether an artifact was trained on an unrevised prefix of `returns` that is recent enough.
+        """
+        training = artifact['training']
+        rows = training['rows']
+        if len(returns) < rows or len(returns) - rows > self.max_stale_days:
+            return False
+        prefix = returns.iloc[:rows]
+        return (pd.Timestamp(prefix.index[-1]).strftime('%Y-%m-%d') == training['end']
+                and returns_hash(prefix) == training['data_hash'])
+
+    def load_or_fit(self, ticker: str, returns: pd.Series, dist: str = 'normal') -> Optional[GARCHVaRModel]:
+        """
+        Forecast-ready GARCH(1,1) for a ticker without running the optimizer when possible.
+
+        Tries the exact-data fitted-model cache, then the latest valid registry artifact, and
+        only then fits and registers a new version.
+
+        Returns:
+            Optional[GARCHVaRModel]: The model, or None if a required fit failed.
+        """
+        if self.model_cache is not None:
+            model = self.model_cache.get(ticker, returns, dist=dist)
+            if model is not None:
+                return model
+        artifact = self.latest(ticker)
+        if (artifact is not None and artifact['spec']['dist'] == dist and self.is_valid(artifact, returns)
+                and all(name in artifact['params'] for name in distribution_parameter_names(dist))):
+            return GARCHVaRModel.from_params(returns, artifact['params'], dist)
+        return self.refit(ticker, returns, dist)
+
+    def refit(self, ticker: str, returns: pd.Series, dist: str = 'normal') -> Optional[GARCHVaRModel]:
+        """
+        Fit a fresh GARCH(1,1) on `returns` and register it as a new version.
+        """
+        model = self.model_cache.get_or_fit(ticker, returns, dist=dist) if self.model_cache else GARCHVaRModel(returns, dist=dist)
+        if model is None or not (model.is_fitted or model.fit()):
+            return None
+        self.register(ticker, returns, model)
+        return model
+
+    def import_pickle(self, ticker: str, pickle_path: str) -> Dict:
+        """
+        Convert a pickled arch GARCH(1,1) result (as written by the notebooks) into an artifact.
+
+        Only load pickles from trusted sources; unpickling can execute arbitrary code.
+        """
+        with open(pickle_path, 'rb') as f:
+            result = pickle.load(f)
+        returns = pd.Series(np.asarray(result.model._y_original, dtype=np.float64) / 100, index=pd.DatetimeIndex(result.model._y_original.index))
+        model = GARCHVaRModel.from_params(returns, {
+            'mu': float(result.params['mu']),
+            'omega': float(result.params['omega']),
+            'alpha': float(result.params['alpha[1]']),
+            'beta': float(result.params['beta[1]'])
+        })
+        return self.register(ticker, returns, model, source=os.path.basename(pickle_path))
+
+
+@st.cache_resource
+def get_model_registry() -> ModelRegistry:
+    return ModelRegistry(model_cache=get_model_cache())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage versioned GARCH model artifacts.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help='Import a pickled arch result from the notebooks')
+    import_parser.add_argument('pickle_path')
+    import_parser.add_argument('--ticker', required=True)
+    subparsers.add_parser('list', help='Show the latest artifact per ticker')
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry()
+    if args.command == 'import':
+        artifact = registry.import_pickle(args.ticker, args.pickle_path)
+        print(f"{args.ticker}: registered v{artifact['version']} trained {artifact['training']['start']} to {artifact['training']['end']}")
+    else:
+        for ticker in registry.tickers():
+            artifact = registry.latest(ticker)
+            if artifact is not None:
+                print(f"{ticker}: v{artifact['version']} {artifact['training']['start']} to {artifact['training']['end']} ({artifact['source']})")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
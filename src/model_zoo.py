@@ -0,0 +1,210 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import as_completed
+from typing import Dict, List, Optional, Callable
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import MODEL_SELECTION_DIR, MODEL_ZOO_CRITERION, MODEL_ZOO_HOLDOUT, MODEL_ZOO_WORKERS
+from garch_model import GARCHVaRModel, get_process_pool
+from model_cache import FittedModelCache
+
+VOLATILITY_MODELS = {
+    'GARCH': {'vol': 'Garch', 'p': 1, 'o': 0, 'q': 1},
+    'GJR-GARCH': {'vol': 'Garch', 'p': 1, 'o': 1, 'q': 1},
+    'EGARCH': {'vol': 'EGARCH', 'p': 1, 'o': 1, 'q': 1},
+    'EWMA': {'vol': 'EWMA', 'p': 0, 'o': 0, 'q': 0}
+}
+
+INNOVATION_DISTRIBUTIONS = ['normal', 't', 'skewt']
+
+SELECTION_CRITERIA = ('aic', 'bic', 'backtest')
+
+DEFAULT_CANDIDATES = [f"{model_name}/{dist}" for model_name in VOLATILITY_MODELS for dist in INNOVATION_DISTRIBUTIONS]
+
+
+def build_model(candidate: str, returns: pd.Series) -> GARCHVaRModel:
+    """
+    Unfitted GARCHVaRModel for a candidate name such as 'GJR-GARCH/t'.
+    """
+    model_name, dist = candidate.split('/')
+    return GARCHVaRModel(returns, dist=dist, **VOLATILITY_MODELS[model_name])
+
+def holdout_quantile_loss(candidate: str, returns: pd.Series, holdout: int = MODEL_ZOO_HOLDOUT, level: float = 0.05) -> float:
+    """
+    Out-of-sample pinball loss of a candidate's one-step-ahead VaR quantile (lower is better).
+
+    The candidate is fitted on everything before the last `holdout` returns, and its
+    parameters are then held fixed to filter the holdout.
+    """
+    train = build_model(candidate, returns.iloc[:-holdout])
+    if not train.fit():
+        return np.inf
+    params = train.fitted_model.params
+    distribution = train.model.distribution
+    filtered = build_model(candidate, returns)._build_model().fix(params)
+
+    volatility = filtered.conditional_volatility[-holdout:].to_numpy()
+    quantile = params['mu'] + volatility * distribution.ppf(level, params[distribution.parameter_names()].to_numpy())
+    realized = returns.iloc[-holdout:].to_numpy() * 100
+    breach = (realized < quantile).astype(np.float64)
+    return float(np.mean((level - breach) * (realized - quantile)))
+
+def score_candidate(candidate: str, returns: pd.Series, criterion: str = MODEL_ZOO_CRITERION,
+                    holdout: int = MODEL_ZOO_HOLDOUT) -> Optional[Dict]:
+    """
+    Fit one candidate and score it: 'candidate', 'aic', 'bic' and, for the 'backtest'
+    criterion, the holdout quantile loss. None if the fit failed.
+    """
+    model = build_model(candidate, returns)
+    if not model.fit():
+        return None
+    score = {'candidate': candidate, 'aic': float(model.fitted_model.aic), 'bic': float(model.fitted_model.bic)}
+    if criterion == 'backtest':
+        score['backtest'] = holdout_quantile_loss(candidate, returns, holdout) if len(returns) > 2 * holdout else np.inf
+    return score
+
+def _selection(ticker: str, criterion: str, scores: List[Optional[Dict]]) -> Dict:
+    scores = [score for score in scores if score is not None]
+    selected = min(scores, key=lambda score: score[criterion])['candidate'] if scores else None
+    return {'ticker': ticker, 'criterion': criterion, 'selected': selected, 'scores': scores}
+
+def select_model(ticker: str, returns: pd.Series, candidates: List[str] = DEFAULT_CANDIDATES,
+                 criterion: str = MODEL_ZOO_CRITERION, holdout: int = MODEL_ZOO_HOLDOUT) -> Dict:
+    """
+    Fit every candidate for one ticker and pick the one with the lowest criterion.
+
+    Returns:
+        Dict: 'ticker', 'criterion', 'selected' (candidate name, or None if nothing fitted)
+        and 'scores', one score_candidate dict per fitted candidate.
+    """
+    if criterion not in SELECTION_CRITERIA:
+        raise ValueError(f"Unknown selection criterion: {criterion}")
+    return _selection(ticker, criterion, [score_candidate(candidate, returns, criterion, holdout) for candidate in candidates])
+
+
+class ModelSelectionCache:
+    """
+    Per-ticker model selections keyed by the returns they were made on.
+
+    Like FittedModelCache, the key covers the ticker, last observation date and a hash of the
+    returns, plus the criterion and candidate list, so a selection is reused until the data
+    or the question changes. Entries live in memory and as one JSON file per key on disk.
+    """
+    def __init__(self, root: str = MODEL_SELECTION_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._memory = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key(ticker: str, returns: pd.Series, criterion: str, candidates: List[str]) -> str:
+        last_date = pd.Timestamp(returns.index[-1]).strftime('%Y-%m-%d') if len(returns) else ''
+        data_hash = hashlib.sha1(np.ascontiguousarray(returns.to_numpy(dtype=np.float64)).tobytes()).hexdigest()
+        spec = f"{ticker}|{last_date}|{data_hash}|{criterion}|{','.join(candidates)}"
+        return hashlib.sha1(spec.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+        try:
+            with open(self._path(key)) as f:
+                selection = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._memory[key] = selection
+        return selection
+
+    def put(self, key: str, selection: Dict) -> None:
+        with self._lock:
+            self._memory[key] = selection
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(selection, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def select_models(returns: Dict[str, pd.Series], candidates: List[str] = DEFAULT_CANDIDATES, criterion: str = MODEL_ZOO_CRITERION,
+                  holdout: int = MODEL_ZOO_HOLDOUT, workers: int = MODEL_ZOO_WORKERS, cache: Optional[ModelSelectionCache] = None,
+                  on_ticker_done: Optional[Callable[[str, Dict], None]] = None) -> Dict[str, Dict]:
+    """
+    Run model selection for many tickers, one process-pool task per uncached (ticker, candidate).
+
+    Args:
+        returns (Dict[str, pd.Series]): Decimal returns keyed by ticker.
+        candidates (List[str]): Candidate names, 'MODEL/dist' with MODEL from VOLATILITY_MODELS.
+        criterion (str): 'aic', 'bic' or 'backtest' (holdout quantile loss).
+        holdout (int): Holdout length for the 'backtest' criterion.
+        workers (int): Worker processes; 1 runs in the calling process.
+        cache (Optional[ModelSelectionCache]): Where finished selections are looked up and stored.
+        on_ticker_done (Optional[Callable]): Called with (ticker, selection) as each ticker finishes.
+
+    Returns:
+        Dict[str, Dict]: select_model results keyed by ticker.
+    """
+    if criterion not in SELECTION_CRITERIA:
+        raise ValueError(f"Unknown selection criterion: {criterion}")
+    selections, pending = {}, {}
+    for ticker, series in returns.items():
+        key = ModelSelectionCache.key(ticker, series, criterion, candidates)
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            selections[ticker] = cached
+            if on_ticker_done:
+                on_ticker_done(ticker, cached)
+        else:
+            pending[ticker] = key
+
+    def finish(ticker, scores):
+        selection = _selection(ticker, criterion, scores)
+        selections[ticker] = selection
+        if cache and selection['selected'] is not None:
+            cache.put(pending[ticker], selection)
+        if on_ticker_done:
+            on_ticker_done(ticker, selection)
+
+    if workers > 1 and len(pending) * len(candidates) > 1:
+        pool = get_process_pool(workers)
+        futures = {pool.submit(score_candidate, candidate, returns[ticker], criterion, holdout): (ticker, position)
+                   for ticker in pending for position, candidate in enumerate(candidates)}
+        # Scores keep candidate order, so ties resolve as in the sequential path.
+        scores = {ticker: [None] * len(candidates) for ticker in pending}
+        remaining = {ticker: len(candidates) for ticker in pending}
+        for future in as_completed(futures):
+            ticker, position = futures[future]
+            scores[ticker][position] = future.result()
+            remaining[ticker] -= 1
+            if remaining[ticker] == 0:
+                finish(ticker, scores[ticker])
+    else:
+        for ticker in pending:
+            finish(ticker, [score_candidate(candidate, returns[ticker], criterion, holdout) for candidate in candidates])
+    return selections
+
+def fit_selected_model(ticker: str, returns: pd.Series, selection: Dict, model_cache: Optional[FittedModelCache] = None) -> Optional[GARCHVaRModel]:
+    """
+    Fitted model for a ticker's selected candidate; plain GARCH winners go through the fitted-model cache.
+    """
+    if selection.get('selected') is None:
+        return None
+    model = build_model(selection['selected'], returns)
+    if model.is_garch11 and model_cache is not None:
+        return model_cache.get_or_fit(ticker, returns, dist=model.dist)
+    return model if model.fit() else None
+
+
+@st.cache_resource
+def get_model_selection_cache() -> ModelSelectionCache:
+    return ModelSelectionCache()
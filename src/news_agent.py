@@ -1,20 +1,64 @@
 import os
+import re
+import ast
 import sys
 in_pydantic_v2 = True
-from typing import List, Dict
+import time
+import threading
+from typing import Iterator, List, Dict, Optional
 import pandas as pd
 import streamlit as st
 from datetime import datetime,timedelta
 import requests
-from newsapi import NewsApiClient
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, AutoModelForCausalLM, pipeline
-import torch
-from config import NEWS_API_KEY, HF_MODEL_NAME
+from config import NEWS_API_KEY, HF_MODEL_NAME, NEWS_ARCHIVE_PATH, NEWS_HEADLINES_PATH, VECTOR_INDEX_DIR
+from vector_index import VectorIndex
+from lexical_index import BM25Index, fuse_rankings, ticker_query, find_tickers
+
+# torch, transformers and sentence_transformers are imported on the loader thread (or at
+# first use), so importing this module does not hold up the VaR pages.
+
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+# Token budget for streamed replies, which sample one sequence since beam search cannot be streamed.
+STREAM_MAX_NEW_TOKENS = 300
+# Hits taken from each of the embedding and BM25 rankings before they are fused.
+RETRIEVAL_CANDIDATES = 50
+
+# Bare nan entries in the headline lists of consolidated_nifty_news.csv.
+_MISSING_HEADLINE = re.compile(r'(?<=[\[,\s])nan(?=\s*[,\]])')
+
+
+def load_news_corpus(archive_path: str = NEWS_ARCHIVE_PATH, headlines_path: str = NEWS_HEADLINES_PATH) -> List[Dict]:
+    """
+    Historical headlines from the JSON-lines news archive and the daily Nifty headline CSV,
+    as NewsAPI-style article dicts. Missing files are skipped.
+    """
+    articles = []
+    if os.path.exists(archive_path):
+        events = pd.read_json(archive_path, lines=True)
+        for event in events.itertuples(index=False):
+            if isinstance(event.Headline, str) and event.Headline.strip():
+                articles.append({'title': event.Headline, 'source': {'name': event.Source}, 'publishedAt': str(event.Date)[:10]})
+    if os.path.exists(headlines_path):
+        daily = pd.read_csv(headlines_path)
+        for date, headlines in zip(daily['Date'], daily['Headlines']):
+            try:
+                parsed = ast.literal_eval(_MISSING_HEADLINE.sub('None', str(headlines)))
+            except (ValueError, SyntaxError):
+                continue
+            for headline in parsed if isinstance(parsed, list) else []:
+                if isinstance(headline, str) and headline.strip():
+                    articles.append({'title': headline, 'source': {'name': 'Nifty headlines'}, 'publishedAt': str(date)})
+    return articles
 
 class NewsEmbeddingAgent:
+    """
+    News retrieval and chat assistant whose ML models load in the background.
+
+    Creating the agent is cheap: start_loading() imports the ML libraries and loads the
+    LLM and the embedding model on a daemon thread, and status() reports progress, so the
+    chat panel can show a warming-up state while the rest of the app renders.
+    """
     def __init__(self):
         self.news_api_key = NEWS_API_KEY
         self.model_name = HF_MODEL_NAME
@@ -22,47 +66,106 @@ class NewsEmbeddingAgent:
         self.newsapi = None
         if self.news_api_key:
             try:
+                from newsapi import NewsApiClient
                 self.newsapi = NewsApiClient(api_key=self.news_api_key)
             except:
                 pass
         
         self.llm_model = None
         self.llm_tokenizer = None
-        self.__initialize_llm()
+        self.model_type = None
+        self.device = 'cpu'
+        self.embedding_model = None
 
+        self.index = VectorIndex(os.path.join(VECTOR_INDEX_DIR, EMBEDDING_MODEL))
+        self.lexical = BM25Index()
+
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._status = {'phase': 'idle', 'started': None, 'load_seconds': None, 'index_seconds': None, 'errors': {}}
+
+    def start_loading(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._status.update(phase='loading', started=time.perf_counter())
+            self._thread = threading.Thread(target=self._load_models, name='news-agent-loader', daemon=True)
+        self._thread.start()
+
+    def _load_models(self):
+        errors = {}
+        # Headlines already on disk are searchable lexically before any model has loaded.
+        self.lexical.sync(self.index.metadata)
         try:
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.__initialize_llm()
         except Exception as e:
-            st.error(f"Error loading embedding model: {e}")
-            self.embedding_model = None
+            errors['llm'] = str(e)
+        try:
+            from sentence_transformers import SentenceTransformer
+            self.embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+        except Exception as e:
+            errors['embeddings'] = str(e)
+        # The chat is usable once the models are in; the archive is embedded afterwards on this thread.
+        with self._lock:
+            self._status.update(phase='indexing' if self.embedding_model is not None else 'ready',
+                                load_seconds=time.perf_counter() - self._status['started'], errors=dict(errors))
+        self._ready.set()
+        if self.embedding_model is None:
+            return
+        start = time.perf_counter()
+        try:
+            self.index_corpus()
+        except Exception as e:
+            errors['news archive'] = str(e)
+        with self._lock:
+            self._status.update(phase='ready', index_seconds=time.perf_counter() - start, errors=errors)
+
+    def _set_status(self, **kwargs):
+        with self._lock:
+            self._status.update(kwargs)
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
 
-        self.news_embeddings = []
-        self.news_documents = []
-        self.news_metadata = []
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        self.start_loading()
+        return self._ready.wait(timeout)
+
+    def status(self) -> Dict:
+        """
+        Snapshot of model loading: 'phase' ('idle', 'loading', 'indexing' or 'ready'), 'elapsed' seconds
+        since loading started, 'load_seconds' once the models are loaded (is_ready, while the news
+        archive may still be 'indexing'), 'index_seconds' once it is indexed, and 'errors' by component.
+        """
+        with self._lock:
+            status = dict(self._status)
+        status['elapsed'] = time.perf_counter() - status['started'] if status['started'] else None
+        return status
         
     def __initialize_llm(self):
-        try:
-            if 'flan-t5' in self.model_name.lower():
-                self.llm_tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-                self.llm_model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name,torch_dtype=torch.float32, low_cpu_mem_usage=True)
-                self.model_type = 'seq2seq'
-            elif 'mistral' in self.model_name.lower() or 'llama' in self.model_name.lower():
-                self.llm_tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-                self.llm_model = AutoModelForCausalLM.from_pretrained(self.model_name,torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32, low_cpu_mem_usage=True, device_map='auto' if torch.cuda.is_available() else None)
-                self.model_type = 'causal'
-            else:
-                self.model_name = 'google/flan-t5-base'
-                self.llm_tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-                self.llm_model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
-                self.model_type = 'seq2seq'
-            if torch.cuda.is_available() and self.model_type == 'seq2seq':
+        # Errors propagate to _load_models, which records them instead of calling st.error
+        # from a thread without a Streamlit script context.
+        import torch
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, AutoModelForCausalLM
+        if 'flan-t5' in self.model_name.lower():
+            self.llm_tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.llm_model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name,torch_dtype=torch.float32, low_cpu_mem_usage=True)
+            self.model_type = 'seq2seq'
+        elif 'mistral' in self.model_name.lower() or 'llama' in self.model_name.lower():
+            self.llm_tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.llm_model = AutoModelForCausalLM.from_pretrained(self.model_name,torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32, low_cpu_mem_usage=True, device_map='auto' if torch.cuda.is_available() else None)
+            self.model_type = 'causal'
+        else:
+            self.model_name = 'google/flan-t5-base'
+            self.llm_tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.llm_model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
+            self.model_type = 'seq2seq'
+        if torch.cuda.is_available():
+            self.device = 'cuda'
+            if self.model_type == 'seq2seq':
                 self.llm_model = self.llm_model.to('cuda')
-        
-        except Exception as e:
-            st.error(f"Error loading LLM model: {e}")
-            self.llm_model = None
-            self.llm_tokenizer = None
-            self.model_type = None
     def fetch_news(self, query: str = 'stock market India', days: int =7) -> List[Dict]:
         articles = []
         if not self.newsapi:
@@ -100,63 +203,67 @@ class NewsEmbeddingAgent:
                 'publishedAt': '2024-06-03T14:00:00Z'
             }
         ]
-    def create_embeddings(self, articles: List[str]) -> bool:
+    def _index_articles(self, articles: List[Dict]) -> int:
+        documents=[]
+        metadatas =[]
+
+        for article in articles:
+            text = f'{article.get("title","")} - {article.get("description","")} - {article.get("content","")}'
+            if text.strip():
+                documents.append(text)
+                metadatas.append({'title': article.get('title', ''),'source': article.get('source', {}).get('name',''),'published': article.get('publishedAt', '')})
+        added = self.index.add(documents, metadatas, lambda texts: self.embedding_model.encode(texts, convert_to_numpy=True, normalize_embeddings=True))
+        self.lexical.sync(self.index.metadata)
+        return added
+
+    def index_corpus(self) -> int:
+        """
+        Add the historical news archive to the vector index; already indexed headlines are skipped.
+        """
+        return self._index_articles(load_news_corpus())
+
+    def create_embeddings(self, articles: List[Dict]) -> bool:
         if not self.embedding_model:
             return False
         try:
-            self.news_embeddings = []
-            self.news_documents = []
-            self.news_metadata = []
-
-            documents=[]
-            metadatas =[]
-            ids=[]
-
-            for article in articles:
-                text = f'{article.get("title","")} - {article.get("description","")} - {article.get("content","")}'
-                if text.strip():
-                    documents.append(text)
-                    metadatas.append({'title': article.get('title', ''),'source': article.get('source', {}).get('name',''),'published': article.get('publishedAt', '')})
-            if documents:
-                embeddings = self.embedding_model.encode(documents, convert_to_tensor=True)
-                self.news_embeddings = embeddings
-                self.news_documents = documents
-                self.news_metadata = metadatas
-                return True
+            self._index_articles(articles)
+            return len(self.index) > 0
         except Exception as e:
             st.error(f"Error creating embeddings: {e}")
         return False
 
     def query_news(self, query: str, n_results: int = 3) -> List[Dict]:
-        if not self.embedding_model:
-            return []
+        """
+        Stored news most relevant to `query`.
+
+        Embedding and BM25 rankings are fused, and hits mentioning a ticker the query names get
+        a boost. A query that only names tickers ("ADANIENT", "latest Infosys news") is
+        answered from the BM25 index alone without running the encoder, as is every query while
+        the embedding model is unavailable.
+        """
         try:
-            query_embedding = self.embedding_model.encode([query], convert_to_numpy=True)
-
-            similarities = cosine_similarity(query_embedding, self.news_embeddings)[0]
-
-            top_indices = np.argsort(similarities)[::-1][:n_results]
-            article_results = []
-
-            for idx in top_indices:
-                
-                article_results.append({
-                        'content':self.news_documents[idx],
-                        'title': self.news_metadata[idx].get('title',''),
-                        'source': self.news_metadata[idx].get('source',''),
-                        'published': self.news_metadata[idx].get('published',''),
-                        'similarity': similarities[idx]
-                    })
-            return article_results
+            self.lexical.sync(self.index.metadata)
+            tickers = ticker_query(query)
+            lexical = [row for row, _ in self.lexical.search(query, RETRIEVAL_CANDIDATES)]
+            similarities = {}
+            if self.embedding_model and not tickers:
+                query_embedding = self.embedding_model.encode([query], convert_to_numpy=True, normalize_embeddings=True)[0]
+                similarities = {hit['row']: hit['similarity'] for hit in self.index.search(query_embedding, RETRIEVAL_CANDIDATES)}
+            rankings = [lexical, list(similarities)] if similarities else [lexical]
+            boosted = self.lexical.ticker_rows(tickers or find_tickers(query))
+            return [{
+                'content': self.index.metadata[row]['text'],
+                'title': self.index.metadata[row].get('title', ''),
+                'source': self.index.metadata[row].get('source', ''),
+                'published': self.index.metadata[row].get('published', ''),
+                'similarity': similarities.get(row),
+                'score': score
+            } for row, score in fuse_rankings(rankings, boosted, n_results)]
         except Exception as e:
             st.error(f"Error querying news: {e}")
             return []
-    def chat_completion(self, user_message: str, var_context: str ="", news_context: str ="") -> str:
-        if not self.llm_model or not self.llm_tokenizer:
-            return self._get_fallback_response(user_message, var_context)
-        try:
-            
-            system_context = f"""ou are a financial risk analyst assistant specialising in Value at Risk (VaR) predictions.
+    def _build_prompt(self, user_message: str, var_context: str, news_context: str) -> str:
+        system_context = f"""ou are a financial risk analyst assistant specialising in Value at Risk (VaR) predictions.
             Help users understand VaR calculations, market risks, and provide insights based on current market news.
 
             Context about current VaR calculations:
@@ -168,17 +275,23 @@ class NewsEmbeddingAgent:
             Provide clear, concise and actionale insights based on the above information.
             """
 
-            full_prompt = f"{system_context}\n\nUser Message: {user_message}\n\nAssistant:"
+        return f"{system_context}\n\nUser Message: {user_message}\n\nAssistant:"
+
+    def chat_completion(self, user_message: str, var_context: str ="", news_context: str ="") -> str:
+        if not self.llm_model or not self.llm_tokenizer:
+            return self._get_fallback_response(user_message, var_context)
+        try:
+            full_prompt = self._build_prompt(user_message, var_context, news_context)
             if self.model_type == 'seq2seq':
                 inputs = self.llm_tokenizer(full_prompt, return_tensors='pt', truncation=True, max_length=512)
-                if torch.cuda.is_available():
+                if self.device == 'cuda':
                     inputs = {key: val.to('cuda') for key, val in inputs.items()}
                 outputs = self.llm_model.generate(**inputs, max_length=300,num_beams=4, early_stopping=True, temperature=0.7, top_p=0.9, do_sample=True)
             
                 response = self.llm_tokenizer.decode(outputs[0], skip_special_tokens=True)
             elif self.model_type == 'causal':
                 inputs = self.llm_tokenizer(full_prompt, return_tensors='pt', truncation=True, max_length=1024)
-                if torch.cuda.is_available():
+                if self.device == 'cuda':
                     inputs = {key: val.to('cuda') for key, val in inputs.items()}
                 outputs = self.llm_model.generate(**inputs, max_length=300, temperature=0.7, top_p=0.9, do_sample=True,pad_token_id=self.llm_tokenizer.eos_token_id)
                 response = self.llm_tokenizer.decode(outputs[0], skip_special_tokens=True)
@@ -188,6 +301,72 @@ class NewsEmbeddingAgent:
         except Exception as e:
             st.error(f"Error generating response: {e}")
             return self._get_fallback_response(user_message, var_context)
+
+    def stream_chat_completion(self, user_message: str, var_context: str = "", news_context: str = "",
+                               cancel: Optional[threading.Event] = None, stats: Optional[Dict] = None) -> Iterator[str]:
+        """
+        chat_completion that yields text as the model generates it.
+
+        generate() runs on a worker thread feeding a TextIteratorStreamer; setting `cancel`, or
+        closing the iterator, stops it after the current token. If given, `stats` is filled in
+        at the end with 'ttft' (seconds to the first text), 'tokens' generated, 'seconds' in
+        total and 'tokens_per_second' after the first token; 'tokens' is None for the fallback.
+        """
+        stats = {} if stats is None else stats
+        stats.update(ttft=None, tokens=None, seconds=None, tokens_per_second=None)
+        if not self.llm_model or not self.llm_tokenizer or self.model_type not in ('seq2seq', 'causal'):
+            yield self._get_fallback_response(user_message, var_context)
+            return
+        import torch
+        from transformers import TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList
+
+        cancel = cancel or threading.Event()
+        steps = [0]
+
+        class CancelCriteria(StoppingCriteria):
+            # Called once per generated token, so it doubles as the token counter.
+            def __call__(self, input_ids, scores, **kwargs):
+                steps[0] += 1
+                return torch.full((input_ids.shape[0],), cancel.is_set(), dtype=torch.bool, device=input_ids.device)
+
+        full_prompt = self._build_prompt(user_message, var_context, news_context)
+        inputs = self.llm_tokenizer(full_prompt, return_tensors='pt', truncation=True, max_length=512 if self.model_type == 'seq2seq' else 1024)
+        if self.device == 'cuda':
+            inputs = {key: val.to('cuda') for key, val in inputs.items()}
+        streamer = TextIteratorStreamer(self.llm_tokenizer, skip_prompt=True, skip_special_tokens=True)
+        kwargs = dict(**inputs, streamer=streamer, max_new_tokens=STREAM_MAX_NEW_TOKENS, temperature=0.7, top_p=0.9, do_sample=True,
+                      stopping_criteria=StoppingCriteriaList([CancelCriteria()]))
+        if self.model_type == 'causal':
+            kwargs['pad_token_id'] = self.llm_tokenizer.eos_token_id
+        errors = []
+
+        def generate():
+            try:
+                with torch.no_grad():
+                    self.llm_model.generate(**kwargs)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        start = time.perf_counter()
+        thread = threading.Thread(target=generate, name='news-agent-generate', daemon=True)
+        thread.start()
+        try:
+            for text in streamer:
+                if text:
+                    if stats['ttft'] is None:
+                        stats['ttft'] = time.perf_counter() - start
+                    yield text
+        finally:
+            cancel.set()
+            stats.update(tokens=steps[0], seconds=time.perf_counter() - start)
+            if stats['ttft'] is not None and stats['seconds'] > stats['ttft']:
+                stats['tokens_per_second'] = max(steps[0] - 1, 0) / (stats['seconds'] - stats['ttft'])
+        if errors:
+            st.error(f"Error generating response: {errors[0]}")
+        if stats['ttft'] is None:
+            yield self._get_fallback_response(user_message, var_context)
+
     def _get_fallback_response(self, user_message: str, var_context: str) -> str:
         print("enforcing fallback response due to LLM error or unavailability.")
         response = "I'm here to help with your VaR predictions and market insights.\n\n"
@@ -204,4 +383,6 @@ class NewsEmbeddingAgent:
 
 @st.cache_resource
 def get_news_agent() -> NewsEmbeddingAgent:
-    return NewsEmbeddingAgent()
+    agent = NewsEmbeddingAgent()
+    agent.start_loading()
+    return agent
@@ -0,0 +1,153 @@
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from scipy import stats
+from config import VAR_PREDICTION_DAYS, EWMA_LAMBDA, DCC_A, DCC_B
+from garch_model import GARCHVaRModel, garch_filter
+from returns_panel import ReturnsPanel
+
+
+def _decay_weights(n_obs: int, decay: float) -> np.ndarray:
+    # Weight of each row in an exponentially weighted sum ending at the last row.
+    return decay ** np.arange(n_obs - 1, -1, -1, dtype=np.float64)
+
+def _weighted_cross_product(values: np.ndarray, mask: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Pairwise weighted mean of x_i * x_j over the rows where both columns are valid.
+    """
+    values = np.where(mask, values, 0.0)
+    observed = mask.astype(np.float64)
+    numerator = (values * weights[:, None]).T @ values
+    denominator = (observed * weights[:, None]).T @ observed
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+def _clip_to_psd(matrix: np.ndarray) -> np.ndarray:
+    # Pairwise estimates over ragged histories need not be positive semi-definite.
+    eigenvalues, eigenvectors = np.linalg.eigh((matrix + matrix.T) / 2)
+    if eigenvalues[0] >= 0:
+        return matrix
+    return (eigenvectors * np.maximum(eigenvalues, 0.0)) @ eigenvectors.T
+
+def ewma_covariance(panel: ReturnsPanel, decay: float = EWMA_LAMBDA) -> np.ndarray:
+    """
+    RiskMetrics EWMA covariance of the panel's percentage returns, as the next-day forecast.
+
+    The recursion S_t = decay * S_{t-1} + (1 - decay) * r_t r_t' is evaluated in closed form as
+    one weighted matrix product, with each pair normalised over the dates both names traded
+    and the result clipped to the nearest positive semi-definite matrix.
+
+    Returns:
+        np.ndarray: (N, N) covariance in percent squared, ordered like panel.tickers.
+    """
+    if panel.values.size == 0:
+        return np.empty((0, 0))
+    return _clip_to_psd(_weighted_cross_product(panel.values * 100, panel.mask, _decay_weights(len(panel.dates), decay)))
+
+def dcc_covariance(panel: ReturnsPanel, models: Dict[str, GARCHVaRModel], a: float = DCC_A, b: float = DCC_B) -> np.ndarray:
+    """
+    Next-day DCC-GARCH(1,1) covariance from fitted univariate GARCH models.
+
+    Returns are standardised by each ticker's conditional volatility, and the correlation
+    recursion Q_t = (1 - a - b) * Qbar + a * z_{t-1} z_{t-1}' + b * Q_{t-1}, started at Qbar,
+    is unrolled into one weighted matrix product. a and b are fixed rather than estimated.
+
+    Args:
+        panel (ReturnsPanel): Aligned returns.
+        models (Dict[str, GARCHVaRModel]): Fitted model for every ticker in the panel.
+        a (float): Weight on the latest standardised shock.
+        b (float): Weight on the previous correlation state.
+
+    Returns:
+        np.ndarray: (N, N) covariance in percent squared, ordered like panel.tickers.
+    """
+    n_obs, n_assets = panel.shape
+    if n_assets == 0:
+        return np.empty((0, 0))
+
+    standardized = np.zeros((n_obs, n_assets))
+    next_volatility = np.empty(n_assets)
+    for idx, ticker in enumerate(panel.tickers):
+        model = models[ticker]
+        params = model.get_params()
+        returns = model.returns.to_numpy(dtype=np.float64)
+        variance = garch_filter(returns, params['mu'], params['omega'], params['alpha'], params['beta'])
+        valid = panel.mask[:, idx]
+        standardized[valid, idx] = (returns - params['mu']) / np.sqrt(variance)
+        next_volatility[idx] = np.sqrt(model.next_variance())
+
+    unconditional = _weighted_cross_product(standardized, panel.mask, np.ones(n_obs))
+    weights = _decay_weights(n_obs, b)
+    shocks = _weighted_cross_product(standardized, panel.mask, weights) * weights.sum()
+    correlation_state = (1 - a - b) * unconditional * weights.sum() + a * shocks + b ** n_obs * unconditional
+
+    scale = np.sqrt(np.diag(correlation_state))
+    correlation = _clip_to_psd(correlation_state / np.outer(scale, scale))
+    return correlation * np.outer(next_volatility, next_volatility)
+
+def portfolio_var(panel: ReturnsPanel, covariance: np.ndarray, weights: np.ndarray,
+                  confidence_level: float, horizon: int = VAR_PREDICTION_DAYS) -> Dict:
+    """
+    Parametric portfolio VaR with its marginal and component decomposition.
+
+    The h-day VaR scales the next-day covariance by sqrt(h). Component VaRs are
+    weight * marginal VaR and add up to the portfolio VaR, so they show how much each
+    stock and sector contributes after diversification.
+
+    Args:
+        panel (ReturnsPanel): Panel the covariance was estimated on.
+        covariance (np.ndarray): (N, N) next-day covariance in percent squared.
+        weights (np.ndarray): Portfolio weights per panel ticker; normalised to sum to one.
+        confidence_level (float): e.g. 0.95.
+        horizon (int): Holding period in days.
+
+    Returns:
+        Dict: 'var_percentage', 'day1_var', 'undiversified_var', 'volatility', 'stocks'
+        (per-ticker DataFrame) and 'sectors' (per-sector DataFrame).
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = weights / weights.sum()
+    z_score = stats.norm.ppf(1 - confidence_level)
+    scale = np.sqrt(horizon)
+
+    covariance_weights = covariance @ weights
+    volatility = float(np.sqrt(weights @ covariance_weights))
+    marginal = z_score * scale * covariance_weights / volatility if volatility > 0 else np.zeros_like(weights)
+    component = weights * marginal
+    standalone = z_score * scale * np.sqrt(np.diag(covariance))
+    var_percentage = z_score * scale * volatility
+
+    stocks = pd.DataFrame({
+        'ticker': panel.tickers,
+        'sector': panel.sectors,
+        'weight': weights,
+        'standalone_var': standalone,
+        'marginal_var': marginal,
+        'component_var': component,
+        'contribution': component / var_percentage if var_percentage else 0.0
+    })
+    sectors = (stocks.groupby('sector', as_index=False)
+               .agg(weight=('weight', 'sum'), component_var=('component_var', 'sum'), contribution=('contribution', 'sum'), stock_count=('ticker', 'count'))
+               .sort_values('component_var'))
+
+    return {
+        'confidence_level': confidence_level,
+        'horizon': horizon,
+        'var_percentage': var_percentage,
+        'day1_var': z_score * volatility,
+        'undiversified_var': float(weights @ standalone),
+        'volatility': volatility,
+        'stocks': stocks,
+        'sectors': sectors
+    }
+
+def portfolio_covariance(panel: ReturnsPanel, method: str = 'ewma', models: Optional[Dict[str, GARCHVaRModel]] = None) -> np.ndarray:
+    """
+    Next-day covariance for the panel using 'ewma' or 'dcc' (which needs fitted models).
+    """
+    if method == 'dcc':
+        if models is None:
+            raise ValueError("DCC covariance needs a fitted GARCH model for every ticker.")
+        return dcc_covariance(panel, models)
+    if method == 'ewma':
+        return ewma_covariance(panel)
+    raise ValueError(f"Unknown covariance method: {method}")
@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import tempfile
+from urllib.parse import quote
+from typing import Dict, Optional
+import pandas as pd
+from config import PRICE_STORE_DIR
+
+OHLCV_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def normalize_ohlcv(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Flatten a provider frame into the Date/OHLCV layout used by the store.
+
+    Args:
+        frame (pd.DataFrame): Raw frame as returned by the data provider.
+
+    Returns:
+        pd.DataFrame: Frame with a tz-naive 'Date' column and OHLCV columns, sorted by date.
+    """
+    if frame is None or frame.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+    frame = frame.copy()
+    if isinstance(frame.columns, pd.MultiIndex):
+        frame.columns = frame.columns.get_level_values(0)
+    if 'Date' not in frame.columns:
+        frame = frame.reset_index()
+        frame = frame.rename(columns={frame.columns[0]: 'Date'})
+    frame['Date'] = pd.to_datetime(frame['Date']).dt.tz_localize(None).dt.normalize()
+    columns = [col for col in OHLCV_COLUMNS if col in frame.columns]
+    frame = frame[columns].dropna(subset=['Close'])
+    return frame.sort_values('Date').drop_duplicates('Date', keep='last').reset_index(drop=True)
+
+
+class PriceStore:
+    """
+    On-disk columnar price store with one Parquet partition per ticker.
+
+    Each partition has a small JSON sidecar recording the first/last stored date and
+    when the provider was last asked for new bars, so callers can request only the
+    missing tail instead of the full history.
+    """
+    def __init__(self, root: str = PRICE_STORE_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _base_path(self, ticker: str) -> str:
+        return os.path.join(self.root, quote(ticker, safe='.-'))
+
+    def _data_path(self, ticker: str) -> str:
+        return self._base_path(ticker) + '.parquet'
+
+    def _meta_path(self, ticker: str) -> str:
+        return self._base_path(ticker) + '.json'
+
+    def _atomic_write(self, path: str, write_fn) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        os.close(fd)
+        try:
+            write_fn(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def metadata(self, ticker: str) -> Optional[Dict]:
+        """
+        Read the sidecar metadata for a ticker.
+
+        Returns:
+            Optional[Dict]: Metadata with 'start_date', 'first_date', 'last_date', 'rows' and 'checked_at',
+            or None if not stored.
+        """
+        meta_path = self._meta_path(ticker)
+        if not os.path.exists(meta_path) or not os.path.exists(self._data_path(ticker)):
+            return None
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def read(self, ticker: str) -> pd.DataFrame:
+        """
+        Read the full stored history for a ticker.
+
+        Returns:
+            pd.DataFrame: Stored OHLCV frame with 'returns', or an empty DataFrame if nothing is stored.
+        """
+        if self.metadata(ticker) is None:
+            return pd.DataFrame()
+        return pd.read_parquet(self._data_path(ticker))
+
+    def _write_metadata(self, ticker: str, meta: Dict) -> None:
+        def write_meta(path):
+            with open(path, 'w') as f:
+                json.dump(meta, f)
+        self._atomic_write(self._meta_path(ticker), write_meta)
+
+    def _write(self, ticker: str, frame: pd.DataFrame, start_date: str, checked_at: float) -> None:
+        # Data first, sidecar second: a crash in between leaves an older last_date, which
+        # only causes a slightly larger tail request next time.
+        self._atomic_write(self._data_path(ticker), lambda path: frame.to_parquet(path, index=False))
+        self._write_metadata(ticker, {
+            'start_date': start_date,
+            'first_date': frame['Date'].iloc[0].strftime('%Y-%m-%d'),
+            'last_date': frame['Date'].iloc[-1].strftime('%Y-%m-%d'),
+            'rows': int(len(frame)),
+            'checked_at': checked_at
+        })
+
+    def replace(self, ticker: str, frame: pd.DataFrame, start_date: str) -> pd.DataFrame:
+        """
+        Replace the stored history for a ticker with a freshly downloaded frame.
+
+        Args:
+            ticker (str): Stock ticker symbol.
+            frame (pd.DataFrame): Full provider history.
+            start_date (str): Start date the history was requested from in 'YYYY-MM-DD' format.
+
+        Returns:
+            pd.DataFrame: The stored frame including the 'returns' column.
+        """
+        frame = normalize_ohlcv(frame)
+        if frame.empty:
+            return pd.DataFrame()
+        frame['returns'] = frame['Close'].pct_change()
+        self._write(ticker, frame, start_date, time.time())
+        return frame
+
+    def append(self, ticker: str, tail: pd.DataFrame) -> pd.DataFrame:
+        """
+        Merge newly downloaded bars into the stored history.
+
+        Only rows dated after the last stored date are appended, and 'returns' is computed
+        for those rows alone, chained from the last stored close.
+
+        Args:
+            ticker (str): Stock ticker symbol.
+            tail (pd.DataFrame): Provider frame covering the missing tail.
+
+        Returns:
+            pd.DataFrame: The merged frame.
+        """
+        meta = self.metadata(ticker)
+        stored = self.read(ticker)
+        if stored.empty:
+            raise ValueError(f"No stored history to append to for {ticker}.")
+        tail = normalize_ohlcv(tail)
+        tail = tail[tail['Date'] > stored['Date'].iloc[-1]]
+        if tail.empty:
+            self.touch(ticker)
+            return stored
+
+        previous_close = pd.concat([stored['Close'].iloc[-1:], tail['Close']], ignore_index=True)
+        tail = tail.assign(returns=previous_close.pct_change().iloc[1:].to_numpy())
+        merged = pd.concat([stored, tail], ignore_index=True)
+        self._write(ticker, merged, meta['start_date'], time.time())
+        return merged
+
+    def touch(self, ticker: str) -> None:
+        """
+        Record that the provider was checked for a ticker without new bars being found.
+        """
+        meta = self.metadata(ticker)
+        if meta is None:
+            return
+        meta['checked_at'] = time.time()
+        self._write_metadata(ticker, meta)
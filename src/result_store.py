@@ -0,0 +1,180 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import RESULT_STORE_PATH, VAR_PREDICTION_DAYS, BACKTEST_WORKERS
+from garch_model import GARCHVaRModel, backtest_starts, iter_rolling_var_backtest
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecasts (
+    ticker TEXT NOT NULL,
+    model TEXT NOT NULL,
+    window_size INTEGER NOT NULL,
+    horizon INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    as_of TEXT NOT NULL,
+    date TEXT,
+    predicted_var REAL NOT NULL,
+    actual_return REAL,
+    var_breach INTEGER,
+    source TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (ticker, model, window_size, horizon, confidence, as_of)
+)
+"""
+
+BACKTEST_COLUMNS = ['date', 'predicted_var', 'actual_return', 'var_breach']
+
+# Live forecasts are fitted on the whole history rather than a rolling window.
+FULL_HISTORY = 0
+
+
+def model_spec(model: GARCHVaRModel) -> str:
+    """
+    Store key for a model specification, e.g. 'Garch(1,0,1)/normal'.
+    """
+    return f"{model.vol}({model.p},{model.o},{model.q})/{model.dist}"
+
+def _day(value) -> str:
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+class ResultStore:
+    """
+    SQLite log of every VaR forecast and its realized outcome.
+
+    A forecast is keyed by ticker, model spec, estimation window (FULL_HISTORY for live
+    forecasts), horizon, confidence level and as-of date, the last return the model saw.
+    'date' is the first day the forecast covers and 'actual_return' the realized h-day
+    return in percent; both stay NULL for live forecasts until the horizon has passed and
+    update_outcomes fills them in. Backtests write realized rows straight away, so a rerun
+    only has to compute the windows that are not stored yet.
+    """
+    def __init__(self, path: str = RESULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _write(self, sql: str, rows: List[tuple]) -> None:
+        if not rows:
+            return
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany(sql, rows)
+
+    def record_backtest(self, ticker: str, model: str, window: int, horizon: int, confidence: float,
+                        returns: pd.Series, results: pd.DataFrame) -> None:
+        """
+        Store realized backtest rows ('date', 'predicted_var', 'actual_return', 'var_breach').
+        """
+        if results.empty:
+            return
+        positions = returns.index.get_indexer(pd.DatetimeIndex(results['date']))
+        now = time.time()
+        rows = [(ticker, model, window, horizon, confidence, _day(returns.index[position - 1]), _day(row.date),
+                 float(row.predicted_var), float(row.actual_return), int(row.var_breach), 'backtest', now)
+                for position, row in zip(positions, results.itertuples(index=False))]
+        self._write('INSERT OR REPLACE INTO forecasts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def record_forecast(self, ticker: str, model: str, returns: pd.Series, horizon: int, confidence: float, predicted_var: float) -> None:
+        """
+        Store a live forecast made after the last observation in `returns`.
+
+        Re-running on the same data replaces the forecast until its outcome is known.
+        """
+        self._write("""
+            INSERT INTO forecasts VALUES (?, ?, ?, ?, ?, ?, NULL, ?, NULL, NULL, 'live', ?)
+            ON CONFLICT DO UPDATE SET predicted_var = excluded.predicted_var, created_at = excluded.created_at
+            WHERE actual_return IS NULL
+        """, [(ticker, model, FULL_HISTORY, horizon, confidence, _day(returns.index[-1]), float(predicted_var), time.time())])
+
+    def update_outcomes(self, ticker: str, returns: pd.Series) -> int:
+        """
+        Fill in realized returns for a ticker's pending forecasts whose horizon has passed.
+
+        Returns:
+            int: Number of forecasts resolved.
+        """
+        with closing(self._connect()) as conn:
+            pending = conn.execute('SELECT rowid, as_of, horizon, predicted_var FROM forecasts WHERE ticker = ? AND actual_return IS NULL',
+                                   (ticker,)).fetchall()
+        values = returns.to_numpy(dtype=np.float64) * 100
+        rows = []
+        for rowid, as_of, horizon, predicted_var in pending:
+            start = returns.index.searchsorted(pd.Timestamp(as_of), side='right')
+            if start + horizon <= len(returns):
+                actual_return = float(values[start:start + horizon].sum())
+                rows.append((_day(returns.index[start]), actual_return, int(actual_return < predicted_var), rowid))
+        self._write('UPDATE forecasts SET date = ?, actual_return = ?, var_breach = ? WHERE rowid = ?', rows)
+        return len(rows)
+
+    def load(self, ticker: str, model: Optional[str] = None, window: Optional[int] = None, horizon: Optional[int] = None,
+             confidence: Optional[float] = None, realized_only: bool = False) -> pd.DataFrame:
+        """
+        Stored forecasts for a ticker, optionally filtered, ordered by as-of date.
+        """
+        clauses, params = ['ticker = ?'], [ticker]
+        for column, value in (('model', model), ('window_size', window), ('horizon', horizon), ('confidence', confidence)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if realized_only:
+            clauses.append('actual_return IS NOT NULL')
+        with closing(self._connect()) as conn:
+            frame = pd.read_sql_query(f"SELECT * FROM forecasts WHERE {' AND '.join(clauses)} ORDER BY as_of", conn, params=params)
+        frame['as_of'] = pd.to_datetime(frame['as_of'])
+        frame['date'] = pd.to_datetime(frame['date'])
+        frame['var_breach'] = frame['var_breach'].astype('boolean')
+        return frame
+
+    def clear(self, ticker: Optional[str] = None) -> None:
+        """
+        Drop stored forecasts, e.g. after the underlying prices were revised.
+        """
+        with self._lock, closing(self._connect()) as conn, conn:
+            if ticker is None:
+                conn.execute('DELETE FROM forecasts')
+            else:
+                conn.execute('DELETE FROM forecasts WHERE ticker = ?', (ticker,))
+
+
+def iter_stored_var_backtest(store: ResultStore, ticker: str, returns: pd.Series, window: int = 252, horizon: int = VAR_PREDICTION_DAYS,
+                             confidence_level: float = 0.95, step: int = None, workers: int = BACKTEST_WORKERS) -> Iterator[Tuple[pd.DataFrame, float]]:
+    """
+    iter_rolling_var_backtest that reads finished windows from the store and only fits the rest.
+
+    Stored windows are yielded first as one chunk; newly computed chunks are written to the
+    store as they arrive. Fractions are over the whole schedule.
+    """
+    starts = backtest_starts(returns, window, horizon, step)
+    if not starts:
+        return
+    spec = model_spec(GARCHVaRModel(returns.iloc[:window]))
+    stored = store.load(ticker, spec, window, horizon, confidence_level, realized_only=True).set_index('as_of')
+    as_of = returns.index[np.array(starts) - 1]
+    cached = stored.index.isin(as_of)
+    missing = [start for start, date in zip(starts, as_of) if date not in stored.index]
+    if cached.any():
+        chunk = stored.loc[cached, BACKTEST_COLUMNS].reset_index(drop=True)
+        chunk['var_breach'] = chunk['var_breach'].astype(bool)
+        yield chunk, cached.sum() / len(starts)
+    if not missing:
+        return
+    for chunk, fraction_done in iter_rolling_var_backtest(returns, window, horizon, confidence_level, workers=workers, starts=missing):
+        store.record_backtest(ticker, spec, window, horizon, confidence_level, returns, chunk)
+        yield chunk, (len(starts) - len(missing) * (1 - fraction_done)) / len(starts)
+
+
+@st.cache_resource
+def get_result_store() -> ResultStore:
+    return ResultStore()
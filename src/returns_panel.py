@@ -0,0 +1,84 @@
+import hashlib
+from typing import List, Dict
+import numpy as np
+import pandas as pd
+from config import NIFTY_50_STOCKS
+
+
+class ReturnsPanel:
+    """
+    Date-aligned returns matrix (dates x tickers) with a validity mask.
+
+    Values are stored as one C-contiguous float64 array with invalid cells set to 0 and
+    flagged False in the mask. All arrays are read-only, so a single panel can be shared
+    between Streamlit sessions without copying.
+    """
+    def __init__(self, dates: np.ndarray, tickers: List[str], values: np.ndarray, mask: np.ndarray):
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')
+        self.tickers = list(tickers)
+        self.sectors = [NIFTY_50_STOCKS.get(ticker, "Unknown Sector") for ticker in self.tickers]
+        self.ticker_index = {ticker: idx for idx, ticker in enumerate(self.tickers)}
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.mask = np.ascontiguousarray(mask, dtype=bool)
+        for array in (self.dates, self.values, self.mask):
+            array.setflags(write=False)
+
+    @classmethod
+    def from_frames(cls, stock_dict: Dict[str, pd.DataFrame]) -> 'ReturnsPanel':
+        """
+        Align per-ticker frames with 'Date' and 'returns' columns on the union of their dates.
+
+        Args:
+            stock_dict (Dict[str, pd.DataFrame]): Historical data keyed by ticker.
+
+        Returns:
+            ReturnsPanel: Aligned panel; tickers without a 'returns' column are skipped.
+        """
+        columns = {}
+        for ticker, df in stock_dict.items():
+            if df.empty or 'returns' not in df.columns:
+                continue
+            columns[ticker] = pd.Series(df['returns'].to_numpy(dtype=np.float64), index=pd.DatetimeIndex(df['Date']))
+        if not columns:
+            return cls(np.array([], dtype='datetime64[ns]'), [], np.empty((0, 0)), np.empty((0, 0), dtype=bool))
+
+        aligned = pd.concat(columns, axis=1).sort_index()
+        values = aligned.to_numpy(dtype=np.float64)
+        mask = np.isfinite(values)
+        return cls(aligned.index.to_numpy(), list(aligned.columns), np.where(mask, values, 0.0), mask)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Hash of the tickers, dates and returns, used to key caches derived from the panel.
+        """
+        digest = hashlib.sha1()
+        digest.update('|'.join(self.tickers).encode())
+        digest.update(self.dates.tobytes())
+        digest.update(self.values.tobytes())
+        digest.update(self.mask.tobytes())
+        return digest.hexdigest()
+
+    def column(self, ticker: str) -> int:
+        return self.ticker_index[ticker]
+
+    def series(self, ticker: str) -> pd.Series:
+        """
+        Valid returns for one ticker indexed by date.
+        """
+        idx = self.ticker_index[ticker]
+        valid = self.mask[:, idx]
+        return pd.Series(self.values[valid, idx], index=pd.DatetimeIndex(self.dates[valid]), name=ticker)
+
+    def sector_columns(self) -> Dict[str, np.ndarray]:
+        """
+        Column indices grouped by sector.
+        """
+        groups = {}
+        for idx, sector in enumerate(self.sectors):
+            groups.setdefault(sector, []).append(idx)
+        return {sector: np.array(columns) for sector, columns in groups.items()}
@@ -0,0 +1,152 @@
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+from scipy import stats
+from config import VAR_CONFIDENCE_LEVELS, VAR_PREDICTION_DAYS
+from garch_model import GARCHVaRModel, garch_variance_term_structure
+from returns_panel import ReturnsPanel
+
+# Declarative shocks. Each scenario may combine:
+#   'replay':     {'start': date, 'end': date} - replay the panel's returns over a historical window
+#   'volatility': {target: multiplier}         - scale conditional volatility (omega and next variance by multiplier^2)
+#   'returns':    {target: shock}              - add an instantaneous return shock in percent
+# A target is a ticker, a sector from NIFTY_50_STOCKS or '*' for every stock; the most specific one wins.
+SCENARIO_LIBRARY = {
+    'March 2020 replay': {'replay': {'start': '2020-02-20', 'end': '2020-03-23'}},
+    'IT volatility doubles': {'volatility': {'IT': 2.0}},
+    'Banking stress': {'volatility': {'Financial Services': 1.5}, 'returns': {'Financial Services': -8.0}},
+    'Market gap down 10%': {'returns': {'*': -10.0}},
+    'Broad volatility spike': {'volatility': {'*': 1.5}}
+}
+
+SCENARIO_KEYS = ('replay', 'volatility', 'returns')
+
+
+def _resolve_targets(targets: Dict[str, float], panel: ReturnsPanel, default: float) -> np.ndarray:
+    """
+    Per-ticker values from a {ticker | sector | '*': value} mapping, ticker beating sector beating '*'.
+    """
+    return np.array([targets.get(ticker, targets.get(sector, targets.get('*', default)))
+                     for ticker, sector in zip(panel.tickers, panel.sectors)], dtype=np.float64)
+
+def _replay_window(panel: ReturnsPanel, start: str, end: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Percentage returns of every ticker over [start, end], shape (days, N).
+
+    Tickers that did not trade on a day take their sector's average return that day, or the
+    cross-sectional average if the whole sector is missing. Returns the window and a (N,)
+    flag marking tickers that needed any proxy value.
+    """
+    rows = (panel.dates >= np.datetime64(pd.Timestamp(start))) & (panel.dates <= np.datetime64(pd.Timestamp(end)))
+    if not rows.any():
+        raise ValueError(f"The returns panel has no dates between {start} and {end}.")
+    values, mask = panel.values[rows] * 100, panel.mask[rows]
+
+    observed = mask.sum(axis=1)
+    market = np.divide(values.sum(axis=1), observed, out=np.zeros(len(values)), where=observed > 0)
+    window = np.where(mask, values, market[:, None])
+    for columns in panel.sector_columns().values():
+        sector_observed = mask[:, columns].sum(axis=1)
+        sector_mean = np.divide(values[:, columns].sum(axis=1), sector_observed, out=market.copy(), where=sector_observed > 0)
+        window[:, columns] = np.where(mask[:, columns], values[:, columns], sector_mean[:, None])
+    return window, ~mask.all(axis=0)
+
+def run_scenarios(panel: ReturnsPanel, models: Dict[str, GARCHVaRModel], scenarios: Dict[str, Dict] = SCENARIO_LIBRARY,
+                  confidence_levels: list = VAR_CONFIDENCE_LEVELS, horizon: int = VAR_PREDICTION_DAYS) -> Dict:
+    """
+    Apply every scenario to every ticker's fitted GARCH(1,1) in one batch.
+
+    Shocks are assembled into (scenarios, tickers) arrays: volatility multipliers, return
+    shocks and replayed returns (padded to the longest replay window). The replay is pushed
+    through each ticker's variance recursion, starting from today's forecast, for all
+    scenarios at once; volatility multipliers then scale omega and the next-day variance,
+    and the stressed VaR comes from the closed-form term structure. Tickers without a model
+    are left out.
+
+    Args:
+        panel (ReturnsPanel): Aligned returns used for historical replays.
+        models (Dict[str, GARCHVaRModel]): Fitted GARCH(1,1) model per ticker.
+        scenarios (Dict[str, Dict]): Scenario definitions keyed by name, see SCENARIO_LIBRARY.
+        confidence_levels (list): VaR confidence levels.
+        horizon (int): VaR horizon in days after the scenario.
+
+    Returns:
+        Dict: 'scenarios', 'tickers', 'sectors', 'confidence_levels', 'horizon', plus 'pnl'
+        (scenarios, N) scenario return in percent, 'base_var' (C, N) and 'var' (scenarios, C, N)
+        h-day VaR before and after the scenario, 'stressed_var' = pnl + var, 'volatility'
+        (scenarios, N) stressed h-day volatility and 'proxied' (scenarios, N) marking replays
+        that used sector or market proxies.
+    """
+    for name, scenario in scenarios.items():
+        unknown = set(scenario) - set(SCENARIO_KEYS)
+        if unknown:
+            raise ValueError(f"Scenario '{name}' has unknown keys: {', '.join(sorted(unknown))}")
+    columns = [idx for idx, ticker in enumerate(panel.tickers) if models.get(ticker) is not None]
+    tickers = [panel.tickers[idx] for idx in columns]
+    params = [models[ticker].get_params() for ticker in tickers]
+    mu, omega, alpha, beta = (np.array([param[name] for param in params], dtype=np.float64) for name in ('mu', 'omega', 'alpha', 'beta'))
+    next_variance = np.array([models[ticker].next_variance() for ticker in tickers])
+
+    names = list(scenarios.keys())
+    n_scenarios, n_assets = len(names), len(tickers)
+    multipliers = np.stack([_resolve_targets(scenarios[name].get('volatility', {}), panel, 1.0)[columns] for name in names]) if names else np.ones((0, n_assets))
+    shocks = np.stack([_resolve_targets(scenarios[name].get('returns', {}), panel, 0.0)[columns] for name in names]) if names else np.zeros((0, n_assets))
+
+    windows = {}
+    proxied = np.zeros((n_scenarios, n_assets), dtype=bool)
+    for s, name in enumerate(names):
+        if 'replay' in scenarios[name]:
+            window, needed_proxy = _replay_window(panel, scenarios[name]['replay']['start'], scenarios[name]['replay']['end'])
+            windows[s] = window[:, columns]
+            proxied[s] = needed_proxy[columns]
+    length = max((len(window) for window in windows.values()), default=0)
+    replay = np.zeros((length, n_scenarios, n_assets))
+    active = np.zeros((length, n_scenarios), dtype=bool)
+    for s, window in windows.items():
+        replay[:len(window), s] = window
+        active[:len(window), s] = True
+
+    variance = np.broadcast_to(next_variance, (n_scenarios, n_assets)).copy()
+    for day in range(length):
+        updated = omega + alpha * (replay[day] - mu) ** 2 + beta * variance
+        variance = np.where(active[day][:, None], updated, variance)
+
+    scale = multipliers ** 2
+    term_structure = garch_variance_term_structure(omega * scale, np.broadcast_to(alpha, scale.shape),
+                                                   np.broadcast_to(beta, scale.shape), variance * scale, horizon)
+    volatility = np.sqrt(term_structure.sum(axis=-1))
+    base_volatility = np.sqrt(garch_variance_term_structure(omega, alpha, beta, next_variance, horizon).sum(axis=-1))
+
+    z_scores = stats.norm.ppf(1 - np.asarray(confidence_levels, dtype=np.float64))
+    pnl = replay.sum(axis=0) + shocks
+    var = z_scores[None, :, None] * volatility[:, None, :]
+    return {
+        'scenarios': names,
+        'tickers': tickers,
+        'sectors': [panel.sectors[idx] for idx in columns],
+        'confidence_levels': list(confidence_levels),
+        'horizon': horizon,
+        'pnl': pnl,
+        'base_var': z_scores[:, None] * base_volatility[None, :],
+        'var': var,
+        'stressed_var': pnl[:, None, :] + var,
+        'volatility': volatility,
+        'proxied': proxied
+    }
+
+def scenario_summary(result: Dict, confidence_level: float = 0.95) -> pd.DataFrame:
+    """
+    One row per scenario and ticker from a run_scenarios result at one confidence level.
+    """
+    level = result['confidence_levels'].index(confidence_level)
+    n_scenarios, n_assets = len(result['scenarios']), len(result['tickers'])
+    return pd.DataFrame({
+        'scenario': np.repeat(result['scenarios'], n_assets),
+        'ticker': np.tile(result['tickers'], n_scenarios),
+        'sector': np.tile(result['sectors'], n_scenarios),
+        'scenario_return': result['pnl'].reshape(-1),
+        'base_var': np.tile(result['base_var'][level], n_scenarios),
+        'stressed_var': result['var'][:, level].reshape(-1),
+        'total_loss': result['stressed_var'][:, level].reshape(-1),
+        'proxied': result['proxied'].reshape(-1)
+    })
@@ -0,0 +1,157 @@
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from config import (VAR_CONFIDENCE_LEVELS, VAR_PREDICTION_DAYS, SIMULATION_PATHS, SIMULATION_CHUNK_SIZE,
+                    SIMULATION_SEED, SIMULATION_WORKERS)
+from garch_model import GARCHVaRModel, garch_filter, get_process_pool
+
+SIMULATION_METHODS = ('fhs', 'monte_carlo')
+
+
+class SimulationState:
+    """
+    Everything a path simulation needs from a set of fitted GARCH(1,1) models.
+
+    Parameters are stacked into (N,) arrays on the percentage-return scale. For filtered
+    historical simulation the standardized residuals of each ticker are left-aligned into a
+    (T, N) pool with per-ticker lengths. The state is plain NumPy, so it pickles cheaply
+    to worker processes.
+    """
+    def __init__(self, tickers: List[str], mu: np.ndarray, omega: np.ndarray, alpha: np.ndarray, beta: np.ndarray,
+                 nu: np.ndarray, next_variance: np.ndarray, residuals: np.ndarray, lengths: np.ndarray):
+        self.tickers = list(tickers)
+        self.mu = mu
+        self.omega = omega
+        self.alpha = alpha
+        self.beta = beta
+        self.nu = nu
+        self.next_variance = next_variance
+        self.residuals = residuals
+        self.lengths = lengths
+
+    @classmethod
+    def from_models(cls, models: Dict[str, GARCHVaRModel]) -> 'SimulationState':
+        tickers = list(models.keys())
+        params = [models[ticker].get_params() for ticker in tickers]
+        columns = []
+        for ticker, param in zip(tickers, params):
+            returns = models[ticker].returns.to_numpy(dtype=np.float64)
+            variance = garch_filter(returns, param['mu'], param['omega'], param['alpha'], param['beta'])
+            columns.append((returns - param['mu']) / np.sqrt(variance))
+
+        lengths = np.array([len(column) for column in columns])
+        residuals = np.zeros((lengths.max() if len(lengths) else 0, len(tickers)))
+        for idx, column in enumerate(columns):
+            residuals[:len(column), idx] = column
+
+        def stacked(name, default=np.nan):
+            return np.array([param.get(name, default) for param in params], dtype=np.float64)
+
+        return cls(tickers, stacked('mu'), stacked('omega'), stacked('alpha'), stacked('beta'), stacked('nu'),
+                   np.array([models[ticker].next_variance() for ticker in tickers]), residuals, lengths)
+
+
+def _draw_innovations(state: SimulationState, method: str, rng: np.random.Generator, n_paths: int) -> np.ndarray:
+    n_assets = len(state.tickers)
+    if method == 'fhs':
+        rows = (rng.random((n_paths, n_assets)) * state.lengths).astype(np.int64)
+        return state.residuals[rows, np.arange(n_assets)]
+
+    shocks = rng.standard_normal((n_paths, n_assets))
+    student = ~np.isnan(state.nu)
+    if student.any():
+        # Unit-variance Student-t: normal / sqrt(chi2 / nu), rescaled by sqrt((nu - 2) / nu).
+        nu = state.nu[student]
+        chi2 = rng.chisquare(nu, size=(n_paths, len(nu)))
+        shocks[:, student] *= np.sqrt((nu - 2) / chi2)
+    return shocks
+
+def _simulate_tails(state: SimulationState, method: str, horizon: int, tail_size: int,
+                    chunk_sizes: List[int], seeds: List[np.random.SeedSequence]) -> np.ndarray:
+    """
+    Simulate chunks of paths and keep only the tail_size worst cumulative returns.
+
+    Returns:
+        np.ndarray: (horizon, tail_size, N) smallest cumulative returns per horizon day, unsorted.
+    """
+    n_assets = len(state.tickers)
+    tails = np.full((horizon, tail_size, n_assets), np.inf)
+    for chunk_size, seed in zip(chunk_sizes, seeds):
+        rng = np.random.default_rng(seed)
+        variance = np.broadcast_to(state.next_variance, (chunk_size, n_assets))
+        cumulative = np.zeros((chunk_size, n_assets))
+        for day in range(horizon):
+            shocks = np.sqrt(variance) * _draw_innovations(state, method, rng, chunk_size)
+            cumulative += state.mu + shocks
+            combined = np.concatenate((tails[day], cumulative))
+            tails[day] = np.partition(combined, tail_size - 1, axis=0)[:tail_size]
+            variance = state.omega + state.alpha * shocks ** 2 + state.beta * variance
+    return tails
+
+def _chunk_plan(n_paths: int, chunk_size: int, seed: int) -> Tuple[List[int], List[np.random.SeedSequence]]:
+    # One child seed per chunk, so results depend on the seed but not on the worker count.
+    chunk_sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    return chunk_sizes, np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+def simulate_var(models: Dict[str, GARCHVaRModel], method: str = 'fhs', confidence_levels: list = VAR_CONFIDENCE_LEVELS,
+                 horizon: int = VAR_PREDICTION_DAYS, n_paths: int = SIMULATION_PATHS, chunk_size: int = SIMULATION_CHUNK_SIZE,
+                 seed: int = SIMULATION_SEED, workers: int = SIMULATION_WORKERS) -> Dict:
+    """
+    Simulated VaR and Expected Shortfall term structures for one or more fitted GARCH(1,1) models.
+
+    'fhs' (filtered historical simulation) bootstraps each model's standardized residuals;
+    'monte_carlo' draws from the model's own innovation distribution (normal or Student-t).
+    Paths are generated chunk_size at a time and only the worst cumulative returns needed
+    for the lowest confidence level are kept, so memory does not grow with n_paths. With
+    workers > 1 the chunks are spread over the shared process pool.
+
+    Returns:
+        Dict: 'tickers', 'confidence_levels', 'horizon', 'n_paths', plus 'var' and 'es' of shape
+        (N, len(confidence_levels), horizon) in percent, where [i, j, h-1] is the cumulative
+        h-day figure for tickers[i] at confidence_levels[j].
+    """
+    if method not in SIMULATION_METHODS:
+        raise ValueError(f"Unknown simulation method: {method}")
+    state = SimulationState.from_models(models)
+    tail_sizes = [max(1, int(np.ceil((1 - level) * n_paths))) for level in confidence_levels]
+    tail_size = max(tail_sizes)
+    chunk_sizes, seeds = _chunk_plan(n_paths, chunk_size, seed)
+
+    if workers > 1 and len(chunk_sizes) > 1:
+        groups = np.array_split(np.arange(len(chunk_sizes)), min(workers, len(chunk_sizes)))
+        pool = get_process_pool(workers)
+        futures = [pool.submit(_simulate_tails, state, method, horizon, tail_size,
+                               [chunk_sizes[i] for i in group], [seeds[i] for i in group]) for group in groups]
+        tails = np.concatenate([future.result() for future in futures], axis=1)
+        tails = np.partition(tails, tail_size - 1, axis=1)[:, :tail_size]
+    else:
+        tails = _simulate_tails(state, method, horizon, tail_size, chunk_sizes, seeds)
+
+    tails = np.sort(tails, axis=1)
+    var = np.stack([tails[:, size - 1] for size in tail_sizes])
+    es = np.stack([tails[:, :size].mean(axis=1) for size in tail_sizes])
+    return {
+        'tickers': state.tickers,
+        'confidence_levels': list(confidence_levels),
+        'horizon': horizon,
+        'n_paths': n_paths,
+        'var': var.transpose(2, 0, 1),
+        'es': es.transpose(2, 0, 1)
+    }
+
+def simulation_summary(simulation: Dict) -> pd.DataFrame:
+    """
+    Flatten a simulate_var result into one row per ticker and confidence level.
+    """
+    rows = []
+    for i, ticker in enumerate(simulation['tickers']):
+        for j, level in enumerate(simulation['confidence_levels']):
+            rows.append({
+                'ticker': ticker,
+                'confidence_level': f"{level*100:.2f}%",
+                'var_percentage': simulation['var'][i, j, -1],
+                'es_percentage': simulation['es'][i, j, -1],
+                'day1_var': simulation['var'][i, j, 0],
+                'day1_es': simulation['es'][i, j, 0]
+            })
+    return pd.DataFrame(rows)
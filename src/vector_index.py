@@ -0,0 +1,338 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from config import (VECTOR_INDEX_DIR, VECTOR_INDEX_QUANTIZE, VECTOR_INDEX_ANN, VECTOR_INDEX_ANN_MIN_ROWS,
+                    VECTOR_INDEX_NLIST, VECTOR_INDEX_NPROBE)
+
+# Rows are scored in cache-sized blocks, so int8 rows are dequantized a block at a time.
+SEARCH_BLOCK_ROWS = 4096
+
+# k-means is trained on at most this many rows per list; more barely moves the centroids.
+IVF_TRAIN_ROWS_PER_LIST = 64
+IVF_TRAIN_ITERATIONS = 10
+# Centroids are retrained once the index has grown this many times past the rows they were trained on.
+IVF_RETRAIN_GROWTH = 4
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(' '.join(text.split()).lower().encode()).hexdigest()
+
+
+def _nearest_centroid(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    Index of the most similar centroid per row, scored a block at a time.
+    """
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), SEARCH_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+def spherical_kmeans(vectors: np.ndarray, n_lists: int, iterations: int = IVF_TRAIN_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """
+    Unit-norm centroids of `vectors` under cosine similarity (n_lists, dim).
+
+    Lists that end up empty are reseeded with random rows, so every centroid is used.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _nearest_centroid(vectors, centroids)
+        order = np.argsort(labels, kind='stable')
+        counts = np.bincount(labels, minlength=n_lists)
+        used = counts > 0
+        sums = np.zeros_like(centroids)
+        sums[used] = np.add.reduceat(vectors[order], np.concatenate(([0], np.cumsum(counts)[:-1]))[used], axis=0)
+        sums[~used] = vectors[rng.choice(len(vectors), int((~used).sum()), replace=False)]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class VectorIndex:
+    """
+    Append-only, memory-mapped index of unit-normalised embeddings.
+
+    Vectors live in one contiguous binary file (float32, or int8 with a float32 scale per
+    row when quantize is set) next to metadata.jsonl with one JSON line per row, including
+    the content hash used to skip texts that are already indexed. meta.json records the row
+    count and is rewritten last, so rows past that count from an interrupted append are
+    ignored and overwritten by the next one. Queries score the memory-mapped matrix with
+    one matrix-vector product per block and pick the top k with argpartition.
+
+    With ann set, an inverted-file (IVF) layer is kept once the index reaches ann_min_rows:
+    spherical k-means centroids and the list each row belongs to, stored per training
+    generation as ivf_centroids_<gen>.npy and an append-only ivf_assignments_<gen>.bin that
+    meta.json points at. New rows join their nearest list as they are added, and the
+    centroids are retrained after the index grows IVF_RETRAIN_GROWTH-fold. A query then only
+    scores the rows of its n_probe most similar lists; more lists means higher recall and
+    higher latency, and n_probe == n_lists is exact.
+    """
+    def __init__(self, root: str = VECTOR_INDEX_DIR, quantize: bool = VECTOR_INDEX_QUANTIZE, ann: bool = VECTOR_INDEX_ANN,
+                 n_lists: int = VECTOR_INDEX_NLIST, n_probe: int = VECTOR_INDEX_NPROBE, ann_min_rows: int = VECTOR_INDEX_ANN_MIN_ROWS):
+        self.root = root
+        self.ann = ann
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.ann_min_rows = ann_min_rows
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        meta = self._read_meta()
+        self.dim = meta.get('dim')
+        self.rows = meta.get('rows', 0)
+        self.quantize = meta.get('quantize', quantize)
+        self.metadata_bytes = meta.get('metadata_bytes', 0)
+        self.metadata = self._read_metadata(self.rows)
+        self.hashes = {item['hash']: row for row, item in enumerate(self.metadata)}
+        self._mapped = None
+        self.ivf_meta = meta.get('ivf')
+        self._ivf = None
+        if self.ann and self.ivf_meta is not None:
+            with self._lock:
+                self._load_ivf()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _read_meta(self) -> Dict:
+        try:
+            with open(self._path('meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self) -> None:
+        meta = {'dim': self.dim, 'rows': self.rows, 'quantize': self.quantize, 'metadata_bytes': self.metadata_bytes}
+        if self.ivf_meta is not None:
+            meta['ivf'] = self.ivf_meta
+        tmp_path = self._path('meta.tmp.json')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path('meta.json'))
+
+    def _read_metadata(self, rows: int) -> List[Dict]:
+        metadata = []
+        if rows:
+            with open(self._path('metadata.jsonl')) as f:
+                for line in f:
+                    if len(metadata) == rows:
+                        break
+                    metadata.append(json.loads(line))
+        return metadata
+
+    @property
+    def _dtype(self):
+        return np.int8 if self.quantize else np.float32
+
+    def _open(self):
+        # Re-mapped after every append; a reader still holding the previous map sees a valid prefix.
+        vectors = np.memmap(self._path('vectors.bin'), dtype=self._dtype, mode='r', shape=(self.rows, self.dim))
+        scales = np.memmap(self._path('scales.bin'), dtype=np.float32, mode='r', shape=(self.rows,)) if self.quantize else None
+        return vectors, scales
+
+    def _mapped_vectors(self):
+        mapped = self._mapped
+        if mapped is None:
+            mapped = self._mapped = self._open()
+        return mapped
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def add(self, texts: List[str], metadatas: List[Dict], encode: Callable[[List[str]], np.ndarray]) -> int:
+        """
+        Embed and append the texts whose content hash is not indexed yet.
+
+        Args:
+            texts (List[str]): Documents to index.
+            metadatas (List[Dict]): JSON-serialisable metadata per document, stored with it.
+            encode (Callable): Maps a list of texts to an (n, dim) embedding array.
+
+        Returns:
+            int: Number of rows added.
+        """
+        with self._lock:
+            pending = {}
+            for text, metadata in zip(texts, metadatas):
+                digest = content_hash(text)
+                if digest not in self.hashes and digest not in pending:
+                    pending[digest] = (text, metadata)
+            if not pending:
+                return 0
+
+            new_texts = [text for text, _ in pending.values()]
+            vectors = np.asarray(encode(new_texts), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms > 0, norms, 1.0)
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the index ({self.dim}).")
+
+            unit_vectors = vectors
+            if self.quantize:
+                scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+                self._append('scales.bin', self.rows * 4, scales.astype(np.float32).tobytes())
+                vectors = np.round(vectors / scales[:, None]).astype(np.int8)
+            self._append('vectors.bin', self.rows * self.dim * np.dtype(self._dtype).itemsize, vectors.tobytes())
+            lines = ''.join(json.dumps({**metadata, 'text': text, 'hash': digest}) + '\n' for digest, (text, metadata) in pending.items()).encode()
+            self._append('metadata.jsonl', self.metadata_bytes, lines)
+
+            for digest, (text, metadata) in pending.items():
+                self.hashes[digest] = len(self.metadata)
+                self.metadata.append({**metadata, 'text': text, 'hash': digest})
+            self.rows += len(pending)
+            self.metadata_bytes += len(lines)
+            self._mapped = None
+            stale_generation = None
+            if self.ann:
+                if self._ivf is not None and self.rows < IVF_RETRAIN_GROWTH * self.ivf_meta['trained_rows']:
+                    self._assign_rows(unit_vectors, self.rows - len(pending))
+                elif self.rows >= self.ann_min_rows:
+                    stale_generation = self._train_ivf()
+            self._write_meta()
+            self._remove_generation(stale_generation)
+            return len(pending)
+
+    def _append(self, name: str, offset: int, payload: bytes) -> None:
+        # Drop whatever an interrupted append left past the committed rows, then append.
+        with open(self._path(name), 'ab') as f:
+            f.truncate(offset)
+            f.write(payload)
+
+    def _ivf_files(self, generation: int):
+        return f"ivf_centroids_{generation}.npy", f"ivf_assignments_{generation}.bin"
+
+    def _load_ivf(self) -> None:
+        centroids_file, assignments_file = self._ivf_files(self.ivf_meta['generation'])
+        try:
+            centroids = np.load(self._path(centroids_file))
+            labels = np.fromfile(self._path(assignments_file), dtype=np.int32, count=self.ivf_meta['rows'])
+        except (OSError, ValueError):
+            self.ivf_meta = None
+            return
+        if len(labels) < self.ivf_meta['rows']:
+            self.ivf_meta = None
+            return
+        self._set_ivf(centroids, labels)
+        if self.ivf_meta['rows'] < self.rows:
+            # Rows added while the index was opened without ann.
+            vectors, _ = self._mapped_vectors()
+            self._assign_rows(vectors[self.ivf_meta['rows']:], self.ivf_meta['rows'])
+            self._write_meta()
+
+    def _set_ivf(self, centroids: np.ndarray, labels: np.ndarray) -> None:
+        order = np.argsort(labels, kind='stable')
+        boundaries = np.cumsum(np.bincount(labels, minlength=len(centroids)))[:-1]
+        self._ivf = (centroids, np.split(order, boundaries))
+
+    def _assign_rows(self, vectors: np.ndarray, first_row: int) -> None:
+        """
+        Append rows first_row.. to their nearest lists and to the current assignment file.
+        """
+        centroids, lists = self._ivf
+        labels = _nearest_centroid(vectors, centroids)
+        _, assignments_file = self._ivf_files(self.ivf_meta['generation'])
+        self._append(assignments_file, first_row * 4, labels.tobytes())
+        lists = list(lists)
+        rows = first_row + np.arange(len(labels))
+        for label in np.unique(labels):
+            lists[label] = np.concatenate((lists[label], rows[labels == label]))
+        self._ivf = (centroids, lists)
+        self.ivf_meta = {**self.ivf_meta, 'rows': first_row + len(labels)}
+
+    def _train_ivf(self, n_lists: Optional[int] = None) -> Optional[int]:
+        """
+        Fit a new generation of centroids on the stored rows and assign every row to a list.
+
+        Returns:
+            Optional[int]: The previous generation, whose files can go once meta.json is written.
+        """
+        vectors, scales = self._mapped_vectors()
+        n_lists = min(n_lists or self.n_lists or int(np.sqrt(self.rows)), self.rows)
+        rng = np.random.default_rng(self.rows)
+        sample_rows = np.sort(rng.choice(self.rows, min(self.rows, n_lists * IVF_TRAIN_ROWS_PER_LIST), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+        if scales is not None:
+            sample = sample / np.linalg.norm(sample, axis=1, keepdims=True).clip(1e-12)
+        centroids = spherical_kmeans(sample, n_lists).astype(np.float32)
+        # Positive per-row scales do not change which centroid is nearest, so int8 rows are used as they are.
+        labels = _nearest_centroid(vectors, centroids)
+
+        previous = self.ivf_meta['generation'] if self.ivf_meta is not None else None
+        generation = (previous or 0) + 1
+        centroids_file, assignments_file = self._ivf_files(generation)
+        np.save(self._path(centroids_file), centroids)
+        self._append(assignments_file, 0, labels.tobytes())
+        self.ivf_meta = {'generation': generation, 'lists': n_lists, 'rows': self.rows, 'trained_rows': self.rows}
+        self._set_ivf(centroids, labels)
+        return previous
+
+    def _remove_generation(self, generation: Optional[int]) -> None:
+        if generation is None:
+            return
+        for name in self._ivf_files(generation):
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    def build_ann(self, n_lists: Optional[int] = None) -> None:
+        """
+        (Re)train the IVF layer now, e.g. with a different number of lists, and enable it.
+        """
+        with self._lock:
+            if self.rows == 0:
+                return
+            self.ann = True
+            stale_generation = self._train_ivf(n_lists)
+            self._write_meta()
+            self._remove_generation(stale_generation)
+
+    def search(self, query: np.ndarray, k: int = 5, n_probe: Optional[int] = None, exact: bool = False) -> List[Dict]:
+        """
+        Top-k rows by cosine similarity to `query`, best first.
+
+        Args:
+            query (np.ndarray): Query embedding.
+            k (int): Number of hits.
+            n_probe (Optional[int]): IVF lists to scan, defaulting to the index's n_probe.
+            exact (bool): Score every row even when the IVF layer is available.
+
+        Returns:
+            List[Dict]: Stored metadata per hit plus 'row' and 'similarity'.
+        """
+        if self.rows == 0:
+            return []
+        vectors, scales = self._mapped_vectors()
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        ivf = self._ivf if self.ann and not exact else None
+
+        if ivf is None:
+            candidates = None
+            scores = np.empty(len(vectors), dtype=np.float32)
+            for start in range(0, len(vectors), SEARCH_BLOCK_ROWS):
+                block = vectors[start:start + SEARCH_BLOCK_ROWS]
+                scores[start:start + len(block)] = block @ query if scales is None else (block.astype(np.float32) @ query) * scales[start:start + len(block)]
+        else:
+            centroids, lists = ivf
+            n_probe = min(n_probe or self.n_probe, len(centroids))
+            probes = np.argpartition(-(centroids @ query), n_probe - 1)[:n_probe]
+            candidates = np.sort(np.concatenate([lists[probe] for probe in probes]))
+            candidates = candidates[candidates < len(vectors)]
+            scores = np.empty(len(candidates), dtype=np.float32)
+            for start in range(0, len(candidates), SEARCH_BLOCK_ROWS):
+                rows = candidates[start:start + SEARCH_BLOCK_ROWS]
+                block = vectors[rows]
+                scores[start:start + len(rows)] = block @ query if scales is None else (block.astype(np.float32) @ query) * scales[rows]
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = top if candidates is None else candidates[top]
+        return [{**self.metadata[row], 'row': int(row), 'similarity': float(score)} for row, score in zip(rows, scores[top])]
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from config import FORECAST_PARITY_TOLERANCE
+from garch_model import GARCHVaRModel, garch_variance_term_structure, forecast_parity
+
+HORIZONS = [1, 7, 60]
+# (omega, alpha, beta) in percent-squared units, from low to near-integrated persistence.
+SIMULATED = {'LOW.NS': (0.20, 0.05, 0.80), 'MID.NS': (0.05, 0.08, 0.90), 'HIGH.NS': (0.02, 0.10, 0.89), 'SPIKY.NS': (0.10, 0.20, 0.70)}
+
+
+def simulate_garch(omega: float, alpha: float, beta: float, n: int = 1500, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    returns, variance = np.empty(n), omega / (1 - alpha - beta)
+    for t in range(n):
+        returns[t] = np.sqrt(variance) * rng.standard_normal()
+        variance = omega + alpha * returns[t] ** 2 + beta * variance
+    return pd.Series(returns / 100, index=pd.bdate_range('2015-01-01', periods=n))
+
+
+@pytest.fixture(scope='module')
+def models():
+    fitted = {}
+    for seed, (ticker, params) in enumerate(SIMULATED.items()):
+        for dist in ('normal', 't'):
+            model = GARCHVaRModel(simulate_garch(*params, seed=seed), dist=dist)
+            assert model.fit()
+            fitted[ticker, dist] = model
+    return fitted
+
+
+@pytest.mark.parametrize('horizon', HORIZONS)
+def test_closed_form_matches_arch_per_model(models, horizon):
+    for key, model in models.items():
+        assert forecast_parity(model, horizon) <= FORECAST_PARITY_TOLERANCE, key
+
+
+@pytest.mark.parametrize('horizon', HORIZONS)
+def test_closed_form_matches_arch_across_tickers(models, horizon):
+    tickers = list(models)
+    params = pd.DataFrame([models[key].get_params() for key in tickers])
+    next_variance = np.array([models[key].next_variance() for key in tickers])
+    analytic = garch_variance_term_structure(params['omega'].to_numpy(), params['alpha'].to_numpy(), params['beta'].to_numpy(), next_variance, horizon)
+    reference = np.vstack([models[key].forecast_volatility(horizon, use_arch=True)['Variance'].to_numpy() for key in tickers])
+    assert analytic.shape == (len(tickers), horizon)
+    assert np.max(np.abs(analytic - reference) / reference) <= FORECAST_PARITY_TOLERANCE
+
+
+def test_closed_form_matches_recursion_at_unit_persistence():
+    omega, alpha, beta, next_variance, horizon = np.array([0.05, 0.01]), np.array([0.1, 0.06]), np.array([0.9, 0.94 - 1e-12]), np.array([1.3, 0.7]), 30
+    expected = np.empty((2, horizon))
+    expected[:, 0] = next_variance
+    for day in range(1, horizon):
+        expected[:, day] = omega + (alpha + beta) * expected[:, day - 1]
+    np.testing.assert_allclose(garch_variance_term_structure(omega, alpha, beta, next_variance, horizon), expected, rtol=1e-10)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from garch_model import SlidingWindowQuantiles, HistoricalVaRModel, rolling_historical_var
+
+
+def synthetic_returns(n_dates: int = 800, n_tickers: int = 4, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    returns = pd.DataFrame(rng.standard_t(4, (n_dates, n_tickers)) / 100, index=pd.bdate_range('2020-01-01', periods=n_dates),
+                           columns=[f"T{i}.NS" for i in range(n_tickers)])
+    returns.iloc[rng.integers(0, n_dates, 30), rng.integers(0, n_tickers, 30)] = np.nan
+    returns.iloc[:300, -1] = np.nan
+    return returns
+
+
+@pytest.mark.parametrize('window, horizon', [(252, 1), (252, 7), (60, 10)])
+def test_rolling_var_matches_pandas_rolling_quantile(window, horizon):
+    returns = synthetic_returns()
+    confidence_levels = [0.95, 0.99]
+    result = rolling_historical_var(returns, window, horizon, confidence_levels)
+
+    sums = (returns * 100).rolling(horizon).sum().shift(-(horizon - 1))
+    for idx, confidence in enumerate(confidence_levels):
+        reference = sums.rolling(window - horizon + 1, min_periods=1).quantile(1 - confidence).shift(horizon)
+        expected = reference.reindex(result['dates']).to_numpy()
+        np.testing.assert_array_equal(np.isnan(result['var'][:, idx, :]), np.isnan(expected))
+        np.testing.assert_allclose(result['var'][:, idx, :], expected, rtol=0, atol=1e-10)
+
+
+def test_rolling_es_is_mean_of_tail():
+    returns = synthetic_returns(n_dates=400, n_tickers=2)
+    window, horizon = 100, 5
+    result = rolling_historical_var(returns, window, horizon, [0.95])
+    sums = (returns * 100).rolling(horizon).sum().shift(-(horizon - 1)).to_numpy()
+    for n, date in enumerate(result['dates']):
+        i = returns.index.get_loc(date)
+        for column in range(returns.shape[1]):
+            past = np.sort(sums[i - window:i - horizon + 1, column])
+            past = past[~np.isnan(past)]
+            tail_size = int(np.floor(0.05 * (len(past) - 1))) + 1
+            expected = past[:tail_size].mean() if len(past) else np.nan
+            assert result['es'][n, 0, column] == pytest.approx(expected, abs=1e-10, nan_ok=True)
+
+
+def test_sliding_window_tail_matches_sorted_window():
+    rng = np.random.default_rng(1)
+    window, n_series = 30, 5
+    # Rounded values force ties between evicted and tail values.
+    data = np.round(rng.standard_normal((400, n_series)), 1)
+    data[rng.random(data.shape) < 0.2] = np.nan
+    quantiles = SlidingWindowQuantiles(window, n_series, max_level=0.2)
+    for t, row in enumerate(data):
+        quantiles.push(row)
+        for column in range(n_series):
+            values = data[max(0, t - window + 1):t + 1, column]
+            values = np.sort(values[~np.isnan(values)])
+            assert quantiles.counts[column] == len(values)
+            np.testing.assert_array_equal(quantiles.tail[column, :len(values)], values[:quantiles.size])
+            if len(values):
+                assert quantiles.quantile([0.2, 0.05])[:, column] == pytest.approx(np.quantile(values, [0.2, 0.05]))
+
+
+def test_sliding_window_rejects_levels_beyond_its_tail():
+    quantiles = SlidingWindowQuantiles(100, max_level=0.05)
+    for value in np.arange(100.0):
+        quantiles.push(value)
+    with pytest.raises(ValueError):
+        quantiles.quantile([0.5])
+
+
+def test_term_structure_matches_numpy_quantile():
+    returns = synthetic_returns(n_dates=300, n_tickers=2).iloc[:, 0].dropna()
+    model = HistoricalVaRModel(returns, window=252)
+    term_structure = model.calculate_var_term_structure([0.95, 0.99], horizon=7)
+    values = returns.to_numpy()[-252:] * 100
+    for day in range(1, 8):
+        sums = np.convolve(values, np.ones(day), mode='valid')
+        np.testing.assert_allclose(term_structure['var'][:, day - 1], np.quantile(sums, [0.05, 0.01]), rtol=0, atol=1e-12)